@@ -16,10 +16,11 @@ from PySide6.QtGui import (QBrush, QColor, QConicalGradient, QCursor,
     QImage, QKeySequence, QLinearGradient, QPainter,
     QPalette, QPixmap, QRadialGradient, QTransform)
 from PySide6.QtWebEngineWidgets import QWebEngineView
-from PySide6.QtWidgets import (QApplication, QCheckBox, QHBoxLayout, QHeaderView,
-    QLabel, QLineEdit, QMainWindow, QMenuBar,
-    QPushButton, QSizePolicy, QStatusBar, QTableWidget,
-    QTableWidgetItem, QTextBrowser, QVBoxLayout, QWidget)
+from PySide6.QtWidgets import (QAbstractItemView, QApplication, QCheckBox, QHBoxLayout,
+    QHeaderView, QLabel, QLineEdit, QMainWindow,
+    QMenuBar, QPushButton, QSizePolicy, QStatusBar,
+    QTableView, QTableWidget, QTableWidgetItem, QVBoxLayout,
+    QWidget)
 
 class Ui_MainWindow(object):
     def setupUi(self, MainWindow):
@@ -243,7 +244,7 @@ class Ui_MainWindow(object):
 
         self.verticalLayout_8.addWidget(self.label_7)
 
-        self.terminal_window = QTextBrowser(self.layoutWidget7)
+        self.terminal_window = QTableView(self.layoutWidget7)
         self.terminal_window.setObjectName(u"terminal_window")
         font = QFont()
         font.setFamilies([u"Segoe UI"])
@@ -253,6 +254,12 @@ class Ui_MainWindow(object):
         font.setKerning(True)
         self.terminal_window.setFont(font)
         self.terminal_window.setStyleSheet(u"")
+        self.terminal_window.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.terminal_window.setShowGrid(False)
+        self.terminal_window.setWordWrap(False)
+        self.terminal_window.horizontalHeader().setVisible(False)
+        self.terminal_window.horizontalHeader().setStretchLastSection(True)
+        self.terminal_window.verticalHeader().setVisible(False)
 
         self.verticalLayout_8.addWidget(self.terminal_window)
 
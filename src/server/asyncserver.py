@@ -0,0 +1,339 @@
+from typing import Dict, Any, List, Optional, Tuple
+from PySide6.QtCore import Slot
+import asyncio
+import itertools
+import os
+import time
+
+from src.server.codec import JSON_CODEC, detect_codec
+from src.server.framing import HEADER_SIZE, FrameDecoder, FrameError
+from src.server.linkhealth import LinkHealth
+from src.server.messages import Frame
+from src.server.outbox import CommandOutbox, format_rates
+from src.server.recorder import RCVD, SEND
+from src.server.server import ServerThread
+
+
+class VehicleProtocol(asyncio.BufferedProtocol):
+    """
+    Handles the traffic of a single vehicle connected to AsyncServerThread.
+    The event loop reads straight into the frame decoder buffer.
+    """
+
+    def __init__(self, server: 'AsyncServerThread', conn_id: int) -> None:
+        """
+        Initialize the connection state.
+
+        :param server: Engine that owns the connection.
+        :param conn_id: Identifier of the connection, unique within the engine.
+        """
+        self.server = server
+        self.conn_id: int = conn_id
+        self.transport: Optional[asyncio.Transport] = None
+        self.addr: Optional[Tuple[str, int]] = None
+        self.decoder: FrameDecoder = FrameDecoder()
+        self.codec = JSON_CODEC
+        self.outbox: CommandOutbox = CommandOutbox()
+        self.mode: Optional[str] = None
+        self.subscriptions: Dict[str, float] = {}  # replaced, never changed in place, see ServerThread
+        # Frames answered to the vehicle since its last read; its next read confirms them
+        self.in_flight: List[Dict[str, Any]] = []
+        self.peer_seq: Optional[int] = None  # Latest 'seq' of the vehicle, acknowledged in the answer
+        self.last_rx: float = 0.0
+        self.health: LinkHealth = LinkHealth(response_interval=True)
+        self._sent_at: Optional[float] = None
+        self._checked_at: float = 0.0
+        self._watchdog: Optional[asyncio.TimerHandle] = None
+
+    def connection_made(self, transport: asyncio.Transport) -> None:
+        self.transport = transport
+        self.addr = transport.get_extra_info('peername')
+        self.last_rx = time.monotonic()
+        self._arm_watchdog()
+        self.server._register(self)
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        return self.decoder.get_buffer()
+
+    def buffer_updated(self, nbytes: int) -> None:
+        """
+        Decode all complete frames, publish them and answer once per read that completed a frame, like ServerThread does.
+        """
+        self.last_rx = time.monotonic()
+        self.in_flight.clear()
+        self.health.on_reply(nbytes)
+        if self._sent_at is not None:
+            self.health.on_rtt(self.last_rx - self._sent_at)
+            self._sent_at = None
+        try:
+            frames = self.decoder.commit(nbytes)
+        except FrameError as e:
+            print(e)
+            self.transport.abort()
+            return
+
+        for raw_data in frames:
+            self.server._record(RCVD, raw_data, self.conn_id)
+            self.codec = detect_codec(raw_data)
+            data = self.server._decode(raw_data, self.codec)
+            if isinstance(data.get('seq'), int):
+                self.peer_seq = data['seq']
+            self.server._dispatch(self, data)
+        if frames:
+            self.server._reply(self)
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        if self._watchdog is not None:
+            self._watchdog.cancel()
+        self.server._unregister(self)
+
+    def send(self, payload: bytes) -> None:
+        """
+        Write a frame and start timing the round trip to the next read.
+        """
+        self.transport.write(payload)
+        self.health.on_sent(len(payload))
+        if self._sent_at is None:
+            self._sent_at = time.monotonic()
+
+    def _arm_watchdog(self) -> None:
+        """
+        Check the link once per RTO and drop the connection after several silent periods in a row.
+        """
+        now = time.monotonic()
+        if self._checked_at and self.last_rx <= self._checked_at:
+            self.health.on_timeout()
+            if self.health.is_dead():
+                print(f" [ERROR] - Нет ответа от клиента {self.addr} в течение {now - self.last_rx:.1f} секунд!")
+                self.transport.abort()
+                return
+        self._checked_at = now
+        loop = asyncio.get_running_loop()
+        self._watchdog = loop.call_later(self.health.rto, self._arm_watchdog)
+
+
+class AsyncServerThread(ServerThread):
+    """
+    Server engine that keeps listening and serves several vehicles concurrently.
+
+    The asyncio event loop runs inside the thread pool worker. Every connection is served, but only
+    the selected one (see select_conn) drives the data_received/data_sent signals and receives the
+    commands issued from the GUI; client_connected/client_disconnected list the connections.
+    """
+    selected: Optional[int] = None
+
+    def __init__(self) -> None:
+        """
+        Initialize the engine without any connection.
+        """
+        super().__init__()
+        self.health = LinkHealth(response_interval=True)
+        self.connections: Dict[int, VehicleProtocol] = {}
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._listener: Optional[asyncio.AbstractServer] = None
+        self._ids = itertools.count(1)
+        # Sessions of vehicles that dropped out, kept by host until they come back
+        self._parked: Dict[str, Tuple[float, CommandOutbox, Optional[str], Dict[str, float],
+                                      List[Dict[str, Any]], bool]] = {}
+
+        self.signals.select_conn.connect(self.select_conn)
+
+    @property
+    def outbox(self) -> CommandOutbox:
+        """
+        Command outbox of the selected connection.
+        """
+        vehicle = self._selected_vehicle()
+        return vehicle.outbox if vehicle is not None else self._idle_outbox
+
+    @outbox.setter
+    def outbox(self, value: CommandOutbox) -> None:
+        vehicle = self._selected_vehicle()
+        if vehicle is not None:
+            vehicle.outbox = value
+        else:
+            self._idle_outbox = value
+
+    @property
+    def subscriptions(self) -> Dict[str, float]:
+        """
+        Telemetry subscription of the selected connection.
+        """
+        vehicle = self._selected_vehicle()
+        return vehicle.subscriptions if vehicle is not None else self._idle_subscriptions
+
+    @subscriptions.setter
+    def subscriptions(self, value: Dict[str, float]) -> None:
+        vehicle = self._selected_vehicle()
+        if vehicle is not None:
+            vehicle.subscriptions = value
+        else:
+            self._idle_subscriptions = value
+
+    @property
+    def health(self) -> LinkHealth:
+        """
+        Link health of the selected connection.
+        """
+        vehicle = self._selected_vehicle()
+        return vehicle.health if vehicle is not None else self._idle_health
+
+    @health.setter
+    def health(self, value: LinkHealth) -> None:
+        self._idle_health = value
+
+    @property
+    def conn(self) -> Optional[asyncio.Transport]:
+        """
+        Transport of the selected connection or None if no vehicle is connected.
+        """
+        vehicle = self._selected_vehicle()
+        return vehicle.transport if vehicle is not None else None
+
+    @conn.setter
+    def conn(self, value: Any) -> None:
+        pass
+
+    @property
+    def addr(self) -> Optional[Tuple[str, int]]:
+        """
+        Address of the selected connection.
+        """
+        vehicle = self._selected_vehicle()
+        return vehicle.addr if vehicle is not None else None
+
+    @addr.setter
+    def addr(self, value: Any) -> None:
+        pass
+
+    def _selected_vehicle(self) -> Optional[VehicleProtocol]:
+        if self.selected is None:
+            return None
+        return self.connections.get(self.selected)
+
+    @Slot(object)
+    def set_mode(self, mode: str):
+        """
+        Set mode command and remember it for the selected vehicle's session.
+        """
+        vehicle = self._selected_vehicle()
+        if vehicle is not None:
+            vehicle.mode = mode
+        super().set_mode(mode)
+
+    @Slot(int)
+    def select_conn(self, conn_id: int) -> None:
+        """
+        Route GUI commands and the plain data signals to another connection.
+        """
+        if conn_id in self.connections:
+            self.selected = conn_id
+
+    def stop(self) -> None:
+        """
+        Close every connection and the listening socket, then stop the event loop.
+        """
+        self._stopping = True
+        if self.loop is None or self.loop.is_closed():
+            # Not started yet or already ended, e.g. the port was taken
+            return
+        self.loop.call_soon_threadsafe(self._shutdown)
+
+    @ServerThread.exception_handler
+    def run(self):
+        """
+        Run the event loop and accept vehicles until the server is stopped.
+        """
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self._listener = self.loop.run_until_complete(
+                self.loop.create_server(lambda: VehicleProtocol(self, next(self._ids)), self.HOST, self.PORT))
+            self.signals.started.emit()
+            self.loop.run_forever()
+        finally:
+            self._close_all()
+            # Let the closed transports report connection_lost before the loop goes away
+            self.loop.run_until_complete(asyncio.sleep(0))
+            self.loop.close()
+
+    def _shutdown(self) -> None:
+        self._close_all()
+        self.loop.stop()
+
+    def _close_all(self) -> None:
+        if self._listener is not None:
+            self._listener.close()
+        for vehicle in list(self.connections.values()):
+            vehicle.transport.close()
+
+    def _register(self, vehicle: VehicleProtocol) -> None:
+        self.connections[vehicle.conn_id] = vehicle
+        host = str(vehicle.addr[0])
+        was_selected = self._resume(vehicle, host)
+        if self.selected is None or was_selected:
+            # Commands issued while no vehicle was selected go to this one
+            msg = self._idle_outbox.take()
+            for cmd in msg['cmd']:
+                vehicle.outbox.put(cmd, msg['msg_data'].get(cmd))
+            vehicle.subscriptions = {**vehicle.subscriptions, **self._idle_subscriptions}
+            self._idle_subscriptions = {}
+            self.selected = vehicle.conn_id
+        self.signals.client_connected.emit(vehicle.conn_id, host)
+
+    def _unregister(self, vehicle: VehicleProtocol) -> None:
+        self.connections.pop(vehicle.conn_id, None)
+        was_selected = self.selected == vehicle.conn_id
+        if was_selected:
+            self.selected = next(iter(self.connections), None)
+        if not self._stopping and vehicle.addr is not None:
+            self._parked[str(vehicle.addr[0])] = (vehicle.last_rx, vehicle.outbox, vehicle.mode,
+                                                  vehicle.subscriptions, vehicle.in_flight, was_selected)
+        self.signals.client_disconnected.emit(vehicle.conn_id)
+
+    def _resume(self, vehicle: VehicleProtocol, host: str) -> bool:
+        """
+        Hand the parked session of a returning vehicle to its new connection: replay what the vehicle did not
+        confirm and restore the mode and the telemetry subscription, like ServerThread._resume.
+
+        :return: True if the vehicle was selected when it dropped out.
+        """
+        _RECONNECT_WINDOW = float(os.getenv("RECONNECT_WINDOW", 10))
+        parked = self._parked.pop(host, None)
+        if parked is None:
+            return False
+        last_rx, outbox, mode, subscriptions, unacked, was_selected = parked
+        away = time.monotonic() - last_rx
+        if away > _RECONNECT_WINDOW:
+            return False
+
+        vehicle.outbox = outbox
+        vehicle.mode = mode
+        vehicle.subscriptions = subscriptions
+        for msg in reversed(unacked):
+            outbox.restore(msg)
+        if mode is not None:
+            outbox.restore({'cmd': ['SETMODE'], 'msg_data': {'SETMODE': mode}})
+        if any(subscriptions.values()):
+            outbox.restore({'cmd': ['SUBSCRIBE'], 'msg_data': {'SUBSCRIBE': format_rates(subscriptions)}})
+        self.reconnects += 1
+        self.reconnect_time = away
+        self.signals.reconnected.emit(away * 1000)
+        return was_selected
+
+    def _dispatch(self, vehicle: VehicleProtocol, data: Dict[str, Any]) -> None:
+        # Only the vehicle the GUI shows is decoded and published
+        if vehicle.conn_id == self.selected:
+            self._emit_received(self._frame(data))
+
+    def _reply(self, vehicle: VehicleProtocol) -> None:
+        msg = vehicle.outbox.take()
+        if vehicle.peer_seq is not None:
+            msg['ack'], vehicle.peer_seq = vehicle.peer_seq, None
+        frame = self._serialize(msg, vehicle.codec)
+        vehicle.send(frame)
+        if msg['cmd']:
+            vehicle.in_flight.append(msg)
+        self._record(SEND, memoryview(frame)[HEADER_SIZE:], vehicle.conn_id)
+        if vehicle.conn_id == self.selected:
+            self.signals.data_sent.emit(Frame.from_msg(msg))
@@ -0,0 +1,138 @@
+from typing import List
+import struct
+
+# Every frame on the wire is a 4-byte big-endian payload length followed by the payload
+HEADER = struct.Struct('!I')
+HEADER_SIZE: int = HEADER.size
+MAX_FRAME_SIZE: int = 1 << 20
+BUFFER_SIZE: int = 1 << 16
+MIN_READ_SIZE: int = 1 << 12
+
+
+class FrameError(ConnectionError):
+    """
+    Raised when the byte stream can not be split into valid frames.
+    """
+
+
+def encode_frame(payload: bytes) -> bytes:
+    """
+    Prefix the payload with its length so the receiver can reassemble it.
+
+    :param payload: Encoded message.
+    :return: Frame ready to be written to the socket.
+    """
+    if len(payload) > MAX_FRAME_SIZE:
+        raise FrameError(f'[ERROR] - Frame of {len(payload)} bytes exceeds {MAX_FRAME_SIZE} bytes')
+    return HEADER.pack(len(payload)) + payload
+
+
+class FrameDecoder:
+    """
+    Incremental decoder for the length-prefixed stream.
+
+    The socket reads straight into a preallocated buffer (get_buffer/commit or recv_into) and
+    complete frames are returned as memoryview slices of that buffer, so nothing is copied
+    between the socket and the codec. The slices stay valid until the next read into the decoder.
+    Partial frames are kept and moved to the front of the buffer only when the free tail runs short.
+    """
+
+    def __init__(self, max_frame_size: int = MAX_FRAME_SIZE, buffer_size: int = BUFFER_SIZE) -> None:
+        """
+        Initialize the decoder with an empty preallocated buffer.
+        """
+        self.max_frame_size: int = max_frame_size
+        self._buffer: bytearray = bytearray(buffer_size)
+        self._view: memoryview = memoryview(self._buffer)
+        self._start: int = 0  # first byte of the partial frame
+        self._end: int = 0  # end of the received bytes
+        self._need: int = HEADER_SIZE  # bytes the partial frame needs in total
+
+    def get_buffer(self) -> memoryview:
+        """
+        Free part of the buffer to receive into. Invalidates frames returned earlier.
+        """
+        pending = self._end - self._start
+        need = max(self._need, pending + MIN_READ_SIZE)
+        if self._start + need > len(self._buffer):
+            if need > len(self._buffer):
+                # Never resize in place: returned slices may still be exported
+                buffer = bytearray(max(need, 2 * len(self._buffer)))
+                buffer[:pending] = self._view[self._start:self._end]
+                self._buffer = buffer
+                self._view = memoryview(buffer)
+            else:
+                self._view[:pending] = self._view[self._start:self._end]
+            self._start = 0
+            self._end = pending
+        return self._view[self._end:]
+
+    def commit(self, nbytes: int) -> List[memoryview]:
+        """
+        Account for bytes written into get_buffer() and extract all complete frames.
+
+        :param nbytes: Number of bytes received.
+        :return: Payloads of all frames completed by this read, in order.
+        """
+        self._end += nbytes
+        frames: List[memoryview] = []
+        pos = self._start
+        end = self._end
+
+        while end - pos >= HEADER_SIZE:
+            (length,) = HEADER.unpack_from(self._buffer, pos)
+            if length > self.max_frame_size:
+                self.reset()
+                raise FrameError(f'[ERROR] - Frame of {length} bytes exceeds {self.max_frame_size} bytes')
+            frame_end = pos + HEADER_SIZE + length
+            if frame_end > end:
+                self._need = HEADER_SIZE + length
+                break
+            frames.append(self._view[pos + HEADER_SIZE:frame_end])
+            pos = frame_end
+        else:
+            self._need = HEADER_SIZE
+
+        if pos == end:
+            pos = end = 0
+        self._start = pos
+        self._end = end
+        return frames
+
+    def recv_into(self, sock) -> List[memoryview]:
+        """
+        Receive once from the socket straight into the buffer.
+
+        :return: Completed frames; ConnectionAbortedError is raised when the peer closed the connection.
+        """
+        nbytes = sock.recv_into(self.get_buffer())
+        if not nbytes:
+            raise ConnectionAbortedError(" [ERROR] - Клиент закрыл соединение\n")
+        return self.commit(nbytes)
+
+    def feed(self, data: bytes) -> List[bytes]:
+        """
+        Add bytes received elsewhere and extract all complete frames as independent copies.
+        """
+        frames: List[bytes] = []
+        view = memoryview(data)
+        while view:
+            target = self.get_buffer()
+            nbytes = min(len(target), len(view))
+            target[:nbytes] = view[:nbytes]
+            view = view[nbytes:]
+            frames.extend(bytes(frame) for frame in self.commit(nbytes))
+        return frames
+
+    def pending(self) -> int:
+        """
+        Number of buffered bytes that do not form a complete frame yet.
+        """
+        return self._end - self._start
+
+    def reset(self) -> None:
+        """
+        Drop any partially received frame.
+        """
+        self._start = self._end = 0
+        self._need = HEADER_SIZE
@@ -0,0 +1,132 @@
+from typing import Dict, Optional
+import os
+import time
+
+
+class LinkHealth:
+    """
+    Live estimate of the link quality to a vehicle.
+
+    Round-trip time is smoothed like TCP does (RFC 6298): SRTT and RTTVAR give the retransmission
+    timeout RTO = SRTT + 4 * RTTVAR, which is doubled on every miss. The share of waits that ended
+    without a reply is an exponential average of replies vs. timeouts, throughput an exponential
+    average of bytes per second, advanced by the thread that serves the link.
+
+    In lockstep the vehicle sends on its own schedule and the server only answers, so the time from an
+    answer to the next frame is the vehicle's frame interval, not the round trip of the link: with
+    response_interval the estimate is shown as such. It still sets the RTO, which is how long the next
+    frame may take.
+    """
+    ALPHA: float = 1 / 8
+    BETA: float = 1 / 4
+    K: int = 4
+    LOSS_GAIN: float = 1 / 16
+    RATE_GAIN: float = 1 / 4
+
+    INITIAL_RTO: float = 1.0
+    MIN_RTO: float = 0.2
+    MAX_RTO: float = 5.0
+    MAX_MISSES: int = 3
+    # Silence always tolerated before the link is declared dead, so short radio dropouts do not force a reconnect
+    DEAD_TIME: float = float(os.getenv('LINK_DEAD_TIME', 5))
+    RATE_PERIOD: float = 0.5  # s between throughput updates
+
+    def __init__(self, response_interval: bool = False) -> None:
+        """
+        Initialize the estimator before any sample has been taken.
+
+        :param response_interval: Samples are the interval to the vehicle's next frame rather than round trips.
+        """
+        self.response_interval: bool = response_interval
+        self.srtt: Optional[float] = None
+        self.rttvar: float = 0.0
+        self.rto: float = self.INITIAL_RTO
+        self.loss: float = 0.0
+        self.misses: int = 0
+        self.last_reply: float = time.monotonic()
+
+        self.bytes_sent: int = 0
+        self.bytes_received: int = 0
+        self.rx_rate: float = 0.0
+        self.tx_rate: float = 0.0
+        self._rate_at: float = time.monotonic()
+        self._rate_sent: int = 0
+        self._rate_received: int = 0
+
+    def on_rtt(self, sample: float) -> None:
+        """
+        Add a round-trip measurement in seconds.
+        """
+        if self.srtt is None:
+            self.srtt = sample
+            self.rttvar = sample / 2
+        else:
+            self.rttvar = (1 - self.BETA) * self.rttvar + self.BETA * abs(self.srtt - sample)
+            self.srtt = (1 - self.ALPHA) * self.srtt + self.ALPHA * sample
+        self.rto = min(max(self.srtt + self.K * self.rttvar, self.MIN_RTO), self.MAX_RTO)
+
+    def on_reply(self, nbytes: int) -> None:
+        """
+        The vehicle answered within the timeout.
+        """
+        self.misses = 0
+        self.last_reply = time.monotonic()
+        self.bytes_received += nbytes
+        self.loss += self.LOSS_GAIN * (0.0 - self.loss)
+        self._advance_rates(self.last_reply)
+
+    def on_timeout(self) -> None:
+        """
+        No answer within RTO: count the wait as unanswered and back off.
+        """
+        self.misses += 1
+        self.loss += self.LOSS_GAIN * (1.0 - self.loss)
+        self.rto = min(self.rto * 2, self.MAX_RTO)
+        self._advance_rates(time.monotonic())
+
+    def on_sent(self, nbytes: int) -> None:
+        self.bytes_sent += nbytes
+        self._advance_rates(time.monotonic())
+
+    def on_connect(self) -> None:
+        """
+        A new connection starts without misses.
+        """
+        self.misses = 0
+        self.last_reply = time.monotonic()
+
+    def is_dead(self) -> bool:
+        """
+        The link is considered dead after MAX_MISSES timeouts in a row and at least DEAD_TIME of silence.
+        """
+        return self.misses >= self.MAX_MISSES and time.monotonic() - self.last_reply >= self.DEAD_TIME
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Current estimates. Read-only, so the GUI may call it while the server thread updates the link.
+        """
+        return {'srtt': self.srtt or 0.0, 'rttvar': self.rttvar, 'rto': self.rto, 'loss': self.loss,
+                'rx_rate': self.rx_rate, 'tx_rate': self.tx_rate}
+
+    def summary(self) -> str:
+        """
+        One-line description for the status bar.
+        """
+        stats = self.stats()
+        return (f"{'интервал ответа' if self.response_interval else 'RTT'} "
+                f"{stats['srtt'] * 1000:.0f}±{stats['rttvar'] * 1000:.0f} мс, "
+                f"таймаут {stats['rto'] * 1000:.0f} мс, без ответа {stats['loss'] * 100:.0f}% ожиданий, "
+                f"приём {stats['rx_rate'] / 1024:.1f} КБ/с, передача {stats['tx_rate'] / 1024:.1f} КБ/с")
+
+    def _advance_rates(self, now: float) -> None:
+        """
+        Update the throughput averages at most once per RATE_PERIOD.
+        """
+        elapsed = now - self._rate_at
+        if elapsed < self.RATE_PERIOD:
+            return
+        rx = (self.bytes_received - self._rate_received) / elapsed
+        tx = (self.bytes_sent - self._rate_sent) / elapsed
+        self.rx_rate += self.RATE_GAIN * (rx - self.rx_rate)
+        self.tx_rate += self.RATE_GAIN * (tx - self.tx_rate)
+        self._rate_at, self._rate_received, self._rate_sent = now, self.bytes_received, self.bytes_sent
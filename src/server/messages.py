@@ -0,0 +1,122 @@
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, Mapping, NamedTuple, Optional, Tuple
+import time
+
+from src.telemetry.batch import TelemetryBatch
+from src.telemetry.schema import REGISTRY
+
+# Typed samples of the built-in sensors, see SentenceSchema.sample
+GpsSample = REGISTRY['GPS'].sample
+ImuSample = REGISTRY['IMU'].sample
+
+NO_DATA: Mapping[str, Any] = MappingProxyType({})
+
+
+class Command(NamedTuple):
+    """
+    Command of a frame and its argument, e.g. Command('SETMODE', 'Manual'); requests such as GPS have none.
+    """
+    name: str
+    value: Optional[str] = None
+
+
+class Frame(NamedTuple):
+    """
+    Message exchanged with the vehicle as seen by the GUI.
+
+    Built once in the server thread from the decoded message and handed to the GUI by reference through
+    Signal(object), so nothing is converted or copied on the way. data is a read-only copy of the decoded
+    msg_data without the command arguments, so later changes to the server's message are not seen by the
+    GUI; the columns of its batches are read-only arrays.
+    """
+    commands: Tuple[Command, ...] = ()
+    data: Mapping[str, Any] = NO_DATA
+    status: Optional[str] = None
+    seq: Optional[int] = None
+    ack: Optional[int] = None
+    batches: Tuple[TelemetryBatch, ...] = ()  # Telemetry decoded from the frame, one batch per sensor key
+    timestamp: float = 0.0  # Wall-clock time the frame was sent, received or recorded
+
+    @classmethod
+    def from_msg(cls, msg: Dict[str, Any], batches: Tuple[TelemetryBatch, ...] = (),
+                 timestamp: Optional[float] = None) -> 'Frame':
+        """
+        Wrap a message in the {'cmd': [...], 'msg_data': {...}} form used on the wire.
+        """
+        msg_data = msg.get('msg_data') or NO_DATA
+        names = msg.get('cmd') or ()
+        commands = tuple([Command(name, msg_data.get(name)) for name in names])
+        data = {key: value for key, value in msg_data.items() if key not in names}
+        return cls(commands, MappingProxyType(data) if data else NO_DATA, msg.get('status'), msg.get('seq'),
+                   msg.get('ack'), batches, time.time() if timestamp is None else timestamp)
+
+    def to_msg(self) -> Dict[str, Any]:
+        """
+        The frame in the wire form, e.g. for an export.
+        """
+        msg: Dict[str, Any] = {'cmd': self.names(), 'msg_data': dict(self.items())}
+        for key in ('status', 'seq', 'ack'):
+            value = getattr(self, key)
+            if value is not None:
+                msg[key] = value
+        return msg
+
+    def names(self) -> list:
+        return [command.name for command in self.commands]
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        """
+        Command arguments followed by the data, in the order of msg_data on the wire.
+        """
+        for command in self.commands:
+            if command.value is not None:
+                yield command
+        yield from self.data.items()
+
+    def is_empty(self) -> bool:
+        return not self.commands and not self.data
+
+    def is_info(self) -> bool:
+        """
+        Only an INFO acknowledgement of the vehicle.
+        """
+        return not any(command.value is not None for command in self.commands) and list(self.data) == ['INFO']
+
+
+if __name__ == "__main__":
+    ## Cost of handing a message to the GUI thread as a dict and as a Frame
+    import sys
+    import threading
+    from PySide6.QtCore import QCoreApplication, QObject, Signal
+
+    class Signals(QObject):
+        as_dict = Signal(dict)
+        as_object = Signal(object)
+
+    msg = {'status': 'RESPONSE', 'cmd': [], 'seq': 12, 'ack': 11,
+           'msg_data': {'GPSRESPONSE': 'D,s,1,1,5520.0459,N,2047.5840,E,15.2,123752,38.000,48.000,*73',
+                        'IMURESPONSE': 'D,s,1,3,0.012,-0.981,9.806,*41', 'INFO': 'SETMODE Manual OK'}}
+    sent = {'cmd': ['MTRCMD', 'SETMODE', 'GPS', 'IMU'], 'msg_data': {'MTRCMD': 'FWD', 'SETMODE': 'Manual'}}
+
+    app = QCoreApplication(sys.argv)
+    signals = Signals()
+    n = 20_000
+    for name, signal, make in (('dict', signals.as_dict, lambda: msg),
+                               ('Frame', signals.as_object, lambda: Frame.from_msg(msg))):
+        received, emitted = [], []
+        signal.connect(received.append)
+
+        def produce() -> None:
+            for _ in range(n):
+                emitted.append(make())
+                signal.emit(emitted[-1])
+
+        started = time.perf_counter()
+        producer = threading.Thread(target=produce)
+        producer.start()
+        while len(received) < n:
+            app.processEvents()
+        producer.join()
+        elapsed = time.perf_counter() - started
+        print(f'{name:<6} {elapsed / n * 1e6:6.1f} us per message from the server thread to the GUI thread, '
+              f'{"same object" if received[-1] is emitted[-1] else "copy"} on arrival')
@@ -0,0 +1,318 @@
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional
+import json
+import os
+import tempfile
+import numpy as np
+
+from src.server.messages import Frame
+from src.server.recorder import DIRECTIONS, RCVD, SEND
+from src.telemetry.batch import COLUMNS, TelemetryBatch
+
+MEMORY_FRAMES: int = int(os.getenv('STORE_MEMORY', 100_000))  # newest frames kept as objects
+SPILL_CHUNK: int = 1024  # frames written to disk at once, a few milliseconds of the GUI thread
+MAX_VALUE_TERM: int = 32  # longer command arguments (e.g. MANLINECMD text) are not indexed by value
+SCAN_BLOCK: int = 1 << 16  # ids filtered at a time when only the newest matches are needed
+BATCH_TAG: str = '__batch__'  # key of a TelemetryBatch written to the spill file, see _pack
+
+
+class _Column:
+    """
+    Growable NumPy array, appended to in amortised O(1).
+    """
+
+    def __init__(self, dtype: np.dtype, capacity: int = 16) -> None:
+        self.data: np.ndarray = np.empty(capacity, dtype=dtype)
+        self.size: int = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, value) -> None:
+        if self.size == len(self.data):
+            self._grow(self.size + 1)
+        self.data[self.size] = value
+        self.size += 1
+
+    def extend(self, values: np.ndarray) -> None:
+        end = self.size + len(values)
+        if end > len(self.data):
+            self._grow(end)
+        self.data[self.size:end] = values
+        self.size = end
+
+    def view(self) -> np.ndarray:
+        return self.data[:self.size]
+
+    def _grow(self, size: int) -> None:
+        data = np.empty(max(size, 2 * len(self.data)), dtype=self.data.dtype)
+        data[:self.size] = self.data[:self.size]
+        self.data = data
+
+
+def frame_terms(frame: Frame) -> List[str]:
+    """
+    Search terms of a frame: its commands, command=argument pairs and the keys of its data,
+    e.g. ['MTRCMD', 'MTRCMD=STOP'] or ['GPSRESPONSE', 'INFO'].
+    """
+    terms = []
+    for command in frame.commands:
+        terms.append(command.name)
+        if command.value is not None and len(str(command.value)) <= MAX_VALUE_TERM:
+            terms.append(f'{command.name}={command.value}')
+    terms.extend(frame.data)
+    return list(dict.fromkeys(terms))
+
+
+def _pack(frame: Frame) -> bytes:
+    """
+    Spill file record of a frame: its message as one line of JSON, in which every TelemetryBatch is
+    replaced by {BATCH_TAG: kind, 'rows': n}, followed by the raw bytes of the batch columns.
+    """
+    msg = frame.to_msg()
+    blobs = []
+    msg_data = msg['msg_data']
+    for key, value in msg_data.items():
+        if isinstance(value, TelemetryBatch):
+            msg_data[key] = {BATCH_TAG: value.kind, 'rows': len(value)}
+            for name, dtype in COLUMNS[value.kind]:
+                blobs.append(np.ascontiguousarray(value.columns[name], dtype=dtype).tobytes())
+    return json.dumps(msg).encode() + b'\n' + b''.join(blobs)
+
+
+def _unpack(record: bytes) -> Dict[str, Any]:
+    """
+    Message of a spill file record written by _pack, with its batches as TelemetryBatch.
+    """
+    line, _, blob = record.partition(b'\n')
+    offset = 0
+
+    def batch(value: Dict[str, Any]) -> Any:
+        nonlocal offset
+        kind = value.get(BATCH_TAG)
+        if kind is None:
+            return value
+        columns = {}
+        for name, dtype in COLUMNS[kind]:
+            columns[name] = np.frombuffer(blob, dtype=dtype, count=value['rows'], offset=offset).copy()
+            offset += columns[name].nbytes
+        return TelemetryBatch(kind, columns)
+
+    return json.loads(line, object_hook=batch)
+
+
+def parse_terms(text: str) -> List[str]:
+    """
+    Terms typed by the operator, e.g. 'mtrcmd=STOP setmode' -> ['MTRCMD=STOP', 'SETMODE'].
+    """
+    terms = []
+    for word in text.split():
+        name, separator, value = word.partition('=')
+        terms.append(name.upper() + separator + value)
+    return terms
+
+
+class MessageStore:
+    """
+    Every frame sent or received in the session, searchable by command, direction and time.
+
+    Entries are numbered in arrival order. Their times and directions are NumPy columns, and every
+    search term (see frame_terms) has a sorted list of the entries that contain it, so a search is a
+    binary search on the times plus one on each term's list, whatever the length of the session;
+    only direction filtering looks at the entries found. The newest MEMORY_FRAMES frames are kept as
+    objects, older ones are written to a spill file in chunks, as JSON with the columns of their
+    batches of samples as raw bytes, and read back when asked for. The columns are copied rather than
+    converted, so writing a chunk takes a few milliseconds of the GUI thread.
+    """
+
+    def __init__(self, path: Optional[str] = None, memory: int = MEMORY_FRAMES) -> None:
+        """
+        :param path: Spill file; an anonymous temporary file if not given.
+        :param memory: Number of newest frames kept in memory.
+        """
+        self.memory: int = max(memory, 1)
+        self._times: _Column = _Column(np.float64, 1 << 12)
+        self._directions: _Column = _Column(np.uint8, 1 << 12)
+        self._postings: Dict[str, _Column] = {}
+        self._frames: List[Frame] = []
+        self._first_in_memory: int = 0  # id of self._frames[0]
+        self._offsets: _Column = _Column(np.uint64, 1 << 12)  # spill file offset of every spilled frame
+        self._spilled_size: int = 0
+        self._file: BinaryIO = open(path, 'w+b') if path else tempfile.TemporaryFile()
+
+    def __len__(self) -> int:
+        return len(self._times)
+
+    def add(self, frame: Frame, direction: int) -> int:
+        """
+        Store a frame, O(1) amortised.
+
+        :param direction: RCVD or SEND.
+        :return: Id of the entry.
+        """
+        entry = len(self._times)
+        # Times must not go backwards for the binary search; frames of both directions are stamped by
+        # the server thread, so a correction, if any, is in microseconds
+        timestamp = frame.timestamp
+        if entry and timestamp < self._times.data[entry - 1]:
+            timestamp = self._times.data[entry - 1]
+        self._times.append(timestamp)
+        self._directions.append(direction)
+        for term in frame_terms(frame):
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = _Column(np.uint32)
+            postings.append(entry)
+
+        self._frames.append(frame)
+        if len(self._frames) >= self.memory + SPILL_CHUNK:
+            self._spill(SPILL_CHUNK)
+        return entry
+
+    def get(self, entry: int) -> Frame:
+        """
+        Frame of an entry, read back from the spill file if it is no longer in memory; its batches are
+        those of its data (GPSBATCH, IMUBATCH), samples decoded from single responses are not kept.
+        """
+        if entry >= self._first_in_memory:
+            return self._frames[entry - self._first_in_memory]
+        start = int(self._offsets.data[entry])
+        end = int(self._offsets.data[entry + 1]) if entry + 1 < len(self._offsets) else self._spilled_size
+        self._file.seek(start)
+        msg = _unpack(self._file.read(end - start))
+        batches = tuple([value for value in msg['msg_data'].values() if isinstance(value, TelemetryBatch)])
+        return Frame.from_msg(msg, batches, float(self._times.data[entry]))
+
+    def time(self, entry: int) -> float:
+        return float(self._times.data[entry])
+
+    def direction(self, entry: int) -> str:
+        return DIRECTIONS[self._directions.data[entry]]
+
+    def terms(self) -> List[str]:
+        return sorted(self._postings)
+
+    def query(self, terms: Iterable[str] = (), direction: Optional[int] = None, start: Optional[float] = None,
+              end: Optional[float] = None, limit: Optional[int] = None) -> np.ndarray:
+        """
+        Ids of the matching entries, newest first.
+
+        :param terms: Entries containing any of the terms; all entries if empty.
+        :param direction: RCVD or SEND, None - both.
+        :param start: Earliest time, inclusive.
+        :param end: Latest time, inclusive.
+        :param limit: At most this many of the newest matches.
+        """
+        times = self._times.view()
+        low = 0 if start is None else int(np.searchsorted(times, start, 'left'))
+        high = len(times) if end is None else int(np.searchsorted(times, end, 'right'))
+
+        terms = list(terms)
+        if terms:
+            found = []
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is not None:
+                    ids = postings.view()
+                    found.append(ids[np.searchsorted(ids, low):np.searchsorted(ids, high)])
+            if not found:
+                return np.empty(0, dtype=np.uint32)
+            ids = found[0] if len(found) == 1 else np.unique(np.concatenate(found))
+        else:
+            ids = np.arange(low, high, dtype=np.uint32)
+
+        if direction is None:
+            ids = ids[::-1]
+            return ids if limit is None else ids[:limit]
+        return self._filter_direction(ids, direction, limit)
+
+    def last(self, terms: Iterable[str] = (), direction: Optional[int] = None,
+             before: Optional[float] = None) -> Optional[int]:
+        """
+        Id of the newest matching entry, e.g. last(['MTRCMD=STOP'], SEND) - when STOP was last sent.
+        """
+        ids = self.query(terms, direction, end=before, limit=1)
+        return int(ids[0]) if len(ids) else None
+
+    def close(self) -> None:
+        self._file.close()
+
+    def _filter_direction(self, ids: np.ndarray, direction: int, limit: Optional[int]) -> np.ndarray:
+        """
+        Ids of the given direction, newest first; with a limit only the newest blocks are looked at.
+        """
+        directions = self._directions.data
+        if limit is None:
+            return ids[directions[ids] == direction][::-1]
+        found = []
+        count = 0
+        stop = len(ids)
+        while stop > 0 and count < limit:
+            block = ids[max(stop - SCAN_BLOCK, 0):stop]
+            block = block[directions[block] == direction][::-1]
+            found.append(block[:limit - count])
+            count += len(found[-1])
+            stop -= SCAN_BLOCK
+        return np.concatenate(found) if found else np.empty(0, dtype=np.uint32)
+
+    def _spill(self, count: int) -> None:
+        """
+        Write the oldest frames still in memory to the spill file.
+        """
+        payloads = [_pack(frame) for frame in self._frames[:count]]
+        sizes = np.fromiter((len(payload) for payload in payloads), dtype=np.uint64, count=count)
+        self._offsets.extend(self._spilled_size + np.cumsum(sizes) - sizes)
+        self._file.seek(self._spilled_size)
+        self._file.write(b''.join(payloads))
+        self._spilled_size += int(sizes.sum())
+        del self._frames[:count]
+        self._first_in_memory += count
+
+
+if __name__ == "__main__":
+    ## Search times over a long session
+    import time
+
+    n = 2_000_000
+    rate = 50.0  # frames per second, about 11 hours
+    frames = {
+        'request': (Frame.from_msg({'cmd': ['GPS', 'IMU'], 'msg_data': {}}), SEND),
+        'telemetry': (Frame.from_msg({'status': 'RESPONSE', 'cmd': [], 'msg_data': {
+            'GPSRESPONSE': 'D,s,1,1,5520.0459,N,2047.5840,E,15.2,123752,38.000,48.000,*73',
+            'IMUBATCH': ['D,s,1,3,0.012,-0.981,9.806,*41'] * 10}}), RCVD),
+        'move': (Frame.from_msg({'cmd': ['MTRCMD'], 'msg_data': {'MTRCMD': 'FWD'}}), SEND),
+        'stop': (Frame.from_msg({'cmd': ['MTRCMD'], 'msg_data': {'MTRCMD': 'STOP'}}), SEND),
+        'mode': (Frame.from_msg({'cmd': ['SETMODE'], 'msg_data': {'SETMODE': 'Manual'}}), SEND),
+    }
+    store = MessageStore()
+    started = time.perf_counter()
+    for i in range(n):
+        name = 'stop' if i % 10_007 == 0 else 'mode' if i % 3001 == 0 else 'move' if i % 97 == 0 else \
+            'request' if i % 2 else 'telemetry'
+        frame, direction = frames[name]
+        store.add(frame._replace(timestamp=i / rate), direction)
+    elapsed = time.perf_counter() - started
+    print(f'add(): {elapsed / n * 1e6:.2f} us per frame, {store._spilled_size / 2 ** 20:.0f} MiB spilled, '
+          f'{len(store._frames):,} frames in memory')
+
+    hour = 3600.0
+    for title, search in (
+            ('last STOP sent', lambda: store.last(['MTRCMD=STOP'], SEND)),
+            ('last STOP sent before 5 h', lambda: store.last(['MTRCMD=STOP'], SEND, before=5 * hour)),
+            ('SETMODE or MTRCMD in an hour', lambda: store.query(['SETMODE', 'MTRCMD'], start=hour, end=2 * hour)),
+            ('newest 100 received', lambda: store.query(direction=RCVD, limit=100)),
+            ('all received GPSRESPONSE', lambda: store.query(['GPSRESPONSE'], RCVD)),
+            ('all sent in an hour', lambda: store.query(direction=SEND, start=hour, end=2 * hour)),
+    ):
+        runs = 20
+        started = time.perf_counter()
+        for _ in range(runs):
+            result = search()
+        elapsed = (time.perf_counter() - started) / runs
+        found = 1 if isinstance(result, int) else 0 if result is None else len(result)
+        print(f'{title:<30} {elapsed * 1e3:7.3f} ms, {found:,} found of {len(store):,}')
+
+    entry = store.last(['MTRCMD=STOP'], SEND, before=hour)
+    started = time.perf_counter()
+    frame = store.get(entry)
+    print(f'get() of a spilled frame: {(time.perf_counter() - started) * 1e6:.0f} us -> {frame.to_msg()}')
+    store.close()
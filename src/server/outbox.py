@@ -0,0 +1,193 @@
+from typing import Dict, Any, List, Optional, Tuple
+from collections import deque
+import threading
+
+# How a command that is already pending is merged with a new one
+LATEST = 'latest'  # the new value replaces the pending one
+DEDUPE = 'dedupe'  # the new request is dropped, the pending one already covers it
+QUEUE = 'queue'  # every value is kept and sent one per frame
+
+POLICIES: Dict[str, str] = {
+    'MTRCMD': LATEST,
+    'SETMODE': LATEST,
+    'MANKEYCMD': LATEST,
+    'MANLINECMD': QUEUE,
+    'GPS': DEDUPE,
+    'IMU': DEDUPE,
+    'SUBSCRIBE': LATEST,
+}
+
+# Lower goes first in the frame
+PRIORITIES: Dict[str, int] = {
+    'MTRCMD': 1,
+    'SETMODE': 2,
+    'MANKEYCMD': 3,
+    'MANLINECMD': 4,
+    'GPS': 5,
+    'IMU': 5,
+    'SUBSCRIBE': 5,
+}
+STOP_PRIORITY: int = 0
+DEFAULT_PRIORITY: int = 6
+
+
+def format_rates(rates: Dict[str, float]) -> str:
+    """
+    SUBSCRIBE value: sensor:rate pairs such as 'GPS:5,IMU:100', rates in samples per second, 0 stops the sensor.
+    """
+    return ','.join(f'{kind}:{rate:g}' for kind, rate in rates.items())
+
+
+def parse_rates(value: str) -> Dict[str, float]:
+    """
+    Read a SUBSCRIBE value; malformed pairs are skipped.
+    """
+    rates: Dict[str, float] = {}
+    for pair in value.split(','):
+        kind, _, rate = pair.partition(':')
+        try:
+            rates[kind.strip().upper()] = max(float(rate), 0.0)
+        except ValueError:
+            continue
+    return rates
+
+
+class CommandOutbox:
+    """
+    Thread-safe outbox for commands issued by the GUI and sent by the server thread.
+
+    Commands are coalesced per name according to POLICIES and taken out as a single frame
+    ordered by priority, so a motor STOP always goes out in the next frame ahead of telemetry requests.
+    """
+
+    def __init__(self, capacity: int = 64) -> None:
+        """
+        Initialize an empty outbox.
+
+        :param capacity: Maximum number of queued values per QUEUE command; the oldest ones are dropped.
+        """
+        self.capacity: int = capacity
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Optional[str]] = {}
+        self._queued: Dict[str, deque] = {}
+        self._ready = threading.Event()
+
+        self.enqueued: int = 0
+        self.coalesced: int = 0
+        self.dropped: int = 0
+        self.sent: int = 0
+
+    def put(self, cmd: str, value: Optional[str] = None) -> None:
+        """
+        Add a command, merging it with a pending command of the same name.
+
+        :param cmd: Command name, e.g. 'MTRCMD'.
+        :param value: Command argument placed in msg_data, None for requests without one.
+        """
+        policy = POLICIES.get(cmd, LATEST)
+        with self._lock:
+            self.enqueued += 1
+            if policy == QUEUE:
+                queue = self._queued.setdefault(cmd, deque())
+                if len(queue) >= self.capacity:
+                    queue.popleft()
+                    self.dropped += 1
+                queue.append(value)
+            elif cmd in self._pending and policy == DEDUPE:
+                self.coalesced += 1
+            else:
+                if cmd in self._pending:
+                    self.coalesced += 1
+                self._pending[cmd] = value
+            self._ready.set()
+
+    def restore(self, msg: Dict[str, Any]) -> None:
+        """
+        Put back the commands of a frame that was never confirmed.
+        Commands issued since then are newer and win over the restored values.
+
+        :param msg: Frame previously returned by take().
+        """
+        with self._lock:
+            for cmd in msg.get('cmd', ()):
+                value = msg.get('msg_data', {}).get(cmd)
+                policy = POLICIES.get(cmd, LATEST)
+                if policy == QUEUE:
+                    self._queued.setdefault(cmd, deque()).appendleft(value)
+                elif cmd not in self._pending:
+                    self._pending[cmd] = value
+            if self._depth():
+                self._ready.set()
+
+    def take(self) -> Dict[str, Any]:
+        """
+        Remove everything that goes into the next frame.
+
+        :return: Message in the {'cmd': [...], 'msg_data': {...}} form expected by the client.
+        """
+        with self._lock:
+            items: List[Tuple[str, Optional[str]]] = list(self._pending.items())
+            self._pending = {}
+            for cmd, queue in self._queued.items():
+                if queue:
+                    items.append((cmd, queue.popleft()))
+            self.sent += len(items)
+            if not self._depth():
+                self._ready.clear()
+
+        items.sort(key=self._priority)
+        msg: Dict[str, Any] = {'cmd': [], 'msg_data': {}}
+        for cmd, value in items:
+            msg['cmd'].append(cmd)
+            if value is not None:
+                msg['msg_data'][cmd] = value
+        return msg
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until a command is pending or the timeout expires.
+
+        :return: True if a command is pending.
+        """
+        return self._ready.wait(timeout)
+
+    def wake(self) -> None:
+        """
+        Release a thread blocked in wait() without adding a command.
+        """
+        self._ready.set()
+
+    def clear(self) -> None:
+        """
+        Drop every pending command.
+        """
+        with self._lock:
+            self.dropped += self._depth()
+            self._pending = {}
+            self._queued = {}
+            self._ready.clear()
+
+    def depth(self) -> int:
+        """
+        Number of commands waiting to be sent.
+        """
+        with self._lock:
+            return self._depth()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Counters for the status display.
+        """
+        with self._lock:
+            return {'depth': self._depth(), 'enqueued': self.enqueued, 'coalesced': self.coalesced,
+                    'dropped': self.dropped, 'sent': self.sent}
+
+    def _depth(self) -> int:
+        return len(self._pending) + sum(len(queue) for queue in self._queued.values())
+
+    @staticmethod
+    def _priority(item: Tuple[str, Optional[str]]) -> int:
+        cmd, value = item
+        if cmd == 'MTRCMD' and value == 'STOP':
+            return STOP_PRIORITY
+        return PRIORITIES.get(cmd, DEFAULT_PRIORITY)
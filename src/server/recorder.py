@@ -0,0 +1,264 @@
+from typing import Any, Dict, Iterator, Optional, Tuple
+import itertools
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+import numpy as np
+
+from src.server.codec import Buffer, detect_codec
+
+# Directions of a recorded frame, as shown in the terminal
+RCVD: int = 0
+SEND: int = 1
+DIRECTIONS: Tuple[str, str] = ('RCVD', 'SEND')
+
+MAGIC: bytes = b'OPREC001'
+# Record header: time (start wall clock + monotonic time since), direction, vehicle (connection id), payload length
+RECORD = struct.Struct('<dBHI')
+# Time index kept next to the log: time and offset of every record
+INDEX = np.dtype([('time', '<f8'), ('offset', '<u8')])
+
+CHUNK_SIZE: int = 1 << 24  # the log file grows by this many bytes
+QUEUE_SIZE: int = 1 << 16  # frames waiting for the writer before new ones are dropped
+FLUSH_INTERVAL: float = 1.0  # s between index flushes
+
+
+class Recorder:
+    """
+    Append-only log of every frame sent or received by the server.
+
+    record() only copies the payload into a bounded queue, so the server loop never waits for the disk;
+    a background thread writes the frames into the memory-mapped log file and appends a time index
+    (<log>.idx) that Recording uses to seek. If the disk falls behind, frames are dropped and counted.
+
+    The log is created by the writer when the first frame arrives, never over an existing file: if the
+    name is taken, e.g. by a session started in the same second, a number is added to it.
+
+    Frames are stamped with the wall-clock time the recorder started plus the monotonic time since, so
+    a step of the system clock does not send times backwards, and the writer keeps them non-decreasing
+    across the threads that record, as the index is searched by time.
+    """
+
+    def __init__(self, path: Optional[str] = None, chunk_size: int = CHUNK_SIZE, directory: str = '.') -> None:
+        """
+        Start the writer thread; nothing is written to disk before the first frame.
+
+        :param path: Log file; the index is written to path + '.idx'. None to name the log after the time
+            of the first frame, <date>-<time>.oprec in `directory`.
+        :param chunk_size: Step by which the preallocated log file grows.
+        :param directory: Where a log without a path is created.
+        """
+        self.path: Optional[str] = path
+        self.directory: str = directory
+        self.chunk_size: int = chunk_size
+        self.records: int = 0
+        self.dropped: int = 0
+        self.size: int = len(MAGIC)
+        self._epoch: float = time.time() - time.monotonic()
+        self._last_time: float = 0.0
+
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+        self._index = None
+        self._queue: queue.Queue = queue.Queue(QUEUE_SIZE)
+        self._writer = threading.Thread(target=self._write_loop, name='recorder', daemon=True)
+        self._writer.start()
+
+    @classmethod
+    def for_session(cls) -> Optional['Recorder']:
+        """
+        Recorder for a new server session in RECORD_DIR (default 'records'), None if RECORD=0.
+        """
+        if os.getenv('RECORD', '1') == '0':
+            return None
+        return cls(directory=os.getenv('RECORD_DIR', 'records'))
+
+    def record(self, direction: int, payload: Buffer, vehicle: int = 0) -> None:
+        """
+        Queue a frame for writing, never blocks.
+
+        :param direction: RCVD or SEND.
+        :param payload: Encoded message without the length prefix; copied, so decoder slices may be passed.
+        :param vehicle: Connection id for servers with several vehicles.
+        """
+        try:
+            self._queue.put_nowait((self._epoch + time.monotonic(), direction, vehicle, bytes(payload)))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self) -> None:
+        """
+        Write everything still queued and cut the log to its real size.
+        """
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+
+    def stats(self) -> Dict[str, int]:
+        return {'records': self.records, 'bytes': self.size, 'queued': self._queue.qsize(), 'dropped': self.dropped}
+
+    def _write_loop(self) -> None:
+        index = []
+        flushed_at = time.monotonic()
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=FLUSH_INTERVAL)
+                except queue.Empty:
+                    item = ()
+                if item is None:
+                    break
+                if item:
+                    timestamp, direction, vehicle, payload = item
+                    # Frames of the server's reader and writer threads may be queued a few microseconds apart
+                    timestamp = self._last_time = max(timestamp, self._last_time)
+                    if self._file is None:
+                        self._open(timestamp)
+                    index.append((timestamp, self.size))
+                    self._append(RECORD.pack(timestamp, direction, vehicle, len(payload)) + payload)
+                    self.records += 1
+                if index and (not item or time.monotonic() - flushed_at >= FLUSH_INTERVAL):
+                    self._index.write(np.array(index, dtype=INDEX).tobytes())
+                    self._index.flush()
+                    index = []
+                    flushed_at = time.monotonic()
+        finally:
+            if self._file is None:
+                return
+            if index:
+                self._index.write(np.array(index, dtype=INDEX).tobytes())
+            self._index.close()
+            self._map.flush()
+            self._map.close()
+            self._file.truncate(self.size)
+            self._file.close()
+
+    def _open(self, timestamp: float) -> None:
+        """
+        Create the log file under a name no other log has.
+        """
+        if self.path is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self.path = os.path.join(self.directory, time.strftime('%Y%m%d-%H%M%S.oprec', time.localtime(timestamp)))
+        stem, extension = os.path.splitext(self.path)
+        path = self.path
+        for number in itertools.count(1):
+            try:
+                self._file = open(path, 'x+b')
+                break
+            except FileExistsError:
+                path = f'{stem}-{number}{extension}'
+        self.path = path
+        self._file.truncate(self.chunk_size)
+        self._map = mmap.mmap(self._file.fileno(), self.chunk_size)
+        self._map[:len(MAGIC)] = MAGIC
+        self._index = open(path + '.idx', 'wb')
+
+    def _append(self, data: bytes) -> None:
+        end = self.size + len(data)
+        if end > len(self._map):
+            self._map.flush()
+            self._map.close()
+            length = (end // self.chunk_size + 1) * self.chunk_size
+            self._file.truncate(length)
+            self._map = mmap.mmap(self._file.fileno(), length)
+        self._map[self.size:end] = data
+        self.size = end
+
+
+class Recording:
+    """
+    Read-only view of a log written by Recorder, memory-mapped and indexed by time.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Map the log and load its index, rebuilding it by a scan if it is missing or incomplete.
+        """
+        self.path: str = path
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f'[ERROR] - {path} is not a recording')
+
+        index = np.fromfile(path + '.idx', dtype=INDEX) if os.path.exists(path + '.idx') else np.empty(0, INDEX)
+        self.index: np.ndarray = self._scan(index)
+        # Logs written before times were kept non-decreasing may step back with the system clock
+        self.times: np.ndarray = np.maximum.accumulate(self.index['time'])
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __getitem__(self, i: int) -> Tuple[float, int, int, memoryview]:
+        """
+        Record i as (time, direction, vehicle, payload); the payload is a view into the mapped file.
+        """
+        offset = int(self.index['offset'][i])
+        timestamp, direction, vehicle, length = RECORD.unpack_from(self._map, offset)
+        start = offset + RECORD.size
+        return timestamp, direction, vehicle, memoryview(self._map)[start:start + length]
+
+    def seek(self, timestamp: float) -> int:
+        """
+        Number of the first record at or after the given time.
+        """
+        return int(np.searchsorted(self.times, timestamp))
+
+    def frames(self, start: float = -np.inf, end: float = np.inf) -> Iterator[Tuple[float, int, int, memoryview]]:
+        for i in range(self.seek(start), self.seek(end)):
+            yield self[i]
+
+    def message(self, i: int) -> Tuple[float, int, int, Dict[str, Any]]:
+        """
+        Record i with its payload decoded by the codec it was sent with.
+        """
+        timestamp, direction, vehicle, payload = self[i]
+        return timestamp, direction, vehicle, detect_codec(payload).decode(payload)
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+    def _scan(self, index: np.ndarray) -> np.ndarray:
+        """
+        Extend the index with records found after its last entry, e.g. after a crash.
+        """
+        offset = len(MAGIC)
+        if len(index):
+            _, _, _, length = RECORD.unpack_from(self._map, int(index['offset'][-1]))
+            offset = int(index['offset'][-1]) + RECORD.size + length
+        found = []
+        while offset + RECORD.size <= len(self._map):
+            timestamp, _, _, length = RECORD.unpack_from(self._map, offset)
+            end = offset + RECORD.size + length
+            if timestamp == 0 or end > len(self._map):
+                # Zero-filled preallocated tail or a torn last record
+                break
+            found.append((timestamp, offset))
+            offset = end
+        return np.concatenate((index, np.array(found, dtype=INDEX))) if found else index
+
+
+if __name__ == "__main__":
+    ## Benchmark
+    import tempfile
+    from src.server.codec import JSON_CODEC
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'session.oprec')
+        recorder = Recorder(path, chunk_size=1 << 16)
+        payload = JSON_CODEC.encode({'status': 'RESPONSE', 'cmd': [],
+                                     'msg_data': {'IMURESPONSE': 'D,s,1,3,0.012,-0.981,9.806,*41'}})
+        n = 100_000
+        started = time.perf_counter()
+        for i in range(n):
+            recorder.record(i % 2, payload)
+        queued = time.perf_counter() - started
+        recorder.close()
+        written = time.perf_counter() - started
+        print(f'record(): {queued / n * 1e6:.2f} us per frame, written {n / written:,.0f} frames/s, '
+              f'{recorder.size / 2 ** 20:.1f} MiB, dropped {recorder.dropped}')
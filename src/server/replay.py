@@ -0,0 +1,193 @@
+from typing import Optional
+from PySide6.QtCore import Signal, Slot
+import os
+import threading
+import time
+
+from src.server.codec import detect_codec
+from src.server.messages import Frame
+from src.server.recorder import RCVD, Recording
+from src.server.server import ServerSignals, ServerThread
+
+
+def speed_from_env() -> float:
+    """
+    REPLAY_SPEED: 1, 10, 100, ... times real time; 'max' or 0 plays as fast as the GUI keeps up.
+    """
+    value = os.getenv('REPLAY_SPEED', '1')
+    return 0.0 if value == 'max' else float(value)
+
+
+class ReplaySignals(ServerSignals):
+    """
+    Server signals plus the controls of a replay.
+    """
+    replay_speed = Signal(float)  # Speed factor, 0 - as fast as possible
+    replay_seek = Signal(float)  # Position from the start of the recording, s
+    replay_progress = Signal(float, float)  # Position and duration of the recording, s
+
+
+class ReplayThread(ServerThread):
+    """
+    Plays a session recorded by Recorder through the same signals a live server emits.
+
+    RCVD frames go to data_received (and telemetry_batch), SEND frames to data_sent, so the GUI
+    cannot tell a replay from a live vehicle. Frames are paced by their recorded timestamps divided by
+    the speed; with a window, at most that many frames are in flight to the GUI, which makes a
+    replay at full speed a throughput benchmark of the whole UI pipeline.
+    """
+    RECORD = False
+    SIGNALS = ReplaySignals
+    WINDOW: int = 8
+    PROGRESS_INTERVAL: float = 0.2  # s
+
+    def __init__(self, path: str, speed: Optional[float] = None, window: int = 0,
+                 vehicle: Optional[int] = None) -> None:
+        """
+        :param path: Recording (.oprec) to play.
+        :param speed: Speed factor, REPLAY_SPEED by default; 0 plays as fast as possible.
+        :param window: Frames the GUI may lag behind before the replay waits for delivered(); 0 - never wait.
+        :param vehicle: Connection id to play from a multi-vehicle recording, None - all.
+        """
+        super().__init__()
+        self.path: str = path
+        self.speed: float = speed_from_env() if speed is None else speed
+        self.vehicle: Optional[int] = vehicle
+        self.recording: Optional[Recording] = None
+        self.replayed: int = 0
+        self.elapsed: float = 0.0
+
+        self._window: Optional[threading.Semaphore] = threading.Semaphore(window) if window else None
+        self._wake = threading.Event()
+        self._seek_to: Optional[float] = None
+        self._rebase: bool = False
+
+        self.signals.replay_speed.connect(self.set_speed)
+        self.signals.replay_seek.connect(self.seek)
+
+    @Slot(float)
+    def set_speed(self, speed: float) -> None:
+        self.speed = speed
+        self._rebase = True
+        self._wake.set()
+
+    @Slot(float)
+    def seek(self, position: float) -> None:
+        """
+        Continue from the given number of seconds after the start of the recording.
+        """
+        self._seek_to = position
+        self._wake.set()
+
+    def delivered(self) -> None:
+        """
+        The GUI has processed one received frame.
+        """
+        if self._window is not None:
+            self._window.release()
+
+    def stop(self) -> None:
+        self._stopping = True
+        self._wake.set()
+
+    @ServerThread.exception_handler
+    def run(self):
+        """
+        Play the recording from the start until its end or stop().
+        """
+        self.recording = recording = Recording(self.path)
+        self.conn = recording
+        self.addr = (f'Запись {os.path.basename(self.path)}', 0)
+        self.signals.started.emit()
+        try:
+            self._play(recording)
+        finally:
+            self.conn = None
+            self.addr = None
+            recording.close()
+        print(f' [INFO] - Воспроизведено {self.replayed} кадров за {self.elapsed:.2f} с '
+              f'({self.replayed / max(self.elapsed, 1e-9):.0f} кадров/с)')
+
+    def _play(self, recording: Recording) -> None:
+        if not len(recording):
+            return
+        start = float(recording.times[0])
+        duration = float(recording.times[-1]) - start
+        started = time.perf_counter()
+        base = None  # (wall clock, recording time) the pacing is counted from
+        reported = 0.0
+        i = 0
+        while i < len(recording) and not self._stopping:
+            if self._seek_to is not None:
+                i = recording.seek(start + self._seek_to)
+                self._seek_to = None
+                base = None
+                continue
+            if self._rebase:
+                self._rebase = False
+                base = None
+
+            _, direction, vehicle, payload = recording[i]
+            timestamp = float(recording.times[i])  # non-decreasing even in older logs
+            if self.vehicle is not None and vehicle != self.vehicle:
+                payload.release()
+                i += 1
+                continue
+            if self.speed > 0:
+                if base is None:
+                    base = (time.perf_counter(), timestamp)
+                delay = base[0] + (timestamp - base[1]) / self.speed - time.perf_counter()
+                if delay > 0 and self._wake.wait(delay):
+                    # Seek, speed change or stop
+                    self._wake.clear()
+                    payload.release()
+                    continue
+
+            data = self._decode(payload, detect_codec(payload))
+            payload.release()
+            if direction == RCVD:
+                if not self._wait_for_gui():
+                    break
+                self._emit_received(self._frame(data, timestamp))
+            else:
+                self.signals.data_sent.emit(Frame.from_msg(data, timestamp=timestamp))
+            self.replayed += 1
+            i += 1
+
+            now = time.perf_counter()
+            if now - reported >= self.PROGRESS_INTERVAL:
+                reported = now
+                self.signals.replay_progress.emit(timestamp - start, duration)
+        self.elapsed = time.perf_counter() - started
+
+    def _wait_for_gui(self) -> bool:
+        """
+        Block while the GUI lags WINDOW frames behind; False if the replay was stopped meanwhile.
+        """
+        if self._window is None:
+            return True
+        while not self._window.acquire(timeout=0.5):
+            if self._stopping:
+                return False
+        return True
+
+
+if __name__ == "__main__":
+    ## Throughput of the whole UI pipeline: python -m src.server.replay <file.oprec> [speed]
+    import sys
+    from PySide6.QtCore import QTimer
+    from PySide6.QtWidgets import QApplication
+
+    os.environ['REPLAY'] = sys.argv[1]
+    os.environ['REPLAY_SPEED'] = sys.argv[2] if len(sys.argv) > 2 else 'max'
+    from src.utils.webengine import WebEngineMap
+
+    app = QApplication(sys.argv)
+    window = WebEngineMap()
+    window.show()
+    window.start_server()
+    # Quit once the replay has finished and left the thread pool
+    timer = QTimer()
+    timer.timeout.connect(lambda: window.pool.activeThreadCount() or app.quit())
+    timer.start(100)
+    app.exec()
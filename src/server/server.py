@@ -1,13 +1,35 @@
 import os
-from typing import Dict, Any, Union
+from typing import Dict, Any, List, Optional, Tuple
 from PySide6.QtCore import QRunnable, Signal, QObject, Slot
 import socket
 import select
-import json
+import itertools
+import threading
+import time
 from dotenv import load_dotenv
 
+from src.server.codec import JSON_CODEC, Buffer, detect_codec, encode_message
+from src.server.framing import HEADER_SIZE, FrameDecoder, encode_frame
+from src.server.linkhealth import LinkHealth
+from src.server.messages import Frame
+from src.server.outbox import CommandOutbox, format_rates
+from src.server.recorder import RCVD, SEND, Recorder
+from src.telemetry.batch import BATCH_KEYS, RESPONSE_KEYS, TelemetryBatch
+from src.telemetry.parser import parse_sentences
+
 load_dotenv()
 
+
+class VehicleReconnected(ConnectionError):
+    """
+    Raised while serving a connection when the same vehicle connects again, which means the old link is dead.
+    """
+    def __init__(self, conn: socket.socket, addr: Any) -> None:
+        super().__init__(f" [ERROR] - Клиент {addr[0]} переподключился\n")
+        self.conn = conn
+        self.addr = addr
+
+
 class ServerSignals(QObject):
     """
     Defines signals for different actions or events that occur in the server.
@@ -15,11 +37,18 @@ class ServerSignals(QObject):
     started = Signal()
     stoped = Signal()
     connection_timeout = Signal()
-    data_received = Signal(dict)
-    data_sent = Signal(dict)
+    reconnected = Signal(float)  # Time the vehicle was away, ms
+    data_received = Signal(object)  # Frame
+    data_sent = Signal(object)  # Frame
+    telemetry_batch = Signal(object)  # TelemetryBatch, one per batch of samples
+
+    client_connected = Signal(int, str)  # Connection id, client address
+    client_disconnected = Signal(int)  # Connection id
+    select_conn = Signal(int)  # Route GUI commands to the connection
 
     get_gps = Signal()  # Request GPS
     get_imu = Signal()  # Request IMU
+    subscribe = Signal(str, float)  # Push telemetry: sensor, samples per second (0 - stop)
 
     set_mode = Signal(str)  # Set Mode
     mtr_cmd = Signal(str)  # Control Motor Command
@@ -30,22 +59,52 @@ class ServerThread(QRunnable):
     """
     Separate thread class for the server.
     """
+    KEEPALIVE: float = 1  # Idle interval of the pipelined writer, s
+    RECORD: bool = True  # Write the session log
+    SIGNALS = ServerSignals
     def __init__(self):
         """
         Initialize the server thread with default values.
         """
         super().__init__()
-        self.snd_msg: Dict[str, Union[list, Dict[str, Any]]] = {'cmd': [], 'msg_data': {}}
+        self.outbox: CommandOutbox = CommandOutbox()
 
         self.HOST: str = os.getenv("SERVER_HOST")
         self.PORT: int = 12345
         self.conn = None
         self.addr = None
-        self.no_ro_resp_counts: int = 0
+        self.health: LinkHealth = LinkHealth()
+        self.decoder: FrameDecoder = FrameDecoder()
+        self.codec = JSON_CODEC
+
+        # Pipelined mode: commands are written as soon as they are enqueued and replies are matched by 'ack'
+        self.pipelined: bool = os.getenv("SERVER_PIPELINED") == "1"
+        self.in_flight: Dict[int, Tuple[float, Dict[str, Any]]] = {}
+        self.last_rtt: float = 0.0
+        self._seq = itertools.count(1)
+        self._last_seq: int = 0
+        self._peer_seq: Optional[int] = None  # Latest 'seq' of the vehicle, acknowledged in the next frame
+        self._flight_lock = threading.Lock()
+        self._writing: bool = False
+
+        # Session kept across reconnects of the same vehicle
+        self.listener = None
+        self.session_mode = None
+        # Replaced, never changed in place, so the server thread can read it while the GUI subscribes
+        self.subscriptions: Dict[str, float] = {}
+        self.reconnecting: bool = False
+        self.reconnects: int = 0
+        self.reconnect_time: float = 0.0
+        self.last_rx: float = 0.0
+        self._stopping: bool = False
+
+        # Every frame sent and received goes to the session log
+        self.recorder: Optional[Recorder] = Recorder.for_session() if self.RECORD else None
 
-        self.signals = ServerSignals()
+        self.signals = self.SIGNALS()
         self.signals.get_gps.connect(self.get_gps)
         self.signals.get_imu.connect(self.get_imu)
+        self.signals.subscribe.connect(self.subscribe)
         self.signals.set_mode.connect(self.set_mode)
         self.signals.mtr_cmd.connect(self.mtr_cmd)
         self.signals.man_commandline.connect(self.man_commandline)
@@ -71,6 +130,8 @@ class ServerThread(QRunnable):
             except RuntimeError as e:
                 print(e)
             finally:
+                if self.recorder is not None:
+                    self.recorder.close()
                 self.signals.stoped.emit()
 
         return wrapper
@@ -79,96 +140,379 @@ class ServerThread(QRunnable):
         """
         Append GPS to command.
         """
-        self.snd_msg["cmd"].append("GPS")
+        self.outbox.put("GPS")
 
     def get_imu(self):
         """
         Append IMU to command.
         """
-        self.snd_msg["cmd"].append("IMU")
+        self.outbox.put("IMU")
+
+    @Slot(str, float)
+    def subscribe(self, kind: str, rate: float):
+        """
+        Ask the vehicle to push a sensor at the given rate until told otherwise.
+        The whole subscription goes in one SUBSCRIBE, so a later change replaces a pending one.
+        """
+        subscriptions = {**self.subscriptions, kind: rate}
+        self.subscriptions = subscriptions
+        self.outbox.put("SUBSCRIBE", format_rates(subscriptions))
 
     @Slot(object)
     def set_mode(self, mode: str):
         """
         Set mode command with the provided mode.
         """
-        self.snd_msg["cmd"].append("SETMODE")
-        self.snd_msg['msg_data']['SETMODE'] = mode
+        self.session_mode = mode
+        self.outbox.put("SETMODE", mode)
 
     @Slot(object)
     def mtr_cmd(self, cmd: str):
         """
         Handle motor command.
         """
-        self.snd_msg["cmd"].append("MTRCMD")
-        self.snd_msg['msg_data']['MTRCMD'] = cmd
+        self.outbox.put("MTRCMD", cmd)
 
     @Slot(object)
     def man_commandline(self, cmd: str):
         """
         Assign manual command line.
         """
-        if "MANLINECMD" not in self.snd_msg["cmd"]:
-            self.snd_msg["cmd"].append("MANLINECMD")
-            self.snd_msg['msg_data']['MANLINECMD'] = cmd
+        self.outbox.put("MANLINECMD", cmd)
 
     @Slot(object)
     def man_key_control(self, cmds: str):
         """
         Handle manual key control.
         """
-        if "MANKEYCMD" not in self.snd_msg["cmd"]:
-            self.snd_msg["cmd"].append("MANKEYCMD")
-            self.snd_msg['msg_data']['MANKEYCMD'] = cmds
+        self.outbox.put("MANKEYCMD", cmds)
+
+    def stop(self) -> None:
+        """
+        Shut down the client connection, which ends the server loop.
+        """
+        self._stopping = True
+        if self.reconnecting:
+            return
+        self.conn.shutdown(0)
+        self.conn = None
+        self.addr = None
 
     @exception_handler
     def run(self):
         """
         Create a new server socket and listen to incoming connections.
+        The socket stays open so the same vehicle can come back and resume its session.
         """
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             s.settimeout(5)
             s.bind((self.HOST, self.PORT))
             s.listen()
+            self.listener = s
+            self._stopping = False
 
             self.conn, self.addr = s.accept()
+            self.last_rx = time.monotonic()
+            self.signals.started.emit()
+            while True:
+                try:
+                    self._serve(self.conn)
+                except VehicleReconnected as e:
+                    self._resume(e.conn, e.addr)
+                except (ConnectionError, TimeoutError) as e:
+                    if self._stopping:
+                        return
+                    print(e)
+                    host = self.addr[0]
+                    self.conn = None
+                    conn, addr = self._wait_for_vehicle(s, host)
+                    self._resume(conn, addr)
+
+    def _serve(self, conn: socket.socket) -> None:
+        """
+        Exchange data with the connected vehicle until the link breaks.
+        """
+        self.decoder.reset()
+        self.codec = JSON_CODEC
+        # A lockstep vehicle answers on its own schedule, so only pipelined acks measure the round trip
+        self.health.response_interval = not self.pipelined
+        self.health.on_connect()
+        with conn:
+            if self.pipelined:
+                self._run_pipelined(conn)
+            else:
+                self._run_lockstep(conn)
+
+    def _wait_for_vehicle(self, s: socket.socket, host: str) -> Tuple[socket.socket, Any]:
+        """
+        Keep listening for the vehicle that dropped out; other clients are turned away.
+        """
+        _RECONNECT_WINDOW = float(os.getenv("RECONNECT_WINDOW", 10))
+        _POLL = 0.2
+        deadline = time.monotonic() + _RECONNECT_WINDOW
+        self.reconnecting = True
+        try:
+            while time.monotonic() < deadline:
+                if self._stopping:
+                    raise ConnectionAbortedError(" [ERROR] - Сервер остановлен\n")
+                s.settimeout(min(_POLL, max(deadline - time.monotonic(), 0.001)))
+                try:
+                    conn, addr = s.accept()
+                except TimeoutError:
+                    continue
+                if addr[0] == host:
+                    return conn, addr
+                conn.close()
+            raise TimeoutError(f" [ERROR] - Клиент {host} не переподключился за {_RECONNECT_WINDOW} секунд!\n")
+        finally:
+            self.reconnecting = False
+
+    def _resume(self, conn: socket.socket, addr: Any) -> None:
+        """
+        Continue the session on the new connection: replay what the vehicle did not confirm and restore the mode
+        and the telemetry subscription.
+        The reconnect time is counted from the last data received over the old link.
+        """
+        self.conn, self.addr = conn, addr
+        self.reconnect_time = time.monotonic() - self.last_rx
+        self.reconnects += 1
+
+        with self._flight_lock:
+            unacked = [msg for _, msg in self.in_flight.values()]
+            self.in_flight.clear()
+        for msg in reversed(unacked):
+            self.outbox.restore(msg)
+        if self.session_mode is not None:
+            self.outbox.restore({'cmd': ['SETMODE'], 'msg_data': {'SETMODE': self.session_mode}})
+        subscriptions = self.subscriptions
+        if any(subscriptions.values()):
+            self.outbox.restore({'cmd': ['SUBSCRIBE'], 'msg_data': {'SUBSCRIBE': format_rates(subscriptions)}})
 
-            with self.conn:
-                self.signals.started.emit()
-                while True:
-                    raw_data = self._get_data(self.conn)
+        print(f' [INFO] - Клиент {addr[0]} переподключился за {self.reconnect_time * 1000:.0f} мс')
+        self.signals.reconnected.emit(self.reconnect_time * 1000)
+
+    def _run_lockstep(self, conn: socket.socket) -> None:
+        """
+        Answer every read from the client with the commands pending at that moment.
+        Nothing is sent while the client is silent: the vehicle only gets one reply per frame it sent.
+        """
+        while True:
+            frames = self._get_data(conn)
+            if not frames:
+                continue
+            # Any reply confirms the frames sent before it
+            self._acknowledge(self._last_seq)
+            for raw_data in frames:
+                data = self._parse_data(raw_data)
+                self._note_peer_seq(data)
+                self._emit_received(self._frame(data))
+
+            snd_msg = self.outbox.take()
+            self._add_ack(snd_msg)
+            self._track(snd_msg)
+            self._send_data(conn, snd_msg)
+            self.signals.data_sent.emit(Frame.from_msg(snd_msg))
+
+    def _run_pipelined(self, conn: socket.socket) -> None:
+        """
+        Read replies in this thread while a writer thread sends commands as soon as they are enqueued.
+        """
+        self.in_flight.clear()
+        self._writing = True
+        writer = threading.Thread(target=self._write_loop, args=(conn,), daemon=True)
+        writer.start()
+        try:
+            while True:
+                for raw_data in self._get_data(conn):
                     data = self._parse_data(raw_data)
-                    self.signals.data_received.emit(data)
+                    self._acknowledge(data.get('ack'))
+                    if self._note_peer_seq(data):
+                        # Answer at once so the vehicle can time the round trip
+                        self.outbox.wake()
+                    self._emit_received(self._frame(data))
+        finally:
+            self._writing = False
+            self.outbox.wake()
+            writer.join()
+
+    def _write_loop(self, conn: socket.socket) -> None:
+        """
+        Send pending commands right away; an empty frame goes out as keep-alive when the outbox stays idle.
+        """
+        while self._writing:
+            self.outbox.wait(self.KEEPALIVE)
+            if not self._writing:
+                break
+            snd_msg = self.outbox.take()
+            snd_msg['seq'] = self._track(snd_msg)
+            self._add_ack(snd_msg)
+            try:
+                self._send_data(conn, snd_msg)
+            except OSError as e:
+                print(f'[ERROR] - Unable to send the data: {e}')
+                # Wake the reader so the connection is torn down in one place
+                try:
+                    conn.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+                return
+            self.signals.data_sent.emit(Frame.from_msg(snd_msg))
+
+    def _track(self, msg: Dict[str, Any]) -> int:
+        """
+        Remember a frame until the vehicle confirms it.
+
+        :return: Sequence number of the frame.
+        """
+        _MAX_IN_FLIGHT = 256
+        seq = next(self._seq)
+        with self._flight_lock:
+            if len(self.in_flight) >= _MAX_IN_FLIGHT:
+                self.in_flight.pop(next(iter(self.in_flight)))
+            self.in_flight[seq] = (time.monotonic(), msg)
+            self._last_seq = seq
+        return seq
+
+    def _acknowledge(self, ack: Any) -> None:
+        """
+        Drop every frame up to the acknowledged one and measure the round trip.
+        """
+        if not isinstance(ack, int):
+            return
+        with self._flight_lock:
+            sent = self.in_flight.get(ack)
+            if sent is not None:
+                self.last_rtt = time.monotonic() - sent[0]
+                self.health.on_rtt(self.last_rtt)
+            for seq in [seq for seq in self.in_flight if seq <= ack]:
+                del self.in_flight[seq]
 
-                    self._send_data(self.conn)
-                    self.signals.data_sent.emit(self.snd_msg)
-                    self.snd_msg = {'cmd': [], 'msg_data': {}}
+    def _note_peer_seq(self, data: Dict[str, Any]) -> bool:
+        """
+        Remember the sequence number of a vehicle frame to acknowledge it.
+
+        :return: True if the frame had one.
+        """
+        seq = data.get('seq')
+        if not isinstance(seq, int):
+            return False
+        with self._flight_lock:
+            self._peer_seq = seq
+        return True
+
+    def _add_ack(self, msg: Dict[str, Any]) -> None:
+        """
+        Acknowledge the latest vehicle frame in an outgoing message.
+        """
+        with self._flight_lock:
+            ack, self._peer_seq = self._peer_seq, None
+        if ack is not None:
+            msg['ack'] = ack
 
-    def _get_data(self, conn: socket.socket) -> str:
-        _TIMEOUT = 5
-        _CTIMEOUT = 3
+    def _get_data(self, conn: socket.socket) -> List[memoryview]:
+        """
+        Wait for the client and return every complete frame received in one read.
+        Frames are slices of the decoder buffer and are valid until the next call.
+        The wait follows the link's current RTO; the link is declared dead after several misses in a row.
+        """
         if conn:
-            ready = select.select([conn], [], [], _TIMEOUT)
-            if ready[0]:
-                self.no_ro_resp_counts = 0
-                raw_data = conn.recv(1024).decode()
-                return raw_data
+            watched = [conn] if self.listener is None else [conn, self.listener]
+            # A pipelined vehicle may stay silent until the next keep-alive
+            timeout = self.health.rto + (self.KEEPALIVE if self.pipelined else 0)
+            ready = select.select(watched, [], [], timeout)
+            if self.listener in ready[0]:
+                self._check_reconnect()
+            if conn in ready[0]:
+                frames = self.decoder.recv_into(conn)
+                self.last_rx = time.monotonic()
+                self.health.on_reply(sum(len(frame) + HEADER_SIZE for frame in frames))
+                return frames
 
-            else:
-                self.no_ro_resp_counts += 1
-                if self.no_ro_resp_counts >= _CTIMEOUT:
+            elif not ready[0]:
+                self.health.on_timeout()
+                if self.health.is_dead():
                     raise ConnectionError(
-                        f" [ERROR] - Нет ответа от клиента в течение {self.no_ro_resp_counts * _TIMEOUT} секунд!\n")
+                        f" [ERROR] - Нет ответа от клиента в течение {time.monotonic() - self.last_rx:.1f} секунд!\n")
+        return []
+
+    def _emit_received(self, frame: Frame) -> None:
+        """
+        Publish a received frame; every batch of samples in it goes out as a single signal.
+        """
+        for batch in frame.batches:
+            self.signals.telemetry_batch.emit(batch)
+        self.signals.data_received.emit(frame)
+
+    @staticmethod
+    def _frame(data: Dict[str, Any], timestamp: Optional[float] = None) -> Frame:
+        """
+        Build the Frame handed to the GUI, decoding its telemetry here rather than in the GUI thread.
+        Batched sentences are replaced by their columns in the message; single responses stay text for the terminal.
+        Batches without a usable sample are left in the message but not handed on as telemetry.
+        """
+        msg_data = data.get('msg_data')
+        batches: List[TelemetryBatch] = []
+        if isinstance(msg_data, dict):
+            for key, kind in BATCH_KEYS.items():
+                value = msg_data.get(key)
+                if isinstance(value, list):
+                    value = msg_data[key] = TelemetryBatch.from_sentences(kind, value)
+                if isinstance(value, TelemetryBatch) and len(value):
+                    batches.append(value)
+            sentences = [msg_data[key] for key in RESPONSE_KEYS if isinstance(msg_data.get(key), str)]
+            if sentences:
+                for kind, records in parse_sentences(sentences).items():
+                    if len(records):
+                        batches.append(TelemetryBatch.from_records(kind, records))
+        return Frame.from_msg(data, tuple(batches), timestamp)
+
+    def _check_reconnect(self) -> None:
+        """
+        Accept a connection that arrived while serving: the same vehicle replaces its dead link, others are turned away.
+        """
+        self.listener.settimeout(0)
+        try:
+            conn, addr = self.listener.accept()
+        except (BlockingIOError, TimeoutError):
+            return
+        if self.addr is not None and addr[0] == self.addr[0]:
+            raise VehicleReconnected(conn, addr)
+        conn.close()
 
-    def _parse_data(self, raw_data: str) -> Dict[str, Any]:
+    def _parse_data(self, raw_data: Buffer) -> Dict[str, Any]:
+        """
+        Decode a frame and answer the client with the codec it uses from now on.
+        """
+        self._record(RCVD, raw_data)
+        self.codec = detect_codec(raw_data)
+        return self._decode(raw_data, self.codec)
+
+    @staticmethod
+    def _decode(raw_data: Buffer, codec) -> Dict[str, Any]:
         try:
-            data = json.loads(raw_data)
-        except json.JSONDecodeError as e:
+            data = codec.decode(raw_data)
+        except ValueError as e:
             print(f'[ERROR] - Unable to parse the raw data: {e}')
             data = {}
         return data
 
-    def _send_data(self, conn: socket.socket):
-        self.data_to_resp = json.dumps(self.snd_msg).encode()
+    def _serialize(self, msg: Dict[str, Any], codec=None) -> bytes:
+        """
+        Encode an outgoing message into a frame with the negotiated codec.
+        """
+        return encode_frame(encode_message(msg, codec or self.codec))
+
+    def _send_data(self, conn: socket.socket, msg: Dict[str, Any]):
+        self.data_to_resp = self._serialize(msg)
         if conn is not None:
             conn.sendall(self.data_to_resp)
+            self.health.on_sent(len(self.data_to_resp))
+            self._record(SEND, memoryview(self.data_to_resp)[HEADER_SIZE:])
+
+    def _record(self, direction: int, payload: Buffer, conn_id: int = 0) -> None:
+        """
+        Append a frame payload to the session log, if recording is on.
+        """
+        if self.recorder is not None:
+            self.recorder.record(direction, payload, conn_id)
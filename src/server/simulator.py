@@ -0,0 +1,311 @@
+from typing import Deque, Dict, Any, List, Optional, Tuple
+from collections import deque
+import argparse
+import itertools
+import os
+import random
+import socket
+import threading
+import time
+
+from src.server.codec import BINARY_CODEC, JSON_CODEC, detect_codec, encode_message
+from src.server.framing import FrameDecoder, encode_frame
+from src.server.outbox import parse_rates
+from src.telemetry.checksum import checksum
+
+
+class SimulatedVehicle(threading.Thread):
+    """
+    Vehicle that connects to the operator server and behaves like the firmware.
+
+    It answers GPS/IMU requests and SETMODE/MTRCMD/MANKEYCMD/MANLINECMD commands, streams
+    GPS ("D,s,1,1...") and IMU ("D,s,1,3...") sentences at the configured or SUBSCRIBEd rates, and can
+    drop frames and add latency to emulate the radio link. With --legacy it ignores SUBSCRIBE like
+    firmware that only answers requests.
+
+    Every frame carries a 'seq'; the server answers with its 'ack', so the latency from a frame to its
+    answer is measured the same way in lockstep and pipelined mode.
+    """
+
+    def __init__(self, index: int, args: argparse.Namespace) -> None:
+        """
+        :param index: Number of the vehicle, used to spread the simulated positions.
+        :param args: Command line options of the simulator.
+        """
+        super().__init__(daemon=True)
+        self.index: int = index
+        self.args = args
+        self.codec = BINARY_CODEC if args.codec == 'binary' else JSON_CODEC
+        self.random = random.Random(args.seed + index)
+        self.running: bool = True
+
+        self.latitude: float = 5520.0459 + index * 0.01
+        self.longitude: float = 2047.5840
+        self.mode: Optional[str] = None
+        self.motor: Optional[str] = None
+        self.last_seq: Optional[int] = None
+        self._seq = itertools.count(1)
+        # Frames sent and not answered yet, oldest first: (seq, send time)
+        self._unanswered: Deque[Tuple[int, float]] = deque()
+        self.rates: Dict[str, float] = {'GPS': args.gps_rate, 'IMU': args.imu_rate}
+        self._answers: Dict[str, str] = {}
+
+        self.frames_sent: int = 0
+        self.frames_received: int = 0
+        self.frames_dropped: int = 0
+        self.bytes_sent: int = 0
+        self.bytes_received: int = 0
+        self.samples_sent: int = 0
+        self.latencies: List[float] = []
+        self.error: Optional[str] = None
+
+    def gps_sentence(self) -> str:
+        self.latitude += self.random.uniform(-0.0005, 0.0005)
+        self.longitude += self.random.uniform(-0.0005, 0.0005)
+        body = (f"D,s,1,1,{self.latitude:.4f},N,{self.longitude:.4f},E,{self.random.uniform(10, 20):.1f},"
+                f"{time.strftime('%H%M%S')},{self.random.uniform(0, 360):.3f},{self.random.uniform(0, 60):.3f},")
+        return self._corrupt(f'{body}*{checksum(body)}')
+
+    def imu_sentence(self) -> str:
+        body = (f"D,s,1,3,{self.random.gauss(0, 0.05):.3f},{self.random.gauss(0, 0.05):.3f},"
+                f"{self.random.gauss(9.806, 0.05):.3f},")
+        return self._corrupt(f'{body}*{checksum(body)}')
+
+    def _corrupt(self, sentence: str) -> str:
+        """
+        Flip one digit of the values to emulate a bit error on the radio link.
+        """
+        if self.random.random() >= self.args.corrupt:
+            return sentence
+        pos = self.random.choice([i for i, char in enumerate(sentence[8:sentence.rindex('*')], 8) if char.isdigit()])
+        return f'{sentence[:pos]}{(int(sentence[pos]) + 1) % 10}{sentence[pos + 1:]}'
+
+    def run(self) -> None:
+        try:
+            with socket.create_connection((self.args.host, self.args.port), timeout=self.args.timeout) as conn:
+                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                if self.args.pipelined:
+                    self._run_pipelined(conn)
+                else:
+                    self._run_lockstep(conn)
+        except OSError as e:
+            self.error = str(e)
+
+    def _run_lockstep(self, conn: socket.socket) -> None:
+        """
+        Send a frame, wait for the server's answer, repeat at the frame rate.
+        """
+        decoder = FrameDecoder()
+        schedule = self._schedule()
+        while self.running:
+            if not self._send(conn, self._next_frame(schedule)):
+                continue
+            frames: List[memoryview] = []
+            while not frames:
+                frames = decoder.recv_into(conn)
+            self._delay()
+            for frame in frames:
+                self._handle(frame)
+
+    def _run_pipelined(self, conn: socket.socket) -> None:
+        """
+        Send frames at the frame rate while a reader thread handles whatever the server pushes.
+        """
+        reader = threading.Thread(target=self._read_loop, args=(conn,), daemon=True)
+        reader.start()
+        schedule = self._schedule()
+        while self.running and reader.is_alive():
+            self._send(conn, self._next_frame(schedule))
+
+    def _read_loop(self, conn: socket.socket) -> None:
+        decoder = FrameDecoder()
+        try:
+            while self.running:
+                frames = decoder.recv_into(conn)
+                self._delay()
+                for frame in frames:
+                    self._handle(frame)
+        except OSError as e:
+            self.error = str(e)
+
+    def _schedule(self) -> Dict[str, float]:
+        now = time.perf_counter()
+        return {'frame': now, 'GPS': now, 'IMU': now}
+
+    def _next_frame(self, schedule: Dict[str, float]) -> Dict[str, Any]:
+        """
+        Sleep until the next frame is due and collect the samples produced meanwhile.
+        """
+        frame_period = 1 / self.args.frame_rate
+        schedule['frame'] += frame_period
+        pause = schedule['frame'] - time.perf_counter()
+        if pause > 0:
+            time.sleep(pause)
+        now = time.perf_counter()
+
+        msg_data: Dict[str, Any] = dict(self._answers)
+        self._answers = {}
+        for kind, make in (('GPS', self.gps_sentence), ('IMU', self.imu_sentence)):
+            rate = self.rates.get(kind, 0)
+            if rate <= 0:
+                schedule[kind] = now
+                continue
+            samples = []
+            while schedule[kind] <= now:
+                samples.append(make())
+                schedule[kind] += 1 / rate
+            if not samples:
+                continue
+            self.samples_sent += len(samples)
+            if len(samples) == 1:
+                msg_data[f'{kind}RESPONSE'] = samples[0]
+            else:
+                msg_data[f'{kind}BATCH'] = samples
+
+        msg: Dict[str, Any] = {'status': 'RESPONSE', 'cmd': [], 'msg_data': msg_data, 'seq': next(self._seq)}
+        if self.last_seq is not None:
+            msg['ack'] = self.last_seq
+        if self.args.payload:
+            msg['pad'] = 'x' * self.args.payload
+        return msg
+
+    def _send(self, conn: socket.socket, msg: Dict[str, Any]) -> bool:
+        """
+        Write a frame unless the simulated link loses it.
+        """
+        if self.random.random() < self.args.loss:
+            self.frames_dropped += 1
+            return False
+        self._unanswered.append((msg['seq'], time.perf_counter()))
+        self._delay()
+        frame = encode_frame(encode_message(msg, self.codec))
+        conn.sendall(frame)
+        self.frames_sent += 1
+        self.bytes_sent += len(frame)
+        return True
+
+    def _delay(self) -> None:
+        """
+        One-way latency of the simulated link.
+        """
+        if self.args.latency or self.args.jitter:
+            time.sleep(max(0.0, self.random.gauss(self.args.latency, self.args.jitter)) / 2000)
+
+    def _handle(self, frame: memoryview) -> None:
+        """
+        React to a frame from the server like the firmware does.
+        """
+        self.frames_received += 1
+        self.bytes_received += len(frame) + 4
+        try:
+            msg = detect_codec(frame).decode(frame)
+        except ValueError:
+            return
+        if 'seq' in msg:
+            self.last_seq = msg['seq']
+        if isinstance(msg.get('ack'), int):
+            self._answered(msg['ack'])
+        msg_data = msg.get('msg_data', {})
+        for cmd in msg.get('cmd', []):
+            if cmd == 'GPS':
+                self._answers['GPSRESPONSE'] = self.gps_sentence()
+                self.samples_sent += 1
+            elif cmd == 'IMU':
+                self._answers['IMURESPONSE'] = self.imu_sentence()
+                self.samples_sent += 1
+            elif cmd == 'SETMODE':
+                self.mode = msg_data.get(cmd)
+                self._answers['INFO'] = f'SETMODE {self.mode} OK'
+            elif cmd == 'MTRCMD':
+                self.motor = msg_data.get(cmd)
+                self._answers['INFO'] = f'MTRCMD {self.motor} OK'
+            elif cmd == 'SUBSCRIBE' and not self.args.legacy:
+                self.rates.update(parse_rates(msg_data.get(cmd, '')))
+                self._answers['INFO'] = f'SUBSCRIBE {msg_data.get(cmd)} OK'
+            elif cmd in ('MANKEYCMD', 'MANLINECMD'):
+                self._answers['INFO'] = f'{cmd} OK'
+
+
+    def _answered(self, ack: int) -> None:
+        """
+        Take the latency of the acknowledged frame; older frames the server skipped are forgotten.
+        """
+        now = time.perf_counter()
+        while self._unanswered and self._unanswered[0][0] <= ack:
+            seq, sent_at = self._unanswered.popleft()
+            if seq == ack:
+                self.latencies.append(now - sent_at)
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+def report(vehicles: List[SimulatedVehicle], elapsed: float) -> str:
+    """
+    Throughput and latency summary over all vehicles.
+    """
+    latencies = [latency * 1000 for vehicle in vehicles for latency in vehicle.latencies]
+    sent = sum(vehicle.frames_sent for vehicle in vehicles)
+    received = sum(vehicle.frames_received for vehicle in vehicles)
+    dropped = sum(vehicle.frames_dropped for vehicle in vehicles)
+    samples = sum(vehicle.samples_sent for vehicle in vehicles)
+    traffic = sum(vehicle.bytes_sent + vehicle.bytes_received for vehicle in vehicles)
+    lines = [
+        f'vehicles: {len(vehicles)}, duration: {elapsed:.1f} s',
+        f'frames sent: {sent} ({sent / elapsed:.1f}/s), received: {received} ({received / elapsed:.1f}/s), '
+        f'dropped by simulated loss: {dropped}',
+        f'samples: {samples} ({samples / elapsed:.1f}/s), traffic: {traffic / elapsed / 1024:.1f} KB/s',
+    ]
+    if latencies:
+        lines.append(f'latency from a frame to its ack, ms: p50 {percentile(latencies, 50):.2f}, p90 {percentile(latencies, 90):.2f}, '
+                     f'p99 {percentile(latencies, 99):.2f}, max {max(latencies):.2f}')
+    for vehicle in vehicles:
+        if vehicle.error:
+            lines.append(f'vehicle {vehicle.index}: {vehicle.error}')
+    return '\n'.join(lines)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Vehicle simulator and load generator for the operator server')
+    parser.add_argument('--host', default=os.getenv('SERVER_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=12345)
+    parser.add_argument('--clients', type=int, default=1,
+                        help='concurrent vehicles; more than one needs SERVER_ENGINE=async on the server')
+    parser.add_argument('--frame-rate', type=float, default=10, help='frames per second sent by each vehicle')
+    parser.add_argument('--gps-rate', type=float, default=0, help='GPS samples per second pushed from the start, SUBSCRIBE changes it')
+    parser.add_argument('--imu-rate', type=float, default=0, help='IMU samples per second pushed from the start, SUBSCRIBE changes it')
+    parser.add_argument('--payload', type=int, default=0, help='padding bytes added to every frame')
+    parser.add_argument('--codec', choices=('json', 'binary'), default='json')
+    parser.add_argument('--pipelined', action='store_true', help='do not wait for an answer to every frame')
+    parser.add_argument('--legacy', action='store_true', help='ignore SUBSCRIBE, answer GPS/IMU requests only')
+    parser.add_argument('--loss', type=float, default=0, help='probability to lose an outgoing frame')
+    parser.add_argument('--corrupt', type=float, default=0, help='probability to flip a byte of a sentence')
+    parser.add_argument('--latency', type=float, default=0, help='simulated round-trip latency, ms')
+    parser.add_argument('--jitter', type=float, default=0, help='standard deviation of the latency, ms')
+    parser.add_argument('--duration', type=float, default=10, help='seconds to run')
+    parser.add_argument('--timeout', type=float, default=30, help='socket timeout, s')
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    vehicles = [SimulatedVehicle(i, args) for i in range(args.clients)]
+    started = time.perf_counter()
+    for vehicle in vehicles:
+        vehicle.start()
+    try:
+        time.sleep(args.duration)
+    except KeyboardInterrupt:
+        pass
+    for vehicle in vehicles:
+        vehicle.running = False
+    print(report(vehicles, time.perf_counter() - started))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+from typing import Dict, List, Optional, Tuple
+import time
+import numpy as np
+
+from src.telemetry.schema import REGISTRY, Field
+
+# Fields and headers of every registered sentence type; the registry keeps these up to date
+COLUMNS: Dict[str, Tuple[Field, ...]] = REGISTRY.columns
+HEADERS: Dict[str, str] = REGISTRY.headers
+# Message keys that carry several samples of one sensor (GPSBATCH) or a single one (GPSRESPONSE)
+BATCH_KEYS: Dict[str, str] = REGISTRY.batch_keys
+RESPONSE_KEYS: Dict[str, str] = REGISTRY.response_keys
+
+
+class TelemetryBatch:
+    """
+    Samples of one sensor received in a single frame, stored column by column.
+    """
+
+    def __init__(self, kind: str, columns: Dict[str, np.ndarray]) -> None:
+        """
+        :param kind: Sensor type, e.g. 'GPS' or 'IMU'.
+        :param columns: One array per field, all of the same length.
+        """
+        self.kind: str = kind
+        self.columns: Dict[str, np.ndarray] = columns
+        # Batches are shared with the GUI thread
+        for column in columns.values():
+            column.flags.writeable = False
+        self.received_at: float = time.monotonic()  # not wall-clock, so a clock step can not reorder history
+
+    def __len__(self) -> int:
+        for column in self.columns.values():
+            return len(column)
+        return 0
+
+    def __str__(self) -> str:
+        return f'{len(self)} samples'
+
+    def last(self) -> Optional[tuple]:
+        """
+        Latest sample of the batch as the sensor's sample type, e.g. ImuSample(axl_x=..., axl_y=..., axl_z=...),
+        or None if the batch is empty.
+        """
+        if not len(self):
+            return None
+        return REGISTRY[self.kind].sample(*[column[-1] for column in self.columns.values()])
+
+    @classmethod
+    def from_sentences(cls, kind: str, sentences: List[str]) -> 'TelemetryBatch':
+        """
+        Decode text sentences of one sensor into columns. Sentences of another type or with a wrong
+        number of fields are skipped.
+
+        :param kind: Sensor type, e.g. 'GPS' or 'IMU'.
+        :param sentences: Sentences such as "D,s,1,3,0.012,-0.981,9.806,*41".
+        """
+        from src.telemetry.parser import parse_sentences
+        return cls.from_records(kind, parse_sentences(sentences)[kind])
+
+    @classmethod
+    def from_records(cls, kind: str, records: np.ndarray) -> 'TelemetryBatch':
+        """
+        Wrap a structured array (e.g. unpacked from a binary frame) without copying numeric columns.
+
+        Records are not checksummed or counted in COUNTERS: a binary record carries numbers, not the text
+        the checksum was computed over, and its frame is already checked by its length and layout.
+        """
+        columns = {}
+        for name, dtype in COLUMNS[kind]:
+            column = records[name]
+            columns[name] = column.astype(dtype) if column.dtype.kind == 'S' else column
+        return cls(kind, columns)
@@ -0,0 +1,124 @@
+from typing import Callable, Dict, List, Optional, Sequence
+import os
+import threading
+import numpy as np
+
+# UNVERIFIED HOOK. The firmware's checksum algorithm is not known, so none is assumed here: its documented
+# sentences ("D,s,1,1,5520.0459,...,*73", "D,s,1,3,0.012,...,*41") match neither a CRC-8 nor an XOR of the bytes.
+# Until ALGORITHM is set validate() only checks that a sentence ends in '*' and a decimal number. Set it to the
+# firmware's function of the bytes before '*' once it is confirmed, together with a test vector taken from real
+# vehicle output in tests/test_checksum.py. TELEMETRY_CHECKSUM=1 turns the check on.
+ALGORITHM: Optional[Callable[[bytes], int]] = None
+CHECKSUM_ENABLED: bool = os.getenv('TELEMETRY_CHECKSUM', '0') == '1'
+
+VALID: int = 0
+CORRUPT: int = 1
+MALFORMED: int = 2
+STATUSES = ('valid', 'corrupt', 'malformed')
+
+NEWLINE: int = ord('\n')
+STAR: int = ord('*')
+MAX_DIGITS: int = 3  # the documented sentences write one byte
+
+# Below this many sentences the per-sentence loop is faster than the column-wise NumPy pass
+VECTOR_THRESHOLD: int = 16
+
+
+def checksum(body: str) -> int:
+    """
+    Checksum to write after '*' for a sentence body such as "D,s,1,3,0.012,-0.981,9.806,".
+
+    0 while ALGORITHM is not set, so the simulator and tests still write sentences of the firmware's shape.
+    """
+    return ALGORITHM(body.encode('ascii', 'replace')) if ALGORITHM is not None else 0
+
+
+def validate(sentences: Sequence[str]) -> np.ndarray:
+    """
+    Check the checksums of a batch of sentences.
+
+    Large batches are checked without a Python loop per sentence: they are joined into one buffer,
+    '*' and line ends are located with NumPy and the decimal checksums are read digit by digit
+    column-wise. Only the comparison with ALGORITHM, when it is set, is done per sentence.
+
+    :return: Status per sentence: VALID, CORRUPT (checksum mismatch) or MALFORMED (no '*NN' at the end).
+    """
+    if len(sentences) < VECTOR_THRESHOLD:
+        return np.array([_validate_one(sentence) for sentence in sentences], dtype=np.int8)
+
+    # 'replace' keeps one byte per character, so character offsets are byte offsets
+    data = np.frombuffer(('\n'.join(sentences) + '\n').encode('ascii', 'replace'), dtype=np.uint8)
+    ends = np.flatnonzero(data == NEWLINE)
+    if len(ends) != len(sentences):
+        # A sentence contains a line break itself
+        return np.array([_validate_one(sentence) for sentence in sentences], dtype=np.int8)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+
+    # Position of the last '*' of every sentence, -1 if there is none
+    stars = np.flatnonzero(data == STAR)
+    lines = np.searchsorted(ends, stars)
+    last = np.concatenate((lines[1:] != lines[:-1], [True])) if len(stars) else np.empty(0, dtype=bool)
+    star = np.full(len(sentences), -1, dtype=np.intp)
+    star[lines[last]] = stars[last]
+
+    digits = ends - star - 1
+    well_formed = (star >= 0) & (digits >= 1) & (digits <= MAX_DIGITS)
+    expected = np.zeros(len(sentences), dtype=np.intp)
+    for k in range(MAX_DIGITS):
+        present = well_formed & (k < digits)
+        digit = data[np.where(present, star + 1 + k, 0)].astype(np.intp) - ord('0')
+        well_formed &= ~present | ((digit >= 0) & (digit <= 9))
+        expected = np.where(present, expected * 10 + digit, expected)
+
+    if ALGORITHM is None:
+        return np.where(well_formed, VALID, MALFORMED).astype(np.int8)
+    lengths = np.where(star >= 0, star - starts, 0)
+    actual = np.fromiter((checksum(sentence[:length]) for sentence, length in zip(sentences, lengths.tolist())),
+                         dtype=np.intp, count=len(sentences))
+    return np.where(well_formed, np.where(actual == expected, VALID, CORRUPT), MALFORMED).astype(np.int8)
+
+
+def _validate_one(sentence: str) -> int:
+    body, star, value = sentence.rpartition('*')
+    if not star or not value.isdigit() or len(value) > MAX_DIGITS:
+        return MALFORMED
+    if ALGORITHM is None:
+        return VALID
+    return VALID if checksum(body) == int(value) else CORRUPT
+
+
+class SentenceCounters:
+    """
+    Thread-safe per-sensor counters of valid, corrupt and malformed sentences.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counts: Dict[str, List[int]] = {}
+
+    def add(self, kind: str, status: int, count: int = 1) -> None:
+        with self._lock:
+            self._counts.setdefault(kind, [0, 0, 0])[status] += count
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        {'GPS': {'valid': ..., 'corrupt': ..., 'malformed': ...}, 'IMU': {...}}
+        """
+        with self._lock:
+            return {kind: dict(zip(STATUSES, counts)) for kind, counts in self._counts.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts = {}
+
+    def summary(self) -> str:
+        """
+        One-line description for the status bar.
+        """
+        return ', '.join(f"{kind}: верных {counts['valid']}, искажённых {counts['corrupt']}, "
+                         f"некорректных {counts['malformed']}" for kind, counts in self.stats().items())
+
+
+# Shared by the server thread and the GUI
+COUNTERS = SentenceCounters()
+
@@ -0,0 +1,175 @@
+from typing import Dict, Optional, Tuple
+import os
+import numpy as np
+
+from src.telemetry.batch import COLUMNS, TelemetryBatch
+
+# Samples kept per sensor: about 36 h of GPS at 1 Hz and 11 h of IMU at 100 Hz;
+# other sensors keep HISTORY_<KIND>_SIZE samples, DEFAULT_CAPACITY if not set
+DEFAULT_CAPACITY: int = 1 << 17
+CAPACITY: Dict[str, int] = {
+    'GPS': int(os.getenv('HISTORY_GPS_SIZE', DEFAULT_CAPACITY)),
+    'IMU': int(os.getenv('HISTORY_IMU_SIZE', 1 << 22)),
+}
+
+# Longest gap over which the samples of one batch are spread back in time
+MAX_SPREAD: float = 1.0
+
+
+class SensorHistory:
+    """
+    Fixed-size history of one sensor: a ring of timestamps and one ring per numeric channel,
+    all preallocated and sharing the write position, so appending never allocates.
+    """
+
+    def __init__(self, channels: Dict[str, np.dtype], capacity: int) -> None:
+        """
+        :param channels: Channel name -> value dtype.
+        :param capacity: Number of samples kept; older ones are overwritten.
+        """
+        self.capacity: int = capacity
+        self.times: np.ndarray = np.zeros(capacity, dtype=np.float64)
+        self.values: Dict[str, np.ndarray] = {name: np.zeros(capacity, dtype=dtype) for name, dtype in channels.items()}
+        self._head: int = 0  # next position to write
+        self._size: int = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, timestamp: float, sample: Dict[str, float]) -> None:
+        """
+        Add one sample, O(1).
+        """
+        self.times[self._head] = timestamp
+        for name, ring in self.values.items():
+            ring[self._head] = sample[name]
+        self._head = (self._head + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def extend(self, times: np.ndarray, columns: Dict[str, np.ndarray]) -> None:
+        """
+        Add many samples with at most two slice copies per channel.
+        """
+        count = len(times)
+        if count > self.capacity:
+            times = times[-self.capacity:]
+            columns = {name: column[-self.capacity:] for name, column in columns.items()}
+            count = self.capacity
+        first = min(count, self.capacity - self._head)
+        for ring, column in [(self.times, times)] + [(ring, columns[name]) for name, ring in self.values.items()]:
+            ring[self._head:self._head + first] = column[:first]
+            ring[:count - first] = column[first:]
+        self._head = (self._head + count) % self.capacity
+        self._size = min(self._size + count, self.capacity)
+
+    def last_time(self) -> Optional[float]:
+        return float(self.times[self._head - 1]) if self._size else None
+
+    def range(self, channel: str, start: float = -np.inf, end: float = np.inf) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Samples of a channel with start <= time < end, oldest first.
+
+        :return: (times, values), copies.
+        """
+        times, values = [], []
+        for part in self._parts():
+            part_times = self.times[part]
+            lo, hi = np.searchsorted(part_times, (start, end))
+            times.append(part_times[lo:hi])
+            values.append(self.values[channel][part][lo:hi])
+        return np.concatenate(times), np.concatenate(values)
+
+    def decimate(self, channel: str, buckets: int, start: float = -np.inf,
+                 end: float = np.inf) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Min/max envelope of a channel over a time range, at most `buckets` points.
+
+        :return: (bucket start times, minimums, maximums); raw samples if there are fewer than buckets.
+        """
+        times, values = self.range(channel, start, end)
+        if len(values) <= buckets:
+            return times, values, values
+        edges = np.linspace(0, len(values), buckets + 1).astype(np.intp)[:-1]
+        return times[edges], np.minimum.reduceat(values, edges), np.maximum.reduceat(values, edges)
+
+    def nbytes(self) -> int:
+        return self.times.nbytes + sum(ring.nbytes for ring in self.values.values())
+
+    def _parts(self) -> Tuple[slice, ...]:
+        """
+        The ring as chronological slices: the older tail after the write position, then the head.
+        """
+        if self._size < self.capacity:
+            return (slice(0, self._size),)
+        return slice(self._head, self.capacity), slice(0, self._head)
+
+
+class TelemetryHistory:
+    """
+    In-process history of every numeric telemetry channel (latitude, axl_x, ...) with bounded memory.
+    Sample times are time.monotonic() seconds, so they keep increasing when the system clock is set.
+    """
+
+    def __init__(self, capacity: Optional[Dict[str, int]] = None) -> None:
+        """
+        :param capacity: Samples kept per sensor, CAPACITY by default.
+        """
+        capacity = capacity or CAPACITY
+        self.sensors: Dict[str, SensorHistory] = {}
+        self.kinds: Dict[str, str] = {}
+        for kind, spec in COLUMNS.items():
+            channels = {name: np.dtype(dtype) for name, dtype in spec if np.dtype(dtype).kind == 'f'}
+            size = capacity.get(kind) or int(os.getenv(f'HISTORY_{kind}_SIZE', DEFAULT_CAPACITY))
+            self.sensors[kind] = SensorHistory(channels, size)
+            self.kinds.update(dict.fromkeys(channels, kind))
+
+    def add_batch(self, batch: TelemetryBatch) -> None:
+        """
+        Store a batch. Its samples are spread evenly between the previous sample and the receive time.
+        """
+        count = len(batch)
+        if not count:
+            return
+        sensor = self.sensors[batch.kind]
+        now = batch.received_at
+        previous = sensor.last_time()
+        gap = min(now - previous, MAX_SPREAD) if previous is not None and previous < now else 0.0
+        times = now - gap * np.arange(count - 1, -1, -1) / count
+        sensor.extend(times, {name: batch.columns[name] for name in sensor.values})
+
+    def channels(self) -> Tuple[str, ...]:
+        return tuple(self.kinds)
+
+    def range(self, channel: str, start: float = -np.inf, end: float = np.inf) -> Tuple[np.ndarray, np.ndarray]:
+        return self.sensors[self.kinds[channel]].range(channel, start, end)
+
+    def decimate(self, channel: str, buckets: int, start: float = -np.inf,
+                 end: float = np.inf) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return self.sensors[self.kinds[channel]].decimate(channel, buckets, start, end)
+
+    def nbytes(self) -> int:
+        return sum(sensor.nbytes() for sensor in self.sensors.values())
+
+
+if __name__ == "__main__":
+    ## Benchmark
+    import time
+    import timeit
+
+    history = TelemetryHistory()
+    print(f'preallocated: {history.nbytes() / 2 ** 20:.0f} MiB (pages are committed as they are written)')
+    batch = TelemetryBatch('IMU', {name: np.random.rand(100).astype('f4') for name in ('axl_x', 'axl_y', 'axl_z')})
+    batch.received_at = time.monotonic() - 3600
+
+    def add_batch() -> None:
+        batch.received_at += 0.36
+        history.add_batch(batch)
+
+    n = 10_000
+    elapsed = timeit.timeit(add_batch, number=n)
+    print(f'add_batch of 100 samples: {elapsed / n * 1e6:.1f} us, {100 * n / elapsed:,.0f} samples/s')
+    now = batch.received_at
+    elapsed = timeit.timeit(lambda: history.range('axl_x', now - 60, now), number=100)
+    print(f'range over last minute: {elapsed / 100 * 1e3:.2f} ms')
+    elapsed = timeit.timeit(lambda: history.decimate('axl_x', 1000), number=10)
+    print(f'decimate {len(history.sensors["IMU"]):,} samples to 1000 buckets: {elapsed / 10 * 1e3:.1f} ms')
@@ -0,0 +1,100 @@
+from typing import Dict, Iterable, List, Union
+from itertools import compress
+import numpy as np
+
+from src.telemetry.checksum import CHECKSUM_ENABLED, COUNTERS, CORRUPT, MALFORMED, VALID, SentenceCounters, validate
+from src.telemetry.schema import REGISTRY, SentenceRegistry
+
+
+def parse_sentences(sentences: Iterable[Union[str, bytes]], counters: SentenceCounters = COUNTERS,
+                    verify: bool = CHECKSUM_ENABLED, registry: SentenceRegistry = REGISTRY) -> Dict[str, np.ndarray]:
+    """
+    Decode many sentences at once into one structured array per sensor.
+
+    Sentences are grouped by header with a dictionary lookup and, with TELEMETRY_CHECKSUM=1, their checksums
+    are verified first, so corrupt ones never reach the decoders (see checksum.ALGORITHM: until the firmware's
+    algorithm is confirmed only the '*NN' ending is checked). Each group is then decoded in one go by the decoder
+    compiled from its schema (SentenceSchema.decode). Sentences with an unknown header, a wrong number
+    of fields, a bad checksum or unparsable values are skipped and counted.
+
+    :param sentences: Sentences such as "D,s,1,3,0.012,-0.981,9.806,*41", as str or bytes.
+    :param counters: Where valid/corrupt/malformed sentences are counted per sensor.
+    :param verify: Reject sentences whose checksum does not match.
+    :param registry: Known sentence types.
+    :return: Sensor -> array of its schema record, e.g. {'GPS': ..., 'IMU': ...}, possibly empty.
+    """
+    groups: Dict[str, List[str]] = {schema.kind: [] for schema in registry}
+    lookup = registry.lookup
+    for sentence in sentences:
+        if not isinstance(sentence, str):
+            sentence = str(sentence, 'ascii', 'replace')
+        schema = lookup(sentence)
+        if schema is None:
+            continue
+        if sentence.count(',') == schema.commas:
+            groups[schema.kind].append(sentence)
+        else:
+            counters.add(schema.kind, MALFORMED)
+
+    parsed: Dict[str, np.ndarray] = {}
+    for kind, group in groups.items():
+        if verify and group:
+            statuses = validate(group)
+            counters.add(kind, CORRUPT, int(np.count_nonzero(statuses == CORRUPT)))
+            counters.add(kind, MALFORMED, int(np.count_nonzero(statuses == MALFORMED)))
+            group = list(compress(group, statuses == VALID))
+        parsed[kind] = records = registry[kind].decode(group)
+        if group:
+            counters.add(kind, VALID, len(records))
+            counters.add(kind, MALFORMED, len(group) - len(records))
+    return parsed
+
+
+def parse_buffer(data: Union[bytes, bytearray, memoryview], counters: SentenceCounters = COUNTERS,
+                 verify: bool = CHECKSUM_ENABLED, registry: SentenceRegistry = REGISTRY) -> Dict[str, np.ndarray]:
+    """
+    Decode a buffer of newline separated sentences, e.g. a log file or a raw serial capture.
+    """
+    return parse_sentences(str(data, 'ascii', 'replace').splitlines(), counters, verify, registry)
+
+
+if __name__ == "__main__":
+    ## Benchmark against the former per-sentence path of DataShower.parse_msg
+    import random
+    import timeit
+
+    from src.telemetry.checksum import checksum
+
+    def legacy(raw_data: str) -> None:
+        splitted = raw_data.split(',')
+        data = splitted[4:-1]
+        raw_crc = splitted[-1:]
+        crc = int(raw_crc[0].split("*")[1])
+        parsers = {"D,s,1,1": lambda d: list(map(float, d[:1] + d[2:3] + d[4:5] + d[6:])),
+                   "D,s,1,3": lambda d: list(map(float, d[0:3]))}
+        for identifier, parser in parsers.items():
+            if raw_data.startswith(identifier):
+                parser(data)
+
+    rnd = random.Random(0)
+    messages = []
+    for i in range(100_000):
+        if i % 5:
+            body = f"D,s,1,3,{rnd.gauss(0, 1):.3f},{rnd.gauss(0, 1):.3f},{rnd.gauss(9.8, 1):.3f},"
+        else:
+            body = (f"D,s,1,1,{5520 + rnd.random():.4f},N,{2047 + rnd.random():.4f},E,15.2,"
+                    f"123752,{rnd.uniform(0, 360):.3f},{rnd.uniform(0, 60):.3f},")
+        messages.append(f'{body}*{checksum(body)}')
+
+    counters = SentenceCounters()
+    n = 3
+    legacy_time = timeit.timeit(lambda: [legacy(m) for m in messages], number=n) / n
+    batch_time = timeit.timeit(lambda: parse_sentences(messages, counters, verify=True), number=n) / n
+    unchecked_time = timeit.timeit(lambda: parse_sentences(messages, counters, verify=False), number=n) / n
+    buffer = '\n'.join(messages).encode()
+    buffer_time = timeit.timeit(lambda: parse_buffer(buffer, counters), number=n) / n
+    print(f"{'path':<20}{'msg/s':>14}")
+    print(f"{'parse_msg':<20}{len(messages) / legacy_time:>14,.0f}")
+    print(f"{'parse_sentences':<20}{len(messages) / batch_time:>14,.0f}")
+    print(f"{'without checksum':<20}{len(messages) / unchecked_time:>14,.0f}")
+    print(f"{'parse_buffer':<20}{len(messages) / buffer_time:>14,.0f}")
@@ -0,0 +1,167 @@
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple, Type
+import warnings
+import numpy as np
+
+# (name, NumPy dtype) of one value field
+Field = Tuple[str, str]
+
+# "D,s,1,1," + fields + "*crc"
+HEADER_FIELDS: int = 4
+
+# Column names follow the on-screen labels (lb_<name>_val)
+GPS_FIELDS: Tuple[Field, ...] = (
+    ('latitude', 'f8'), ('NS', 'U1'), ('longitude', 'f8'), ('EW', 'U1'),
+    ('altitude', 'f4'), ('time', 'u4'), ('course', 'f4'), ('grndspeed', 'f4'),
+)
+IMU_FIELDS: Tuple[Field, ...] = (
+    ('axl_x', 'f4'), ('axl_y', 'f4'), ('axl_z', 'f4'),
+)
+
+
+class SentenceSchema:
+    """
+    Declaration of one sentence type and the decoder compiled from it.
+
+    Everything a decoder needs (record dtype, field count, letter substitutions, column order) is
+    worked out once here, so decoding a group of sentences is a join, a few replaces and one
+    np.fromstring call whatever the type.
+    """
+
+    def __init__(self, kind: str, header: str, fields: Tuple[Field, ...],
+                 letters: Optional[Dict[str, Tuple[str, str]]] = None) -> None:
+        """
+        :param kind: Sensor name; also names its message keys, e.g. 'GPS' -> GPSRESPONSE, GPSBATCH.
+        :param header: First HEADER_FIELDS fields of the sentence, e.g. 'D,s,1,1'.
+        :param fields: Value fields in sentence order.
+        :param letters: Letter fields and their (positive, negative) values, e.g. {'NS': ('N', 'S')}.
+        """
+        if header.count(',') != HEADER_FIELDS - 1:
+            raise ValueError(f'[ERROR] - Header {header!r} must have {HEADER_FIELDS} fields')
+        self.kind: str = kind
+        self.header: str = header
+        self.fields: Tuple[Field, ...] = tuple(fields)
+        self.letters: Dict[str, Tuple[str, str]] = letters or {}
+        self.record: np.dtype = np.dtype(list(self.fields))
+        self.prefix: str = header + ','
+        self.commas: int = HEADER_FIELDS + len(self.fields)
+        self.response_key: str = kind + 'RESPONSE'
+        self.batch_key: str = kind + 'BATCH'
+        # Typed, immutable sample, e.g. GpsSample(latitude=..., NS='N', ...); values stay NumPy scalars
+        self.sample: Type[tuple] = NamedTuple(f'{kind.title()}Sample',
+                                              [(name, self.record.fields[name][0].type) for name in self.record.names])
+
+        # Letters become signs so that only numbers are left for np.fromstring
+        self._replacements: List[Tuple[str, str]] = [
+            (f',{letter},', f',{sign},')
+            for positive, negative in self.letters.values()
+            for letter, sign in ((positive, '1'), (negative, '-1'))
+        ]
+        self._columns: List[Tuple[int, str, Optional[Tuple[str, str]]]] = [
+            (i, name, self.letters.get(name)) for i, name in enumerate(self.record.names)
+        ]
+
+    def decode(self, sentences: List[str]) -> np.ndarray:
+        """
+        Decode sentences of this type (header and field count already checked) into a structured array.
+        Sentences with unparsable values are dropped.
+        """
+        if not sentences:
+            return np.empty(0, dtype=self.record)
+
+        # Cut "D,s,1,x," and ",*crc" off, the commas around keep the first and last letters replaceable
+        start = len(self.prefix)
+        body = ',' + ','.join([sentence[start:sentence.rindex(',')] for sentence in sentences]) + ','
+        for letter, sign in self._replacements:
+            body = body.replace(letter, sign)
+        try:
+            with warnings.catch_warnings():
+                # fromstring stops at the first malformed value with a DeprecationWarning
+                warnings.simplefilter('ignore', DeprecationWarning)
+                values = np.fromstring(body[1:-1], sep=',')
+        except ValueError:
+            return self._decode_rows(sentences)
+
+        if values.size != len(sentences) * len(self._columns):
+            return self._decode_rows(sentences)
+        grid = values.reshape(len(sentences), len(self._columns))
+        out = np.empty(len(sentences), dtype=self.record)
+        for i, name, letters in self._columns:
+            out[name] = grid[:, i] if letters is None else np.where(grid[:, i] > 0, *letters)
+        return out
+
+    def _decode_rows(self, sentences: List[str]) -> np.ndarray:
+        """
+        Slow path for a group with malformed values: convert sentence by sentence and drop the bad ones.
+        """
+        rows = []
+        for sentence in sentences:
+            row = []
+            for (_, _, letters), value in zip(self._columns, sentence.split(',')[HEADER_FIELDS:-1]):
+                if letters is not None:
+                    if value not in letters:
+                        break
+                    row.append(value)
+                else:
+                    try:
+                        row.append(float(value))
+                    except ValueError:
+                        break
+            else:
+                rows.append(tuple(row))
+        return np.array(rows, dtype=self.record)
+
+
+class SentenceRegistry:
+    """
+    Known sentence types, looked up by header in O(1) whatever their number.
+
+    columns, headers, batch_keys and response_keys are kept up to date on every register(), so code
+    holding a reference to them sees sensors added later.
+    """
+
+    def __init__(self) -> None:
+        self.schemas: Dict[str, SentenceSchema] = {}
+        self.columns: Dict[str, Tuple[Field, ...]] = {}
+        self.headers: Dict[str, str] = {}
+        self.batch_keys: Dict[str, str] = {}
+        self.response_keys: Dict[str, str] = {}
+        self._by_prefix: Dict[str, SentenceSchema] = {}
+        self._prefix_lengths: Set[int] = set()
+
+    def __iter__(self):
+        return iter(self.schemas.values())
+
+    def __getitem__(self, kind: str) -> SentenceSchema:
+        return self.schemas[kind]
+
+    def register(self, kind: str, header: str, fields: Iterable[Field],
+                 letters: Optional[Dict[str, Tuple[str, str]]] = None) -> SentenceSchema:
+        """
+        Declare a sentence type, see SentenceSchema for the parameters.
+        """
+        schema = SentenceSchema(kind, header, tuple(fields), letters)
+        if kind in self.schemas or schema.prefix in self._by_prefix:
+            raise ValueError(f'[ERROR] - Sentence type {kind} ({header}) is already registered')
+        self.schemas[kind] = schema
+        self.columns[kind] = schema.fields
+        self.headers[kind] = header
+        self.batch_keys[schema.batch_key] = kind
+        self.response_keys[schema.response_key] = kind
+        self._by_prefix[schema.prefix] = schema
+        self._prefix_lengths.add(len(schema.prefix))
+        return schema
+
+    def lookup(self, sentence: str) -> Optional[SentenceSchema]:
+        """
+        Schema of a sentence by its header, None if the type is unknown.
+        """
+        for length in self._prefix_lengths:
+            schema = self._by_prefix.get(sentence[:length])
+            if schema is not None:
+                return schema
+        return None
+
+
+REGISTRY: SentenceRegistry = SentenceRegistry()
+REGISTRY.register('GPS', 'D,s,1,1', GPS_FIELDS, letters={'NS': ('N', 'S'), 'EW': ('E', 'W')})
+REGISTRY.register('IMU', 'D,s,1,3', IMU_FIELDS)
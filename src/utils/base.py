@@ -1,14 +1,18 @@
 # Required python packages
 from PySide6.QtCore import QThreadPool, Slot, Signal
-from PySide6.QtWidgets import QApplication, QMainWindow, QMessageBox
+from PySide6.QtWidgets import QApplication, QComboBox, QMainWindow, QMessageBox
 from typing import List, Any
 
 # User-defined packages
 from src.server.server import ServerThread
+from src.server.asyncserver import AsyncServerThread
+from src.server.replay import ReplayThread
+from src.server.messages import Frame
 from mainwindow import Ui_MainWindow
 
 
 # System package
+import os
 import sys
 
 # Constants
@@ -22,8 +26,8 @@ class Base(QMainWindow):
     """
     Base class that represents main GUI window.
     """
-    msg_to_terminal: Signal = Signal(dict, str)
-    telemetry_to_operator: Signal = Signal(str)
+    msg_to_terminal: Signal = Signal(object, str)
+    telemetry_batch_to_operator: Signal = Signal(object)
 
     def __init__(self) -> None:
         """
@@ -45,6 +49,13 @@ class Base(QMainWindow):
         self.pool: QThreadPool = QThreadPool.globalInstance()
         self.set_zero_values()
 
+        # Vehicle the GUI shows and controls, when the async engine serves several
+        self.vehicle_box: QComboBox = QComboBox()
+        self.vehicle_box.setToolTip('Аппарат, который показывается и получает команды')
+        self.vehicle_box.setVisible(False)
+        self.vehicle_box.currentIndexChanged.connect(self._select_vehicle)
+        self.ui.statusbar.addPermanentWidget(self.vehicle_box)
+
     def set_zero_values(self) -> None:
         """
         Sets initial values for on screen elements.
@@ -60,24 +71,36 @@ class Base(QMainWindow):
         """
         Starts the server thread and connects signals.
         """
-        self.server: ServerThread = ServerThread()
-        self.pool.start(self.server)
+        if os.getenv("REPLAY"):
+            self.server: ServerThread = ReplayThread(os.getenv("REPLAY"), window=ReplayThread.WINDOW)
+        elif os.getenv("SERVER_ENGINE") == "async":
+            self.server: ServerThread = AsyncServerThread()
+        else:
+            self.server: ServerThread = ServerThread()
 
-        # signals from the thread
+        # signals from the thread, connected before it starts so that no early signal is lost
         self.server.signals.started.connect(self.server_started_actions)
         self.server.signals.connection_timeout.connect(self.timeout_actions)
         self.server.signals.data_received.connect(self._process_rcv_data)
         self.server.signals.data_sent.connect(self._process_snd_data)
+        self.server.signals.telemetry_batch.connect(self._process_rcv_batch)
+        if isinstance(self.server, AsyncServerThread):
+            self.vehicle_box.clear()
+            self.vehicle_box.setVisible(True)
+            self.server.signals.client_connected.connect(self._vehicle_connected)
+            self.server.signals.client_disconnected.connect(self._vehicle_disconnected)
+        if isinstance(self.server, ReplayThread):
+            # Connected last: runs after the frame went through the whole GUI pipeline
+            self.server.signals.data_received.connect(self._replay_delivered)
+        self.pool.start(self.server)
 
     def stop_server(self) -> None:
         """
         Stops the server and resets connection data.
         """
         try:
-            self.server.conn.shutdown(0)
+            self.server.stop()
             self.set_zero_values()
-            self.server.conn = None
-            self.server.addr = None
             self.ui.btn_motor_start.setEnabled(True)
             self.ui.btn_motor_stop.setEnabled(False)
         except AttributeError as _:
@@ -117,28 +140,61 @@ class Base(QMainWindow):
         print('Сервер не запущен, чтобы его останавливать')
         QMessageBox.warning(None, ERROR_TITLE, ERROR_MESSAGE, WARNING_BUTTON)
 
+    @Slot(int, str)
+    def _vehicle_connected(self, conn_id: int, host: str) -> None:
+        """
+        List a new vehicle; the server picks it if none was selected or if it was selected before it dropped out.
+        """
+        self.vehicle_box.addItem(f'{host} #{conn_id}', conn_id)
+        if self.server.selected == conn_id:
+            self.vehicle_box.setCurrentIndex(self.vehicle_box.findData(conn_id))
+
+    @Slot(int)
+    def _vehicle_disconnected(self, conn_id: int) -> None:
+        self.vehicle_box.removeItem(self.vehicle_box.findData(conn_id))
+
+    @Slot(int)
+    def _select_vehicle(self, index: int) -> None:
+        """
+        Show and control the vehicle chosen in the list.
+        """
+        conn_id = self.vehicle_box.itemData(index)
+        if conn_id is not None:
+            self.server.signals.select_conn.emit(conn_id)
+
     @Slot(object)
-    def _process_snd_data(self, data: dict) -> None:
+    def _process_snd_data(self, frame: Frame) -> None:
         """
         Process and emit sent data.
 
-        :param data: Data that was sent.
+        :param frame: Frame that was sent.
+        """
+        self.msg_to_terminal.emit(frame, "SEND")
+
+    @Slot(object)
+    def _process_rcv_data(self, frame: Frame) -> None:
+        """
+        Process and emit received data. Its telemetry was decoded by the server and arrives as batches.
+
+        :param frame: Frame that was received.
+        """
+        self.msg_to_terminal.emit(frame, "RCVD")
+
+    @Slot(object)
+    def _replay_delivered(self, frame: Frame) -> None:
+        """
+        Let the replay send the next frame.
         """
-        self.msg_to_terminal.emit(data, "SEND")
+        self.server.delivered()
 
     @Slot(object)
-    def _process_rcv_data(self, data: dict) -> None:
+    def _process_rcv_batch(self, batch: object) -> None:
         """
-        Process and emit received data.
+        Pass a batch of telemetry samples on to the operator views.
 
-        :param data: Data that was received.
+        :param batch: TelemetryBatch received in one frame.
         """
-        self.msg_to_terminal.emit(data, "RCVD")
-        if "status" in data and data["status"] == "RESPONSE":
-            if "GPSRESPONSE" in data["msg_data"]:
-                self.telemetry_to_operator.emit(data["msg_data"]["GPSRESPONSE"])
-            if "IMURESPONSE" in data["msg_data"]:
-                self.telemetry_to_operator.emit(data["msg_data"]["IMURESPONSE"])
+        self.telemetry_batch_to_operator.emit(batch)
 
 
 if __name__ == '__main__':
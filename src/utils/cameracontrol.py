@@ -21,8 +21,8 @@ class CameraControl(WebEngineMap):
     def _start_camera(self):
         """Start the RTSP stream"""
         self.vthread = VideoThread()
+        self.vthread.frame_ready.connect(self._show_frame)
         self.vthread.start()
-        self.vthread.change_pixmap_signal.connect(self.update_image)
         self._toggle_button_states()
 
     def _stop_camera(self):
@@ -33,11 +33,21 @@ class CameraControl(WebEngineMap):
 
     def _toggle_button_states(self):
         """Toggle button states when starting/stopping the camera"""
-        camera_running = self.vthread and self.vthread.isRunning()
+        camera_running = bool(self.vthread and self.vthread.isRunning())
         self.ui.btn_start_camera.setEnabled(not camera_running)
         self.ui.btn_stop_camera.setEnabled(camera_running)
 
-    @Slot(np.ndarray)
+    @Slot()
+    def _show_frame(self):
+        """Draw the newest decoded frame; frames decoded while the GUI was busy are skipped"""
+        cv_img = self.vthread.take_frame() if self.vthread else None
+        if cv_img is None:
+            return
+        self.update_image(cv_img)
+        stats = self.vthread.stats()
+        self.ui.lb_camera.setToolTip(f"Кадров декодировано: {stats['decoded']}, показано: {stats['displayed']}, "
+                                     f"пропущено: {stats['dropped']}")
+
     def update_image(self, cv_img):
         """Update lb_camera with the received opencv frame"""
         qt_img = self.convert_cv_qt(cv_img)
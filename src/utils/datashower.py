@@ -1,8 +1,13 @@
 from src.utils.terminalwindow import TerminalWindow
-from PySide6.QtWidgets import QApplication
-from PySide6.QtCore import Slot
-import sys
+from src.telemetry.batch import COLUMNS, TelemetryBatch
+from src.telemetry.parser import parse_sentences
+from src.telemetry.history import TelemetryHistory
+from src.utils.labelview import LabelView
+from src.utils.plotwidget import TelemetryPlot
+from PySide6.QtWidgets import QApplication, QDockWidget, QVBoxLayout, QWidget
+from PySide6.QtCore import Qt, Slot
 from typing import List
+import sys
 
 
 class DataShower(TerminalWindow):
@@ -14,59 +19,57 @@ class DataShower(TerminalWindow):
     def __init__(self):
         """
         Constructor, initialize the class DataShower.
-        Connect the telemetry_to_operator signal with parse slot.
+        Connect the telemetry_batch_to_operator signal with parse_batch slot.
+        Every received sample is also kept in a fixed-size history for plots and exports.
+        Labels are refreshed by a view model at display rate, not per message.
+        Charts of the history are shown in a dock that can be closed or undocked.
         """
 
         super().__init__()
-        self.telemetry_to_operator.connect(self.parse)
-
-    @Slot(object)
-    def parse(self, raw_data: str) -> None:
-        """
-        A slot function which prints and parses raw telemetry data.
-        """
-        print(raw_data)
-        self.parse_msg(raw_data)
-
-    def parse_msg(self, raw_data: str) -> None:
+        self.history: TelemetryHistory = TelemetryHistory()
+        kinds = {name: kind for kind, spec in COLUMNS.items() for name, _ in spec if hasattr(self.ui, f'lb_{name}_val')}
+        self.labels: LabelView = LabelView({name: getattr(self.ui, f'lb_{name}_val') for name in kinds}, kinds)
+        self.plots: List[TelemetryPlot] = [
+            TelemetryPlot(self.history, ['axl_x', 'axl_y', 'axl_z'], 'Ускорение X/Y/Z, м/с²'),
+            TelemetryPlot(self.history, ['grndspeed'], 'Скорость', window=300.0),
+            TelemetryPlot(self.history, ['altitude'], 'Высота', window=300.0),
+        ]
+        self.init_plots()
+        self.telemetry_batch_to_operator.connect(self.parse_batch)
+
+    def init_plots(self) -> None:
         """
-        Method to parse message. Handles the message based on identifiers.
+        Method to put the telemetry charts into a dock at the bottom of the window.
         """
+        container = QWidget()
+        layout = QVBoxLayout(container)
+        layout.setContentsMargins(0, 0, 0, 0)
+        for plot in self.plots:
+            layout.addWidget(plot)
+        self.plots_dock = QDockWidget('Графики телеметрии', self)
+        self.plots_dock.setObjectName('plots_dock')
+        self.plots_dock.setWidget(container)
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.plots_dock)
+        self.tabifyDockWidget(self.search_dock, self.plots_dock)
 
-        splitted = raw_data.split(',')
-        data = splitted[4:-1]
-        raw_crc = splitted[-1:]
-        crc = int(raw_crc[0].split("*")[1])
-
-        parsers = {"D,s,1,1": self.parse_msg_gps, "D,s,1,3": self.parse_msg_imu}
-
-        for identifier, parser in parsers.items():
-            if raw_data.startswith(identifier):
-                parser(data)
-
-    def parse_msg_gps(self, data: List[str]) -> None:
+    @Slot(object)
+    def parse_batch(self, batch: TelemetryBatch) -> None:
         """
-        Method to parse GPS data.
+        A slot function which stores a telemetry batch and hands its latest sample to the labels.
         """
+        if not len(batch):
+            return
+        self.history.add_batch(batch)
+        self.labels.update(batch.kind, batch.last())
 
-        # "D,s,1,1,5520.0459,N,2047.5840,E,15.2,123752,38.000,48.000,*73"
-        Latitude, NS, Longitude, EW, Altitude = map(float, data[:5])
-        _, _, GrndSpeed = map(float, data[5:])
-
-        ## Updating attributes
-        for attr, value in [('latitude', Latitude), ('NS', NS), ('longitude', Longitude), ('EW', EW), ('altitude', Altitude), ('grndspeed', GrndSpeed)]:
-            getattr(self.ui, f'lb_{attr}_val').setText(str(value))
-
-    def parse_msg_imu(self, data: List[str]) -> None:
+    def parse_msg(self, raw_data: str) -> None:
         """
-        Method to parse IMU data.
+        Method to parse one message. A thin wrapper over the batch parser, see parse_sentences.
         """
 
-        AXL_x, AXL_y, AXL_z = data[0:3]
-
-        ## Updating attributes
-        for attr, value in [('axl_x', AXL_x), ('axl_y', AXL_y), ('axl_z', AXL_z)]:
-            getattr(self.ui, f'lb_{attr}_val').setText(str(value))
+        for kind, records in parse_sentences([raw_data]).items():
+            if len(records):
+                self.parse_batch(TelemetryBatch.from_records(kind, records))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,74 @@
+from PySide6.QtCore import QObject, QTimer
+from PySide6.QtWidgets import QLabel
+from typing import Dict, Any, NamedTuple, Set
+import time
+
+REFRESH_RATE: int = 30  # label updates per second
+STALE_AFTER: float = 2.0  # s without a new value before a label is greyed out
+
+
+class LabelView(QObject):
+    """
+    View model for the telemetry labels.
+
+    Incoming samples only overwrite the latest value and mark the label dirty; a timer pushes dirty
+    values to the widgets at most REFRESH_RATE times per second and only when the text changed.
+    Labels of a sensor that has been silent for STALE_AFTER seconds are disabled (greyed out)
+    until the next value arrives.
+    """
+
+    def __init__(self, labels: Dict[str, QLabel], kinds: Dict[str, str], rate: int = REFRESH_RATE,
+                 stale_after: float = STALE_AFTER) -> None:
+        """
+        :param labels: Field name -> label showing it, e.g. {'axl_x': ui.lb_axl_x_val}.
+        :param kinds: Field name -> sensor the field belongs to ('GPS' or 'IMU').
+        :param rate: Maximum refresh rate, Hz.
+        :param stale_after: Silence in seconds after which the sensor's labels are shown as stale.
+        """
+        super().__init__()
+        self.labels: Dict[str, QLabel] = labels
+        self.kinds: Dict[str, str] = kinds
+        self.stale_after: float = stale_after
+        self._values: Dict[str, Any] = {}
+        self._dirty: Set[str] = set()
+        self._updated_at: Dict[str, float] = {}
+        self._stale: Set[str] = set()
+
+        self.timer: QTimer = QTimer(self)
+        self.timer.timeout.connect(self.flush)
+        self.timer.start(1000 // rate)
+
+    def update(self, kind: str, sample: NamedTuple) -> None:
+        """
+        Remember the latest sample of a sensor, e.g. an ImuSample; nothing is drawn until the next flush.
+        """
+        for name, value in zip(sample._fields, sample):
+            if name in self.labels:
+                self._values[name] = value
+                self._dirty.add(name)
+        self._updated_at[kind] = time.monotonic()
+
+    def flush(self) -> None:
+        """
+        Push changed values to the labels and update the stale indication.
+        """
+        for name in self._dirty:
+            label = self.labels[name]
+            text = str(self._values[name])
+            if label.text() != text:
+                label.setText(text)
+        self._dirty.clear()
+
+        now = time.monotonic()
+        for kind, updated_at in self._updated_at.items():
+            stale = now - updated_at > self.stale_after
+            if stale == (kind in self._stale):
+                continue
+            if stale:
+                self._stale.add(kind)
+            else:
+                self._stale.discard(kind)
+            for name, label in self.labels.items():
+                if self.kinds[name] == kind:
+                    label.setEnabled(not stale)
+                    label.setToolTip(f'Нет новых данных {kind} больше {self.stale_after:g} с' if stale else '')
@@ -0,0 +1,169 @@
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt
+from PySide6.QtWidgets import (QAbstractItemView, QApplication, QComboBox, QCompleter, QDateTimeEdit, QHBoxLayout,
+                               QHeaderView, QLabel, QLineEdit, QPushButton, QTableView, QVBoxLayout, QWidget)
+from typing import Any, Dict, Optional, Tuple
+import datetime
+import sys
+import time
+import numpy as np
+
+from src.server.messagestore import MessageStore, parse_terms
+from src.server.recorder import DIRECTIONS
+
+HEADERS: Tuple[str, ...] = ('Время', 'Направление', 'Команды', 'Данные')
+CACHED_ROWS: int = 1000  # formatted rows kept while the results are scrolled
+DATA_WIDTH: int = 200  # characters of the data column
+
+
+class SearchResults(QAbstractTableModel):
+    """
+    Entries found in a MessageStore. Only ids are held; a row is formatted when the view shows it.
+    """
+
+    def __init__(self, store: MessageStore) -> None:
+        super().__init__()
+        self.store: MessageStore = store
+        self.ids: np.ndarray = np.empty(0, dtype=np.uint32)
+        self._rows: Dict[int, Tuple[str, ...]] = {}
+
+    def set_ids(self, ids: np.ndarray) -> None:
+        self.beginResetModel()
+        self.ids = ids
+        self._rows = {}
+        self.endResetModel()
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.ids)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return HEADERS[section]
+        return None
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if role not in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole) or not index.isValid():
+            return None
+        row = self._rows.get(index.row())
+        if row is None:
+            if len(self._rows) >= CACHED_ROWS:
+                self._rows.clear()
+            row = self._rows[index.row()] = self._format(int(self.ids[index.row()]))
+        return row[index.column()]
+
+    def _format(self, entry: int) -> Tuple[str, ...]:
+        frame = self.store.get(entry)
+        moment = datetime.datetime.fromtimestamp(self.store.time(entry)).strftime('%d.%m %H:%M:%S.%f')[:-3]
+        data = ', '.join([f'{key}: {value}' for key, value in frame.items()])
+        return moment, self.store.direction(entry), ' '.join(frame.names()) or frame.status or '', data[:DATA_WIDTH]
+
+
+class MessageSearch(QWidget):
+    """
+    Search panel over the message store: commands (e.g. MTRCMD=STOP SETMODE), direction and time range.
+    """
+
+    def __init__(self, store: MessageStore, parent: Optional[QWidget] = None) -> None:
+        """
+        :param store: Store of the session's frames.
+        """
+        super().__init__(parent)
+        self.store: MessageStore = store
+        self.results: SearchResults = SearchResults(store)
+
+        self.query = QLineEdit()
+        self.query.setPlaceholderText('Команды, например MTRCMD=STOP SETMODE; пусто - все')
+        self.completer = QCompleter([], self.query)
+        self.completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        self.query.setCompleter(self.completer)
+        self.direction = QComboBox()
+        self.direction.addItems(('Все',) + DIRECTIONS)
+        # The minimum is shown as '—' and means no limit
+        self.start = self._time_edit()
+        self.end = self._time_edit()
+        self.btn_search = QPushButton('Найти')
+        self.status = QLabel()
+
+        self.table = QTableView()
+        self.table.setModel(self.results)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setWordWrap(False)
+        self.table.verticalHeader().hide()
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(self.table.fontMetrics().height() + 4)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        for column, width in enumerate((130, 90, 160)):
+            self.table.setColumnWidth(column, width)
+
+        form = QHBoxLayout()
+        form.addWidget(self.query, 3)
+        form.addWidget(self.direction)
+        form.addWidget(QLabel('с'))
+        form.addWidget(self.start)
+        form.addWidget(QLabel('по'))
+        form.addWidget(self.end)
+        form.addWidget(self.btn_search)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(4, 4, 4, 4)
+        layout.addLayout(form)
+        layout.addWidget(self.status)
+        layout.addWidget(self.table)
+
+        self.query.returnPressed.connect(self.search)
+        self.btn_search.clicked.connect(self.search)
+        self.query.textEdited.connect(self._update_completer)
+
+    def search(self) -> None:
+        """
+        Run the search and show the matches, newest first.
+        """
+        direction = self.direction.currentIndex() - 1
+        started = time.perf_counter()
+        ids = self.store.query(parse_terms(self.query.text()), None if direction < 0 else direction,
+                               self._time(self.start), self._time(self.end))
+        elapsed = time.perf_counter() - started
+        self.results.set_ids(ids)
+        self.status.setText(f'Найдено {len(ids):,} из {len(self.store):,} за {elapsed * 1e3:.1f} мс')
+
+    def _update_completer(self) -> None:
+        terms = self.store.terms()
+        if self.completer.model().rowCount() != len(terms):
+            self.completer.model().setStringList(terms)
+
+    @staticmethod
+    def _time_edit() -> QDateTimeEdit:
+        edit = QDateTimeEdit()
+        edit.setDisplayFormat('dd.MM.yyyy HH:mm:ss')
+        edit.setCalendarPopup(True)
+        edit.setSpecialValueText('—')
+        edit.setDateTime(edit.minimumDateTime())
+        return edit
+
+    @staticmethod
+    def _time(edit: QDateTimeEdit) -> Optional[float]:
+        if edit.dateTime() == edit.minimumDateTime():
+            return None
+        return edit.dateTime().toMSecsSinceEpoch() / 1000
+
+
+if __name__ == "__main__":
+    from src.server.messages import Frame
+    from src.server.recorder import RCVD, SEND
+
+    app = QApplication(sys.argv)
+    store = MessageStore()
+    now = time.time() - 3600
+    for i in range(200_000):
+        if i % 500 == 0:
+            msg = {'cmd': ['MTRCMD'], 'msg_data': {'MTRCMD': 'STOP' if i % 1500 == 0 else 'FWD'}}
+        else:
+            msg = {'status': 'RESPONSE', 'cmd': [], 'msg_data': {'INFO': 'OK'}}
+        store.add(Frame.from_msg(msg, timestamp=now + i * 0.018), SEND if 'MTRCMD' in msg['msg_data'] else RCVD)
+    window = MessageSearch(store)
+    window.resize(900, 400)
+    window.query.setText('MTRCMD=STOP')
+    window.search()
+    window.show()
+    app.exec()
@@ -1,4 +1,5 @@
 from src.utils.telemetrygetter import TelemetryGetter
+from src.telemetry.checksum import COUNTERS
 from PySide6.QtWidgets import QApplication, QMessageBox
 from PySide6.QtCore import Qt, QTimer
 from enum import Enum
@@ -40,15 +41,32 @@ class ModeController(TelemetryGetter):
         Display the current mode on the UI.
         """
         try:
-            if self.server.conn == None:
+            if self.server.reconnecting:
+                self.ui.lb_status_val.setText('Переподключение...')
+            elif self.server.conn == None:
                 self.ui.lb_status_val.setText('Не подключен')
             else:
                 self.ui.lb_status_val.setText(str(self.server.addr[0]))
+            self.ui.statusbar.showMessage(self._link_summary())
         except AttributeError as _:
             self.ui.lb_status_val.setText('Не подключен')
 
         self.ui.lb_rmode_val.setText(self.mode.value)
 
+    def _link_summary(self) -> str:
+        """
+        Link health, command queue, reconnect and sentence checksum counters for the status bar.
+        """
+        outbox = self.server.outbox.stats()
+        summary = (f"{self.server.health.summary()}, очередь {outbox['depth']}, "
+                   f"отброшено {outbox['dropped']}, переподключений {self.server.reconnects}")
+        if self.server.reconnects:
+            summary += f" (последнее за {self.server.reconnect_time * 1000:.0f} мс)"
+        if self.server.recorder is not None:
+            summary += f", записано кадров {self.server.recorder.records}"
+        sentences = COUNTERS.summary()
+        return f"{summary}; {sentences}" if sentences else summary
+
     def set_manual_mode(self) -> None:
         """Set the mode to a manual control by the client."""
         if self.mode == ControlMode.MANUAL:
@@ -0,0 +1,207 @@
+from PySide6.QtCore import Qt, QPointF, QTimer
+from PySide6.QtGui import QColor, QPainter, QPen, QPixmap, QPolygonF
+from PySide6.QtWidgets import QApplication, QSizePolicy, QWidget
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import sys
+
+from src.telemetry.history import TelemetryHistory
+
+REFRESH_RATE: int = 30  # redraws per second at most
+WINDOW: float = 30.0  # s of history shown
+COLORS: Tuple[str, ...] = ('#d62728', '#2ca02c', '#1f77b4', '#ff7f0e')
+BUCKET_WIDTH: int = 2  # px per min/max bucket
+HEADROOM: float = 0.1  # share of the value range added above and below on a rescale
+MARGIN: int = 4
+
+Series = Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]]
+
+
+class TelemetryPlot(QWidget):
+    """
+    Scrolling chart of telemetry channels read from TelemetryHistory.
+
+    The chart is kept in a pixmap. As time advances, the pixmap is scrolled left and only the new strip
+    is drawn from the samples received since the last refresh, reduced to a min/max pair per
+    BUCKET_WIDTH pixels (TelemetryHistory.decimate), so a refresh costs the same whatever the input rate
+    or window length and spikes stay visible. The whole window is drawn again only after a resize,
+    a seek back in time, a value outside the scale, or once per window to let the scale shrink back.
+    Hidden charts are not drawn at all.
+    """
+
+    def __init__(self, history: TelemetryHistory, channels: List[str], title: str = '',
+                 window: float = WINDOW, parent: Optional[QWidget] = None) -> None:
+        """
+        :param history: Source of the samples.
+        :param channels: Channels drawn on the chart, all from the same sensor, e.g. ['axl_x', 'axl_y'].
+        :param title: Caption in the top left corner.
+        :param window: Length of the time axis, s.
+        """
+        super().__init__(parent)
+        self.history: TelemetryHistory = history
+        self.channels: List[str] = channels
+        self.title: str = title
+        self.window: float = window
+        self.sensor = history.sensors[history.kinds[channels[0]]]
+        self.pens: List[QPen] = [QPen(QColor(COLORS[i % len(COLORS)]), 0) for i in range(len(channels))]
+        self.full_redraws: int = 0
+        self.strip_redraws: int = 0
+
+        self._pixmap: Optional[QPixmap] = None
+        self._right: float = 0.0  # time at the right edge of the pixmap
+        self._fitted_at: float = 0.0  # time of the last full redraw
+        self._low: float = 0.0
+        self._high: float = 0.0
+        self._last: Dict[str, Tuple[float, float]] = {}  # last (time, value) drawn per channel
+
+        self.setMinimumHeight(120)
+        self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        self.setAttribute(Qt.WidgetAttribute.WA_OpaquePaintEvent)
+
+        self.timer: QTimer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(1000 // REFRESH_RATE)
+
+    def refresh(self) -> None:
+        """
+        Draw the samples received since the last refresh.
+        """
+        end = self.sensor.last_time()
+        if not self.isVisible() or end is None or end == self._right:
+            return
+        width, height = self.width() - 2 * MARGIN, self.height() - 2 * MARGIN
+        if width <= 0 or height <= 0:
+            return
+        if (self._pixmap is None or self._pixmap.width() != width or self._pixmap.height() != height
+                or end < self._right or end - self._fitted_at > self.window):
+            self._draw_window(end)
+        elif not self._draw_strip(end):
+            return
+        self.update()
+
+    def paintEvent(self, event) -> None:
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor('white'))
+        if self._pixmap is not None:
+            painter.drawPixmap(MARGIN, MARGIN, self._pixmap)
+        painter.setPen(QColor('gray'))
+        painter.drawText(self.width() - 60, self.height() - MARGIN, f'{self.window:g} с')
+        if self._pixmap is not None:
+            painter.drawText(self.width() - 60, MARGIN + 12, f'{self._high:.3g}')
+            painter.drawText(MARGIN, self.height() - MARGIN, f'{self._low:.3g}')
+        painter.drawText(MARGIN, MARGIN + 12, self.title)
+
+    def _draw_window(self, end: float) -> None:
+        """
+        Draw the whole window ending at `end`, fitting the scale to the values in it.
+        """
+        width, height = self.width() - 2 * MARGIN, self.height() - 2 * MARGIN
+        series = self._decimate(end - self.window, end, width)
+        values = [column for _, mins, maxs in series.values() for column in (mins, maxs) if len(column)]
+        low = min((float(column.min()) for column in values), default=0.0)
+        high = max((float(column.max()) for column in values), default=0.0)
+        headroom = max(high - low, 1e-6) * HEADROOM
+        self._low, self._high = low - headroom, high + headroom
+
+        if self._pixmap is None or self._pixmap.width() != width or self._pixmap.height() != height:
+            self._pixmap = QPixmap(width, height)
+        self._pixmap.fill(QColor('white'))
+        self._right = self._fitted_at = end
+        self._last = {}
+        self._draw_series(series)
+        self.full_redraws += 1
+
+    def _draw_strip(self, end: float) -> bool:
+        """
+        Scroll the pixmap by the whole pixels elapsed since the last refresh and draw only the new strip.
+
+        :return: False if less than a pixel has elapsed and nothing was drawn.
+        """
+        x_scale = self._pixmap.width() / self.window
+        shift = int((end - self._right) * x_scale)
+        if shift < 1:
+            return False
+        right = self._right + shift / x_scale
+        series = self._decimate(self._right, right, shift)
+        for _, mins, maxs in series.values():
+            if len(mins) and (mins.min() < self._low or maxs.max() > self._high):
+                self._draw_window(end)
+                return True
+
+        self._pixmap.scroll(-shift, 0, self._pixmap.rect())
+        painter = QPainter(self._pixmap)
+        painter.fillRect(self._pixmap.width() - shift, 0, shift, self._pixmap.height(), QColor('white'))
+        painter.end()
+        self._right = right
+        self._draw_series(series)
+        self.strip_redraws += 1
+        return True
+
+    def _decimate(self, start: float, end: float, width: int) -> Series:
+        buckets = max(width // BUCKET_WIDTH, 1)
+        return {name: self.history.decimate(name, buckets, start, end) for name in self.channels}
+
+    def _draw_series(self, series: Series) -> None:
+        """
+        Draw min/max envelopes on the pixmap, joined to the last point drawn of each channel.
+        """
+        width, height = self._pixmap.width(), self._pixmap.height()
+        x_scale = width / self.window
+        y_scale = height / (self._high - self._low)
+        painter = QPainter(self._pixmap)
+        for pen, (name, (times, mins, maxs)) in zip(self.pens, series.items()):
+            if not len(times):
+                continue
+            # Envelope: down to the minimum and up to the maximum of every bucket
+            xs = np.repeat(times, 2)
+            ys = np.column_stack((mins, maxs)).ravel().astype(np.float64)
+            if name in self._last:
+                xs = np.concatenate(([self._last[name][0]], xs))
+                ys = np.concatenate(([self._last[name][1]], ys))
+            self._last[name] = (float(xs[-1]), float(ys[-1]))
+            xs = width - (self._right - xs) * x_scale
+            ys = height - (ys - self._low) * y_scale
+            painter.setPen(pen)
+            painter.drawPolyline(QPolygonF([QPointF(x, y) for x, y in zip(xs.tolist(), ys.tolist())]))
+        painter.end()
+
+
+if __name__ == "__main__":
+    ## Refresh cost for 200 Hz IMU data
+    import time
+    import timeit
+    from src.telemetry.batch import TelemetryBatch
+
+    app = QApplication(sys.argv)
+    history = TelemetryHistory({'GPS': 1 << 10, 'IMU': 1 << 18})
+    received_at = time.monotonic() - 600
+
+    def receive(seconds: float, rate: int = 200) -> None:
+        global received_at
+        count = int(seconds * rate)
+        batch = TelemetryBatch('IMU', {name: np.random.randn(count).astype('f4') for name in ('axl_x', 'axl_y', 'axl_z')})
+        received_at += seconds
+        batch.received_at = received_at
+        history.add_batch(batch)
+
+    for _ in range(600):
+        receive(1.0)
+
+    for window in (30.0, 600.0):
+        plot = TelemetryPlot(history, ['axl_x', 'axl_y', 'axl_z'], 'IMU', window=window)
+        plot.resize(800 + 2 * MARGIN, 200 + 2 * MARGIN)
+        plot.show()
+        n = 20
+        elapsed = timeit.timeit(lambda: plot._draw_window(history.sensors['IMU'].last_time()), number=n)
+        print(f'window {window:g} s ({int(window * 200):,} samples per channel): full redraw {elapsed / n * 1e3:.2f} ms')
+
+        plot.full_redraws = 0
+        n = 600
+        started = time.perf_counter()
+        for _ in range(n):
+            receive(1 / REFRESH_RATE)
+            plot.refresh()
+        elapsed = time.perf_counter() - started
+        print(f'  refresh at {REFRESH_RATE} Hz: {elapsed / n * 1e3:.2f} ms '
+              f'({plot.strip_redraws} strips, {plot.full_redraws} full redraws in {n / REFRESH_RATE:g} s)')
+        plot.close()
@@ -1,12 +1,27 @@
 from src.utils.base import Base
+from src.telemetry.batch import TelemetryBatch
 from PySide6.QtWidgets import QApplication
-from PySide6.QtCore import Qt, QTimer
+from PySide6.QtCore import Qt, QTimer, Slot
+from typing import Dict
+import os
 import sys
+import time
+
+# 'auto' - subscribe and fall back to polling if the vehicle does not push, 'push' - subscribe only, 'poll' - request
+TELEMETRY_MODE = os.getenv("TELEMETRY_MODE", "auto")
+# Samples per second asked for by SUBSCRIBE
+PUSH_RATES: Dict[str, float] = {'gps': float(os.getenv("TELEMETRY_GPS_RATE", 5)),
+                                'imu': float(os.getenv("TELEMETRY_IMU_RATE", 100))}
+PUSH_TIMEOUT = 3.0  # s without pushed samples before 'auto' falls back to polling
+POLL_INTERVAL = 300  # ms
 
 
 class TelemetryGetter(Base):
     """
     Class TelemetryGetter is a GUI for getting telemetry data automatically and manually.
+
+    Automatic telemetry is subscribed to: the vehicle pushes samples at PUSH_RATES until the checkbox is
+    cleared, without a request per sample. Firmware that does not push is polled every POLL_INTERVAL ms.
     """
     def __init__(self):
         """
@@ -17,13 +32,24 @@ class TelemetryGetter(Base):
         """
         super().__init__()
         self._auto_state = {'gps': 0, 'imu': 0}
+        self.polling: bool = TELEMETRY_MODE == "poll"
+        self._subscribed_at: Dict[str, float] = {}
+        self._received_at: Dict[str, float] = {}
+        self.telemetry_batch_to_operator.connect(self._note_batch)
         self.ui.btn_gps.clicked.connect(lambda _: self.request_telemetry('gps'))
         self.ui.btn_imu.clicked.connect(lambda _: self.request_telemetry('imu'))
         self.ui.cb_auto_gps.stateChanged.connect(lambda _: self.update_auto_state('gps'))
         self.ui.cb_auto_imu.stateChanged.connect(lambda _: self.update_auto_state('imu'))
         self.auto_request_timer = QTimer()
         self.auto_request_timer.timeout.connect(self.auto_request_telemetry)
-        self.auto_request_timer.start(300)
+        self.auto_request_timer.start(POLL_INTERVAL)
+
+    def server_started_actions(self) -> None:
+        """
+        A new server session tries push telemetry again.
+        """
+        super().server_started_actions()
+        self.polling = TELEMETRY_MODE == "poll"
 
     def update_auto_state(self, telemetrytype):
         """
@@ -42,19 +68,53 @@ class TelemetryGetter(Base):
         Request telemetry data automatically.
 
         If the connection is established and the checkbox for a telemetry type is checked,
-        disables the respective button and makes an automatic request, else enables the button.
+        disables the respective button and subscribes to the telemetry or, when polling, makes an automatic
+        request, else enables the button and cancels the subscription.
         """
         try:
             if self.server.conn is not None:
                 for telemetrytype in ['gps', 'imu']:
-                    if self._auto_state[telemetrytype] == 1:
+                    auto = self._auto_state[telemetrytype] == 1
+                    if auto:
                         self.ui.__dict__[f'btn_{telemetrytype}'].setEnabled(False)
-                        self.request_telemetry(telemetrytype)
                     elif self._auto_state[telemetrytype] == 0:
                         self.ui.__dict__[f'btn_{telemetrytype}'].setEnabled(True)
+                    if not self.polling:
+                        self.update_subscription(telemetrytype, PUSH_RATES[telemetrytype] if auto else 0.0)
+                    elif auto:
+                        self.request_telemetry(telemetrytype)
         except AttributeError as _:
             pass
 
+    def update_subscription(self, telemetrytype, rate):
+        """
+        Bring the server's subscription in line with the checkbox; in 'auto' mode switch to polling
+        if the vehicle has not pushed anything PUSH_TIMEOUT seconds after subscribing.
+
+        @param telemetrytype: String representing the type of telemetry ('gps' or 'imu').
+        @param rate: Samples per second wanted, 0 to stop.
+        """
+        kind = telemetrytype.upper()
+        now = time.monotonic()
+        if self.server.subscriptions.get(kind, 0.0) != rate:
+            # Checkbox changed, a new server or another vehicle selected
+            self.server.signals.subscribe.emit(kind, rate)
+            self._subscribed_at[telemetrytype] = now
+            return
+        subscribed_at = self._subscribed_at.setdefault(telemetrytype, now)
+        if (rate and TELEMETRY_MODE == "auto" and self._received_at.get(telemetrytype, 0.0) < subscribed_at
+                and now - subscribed_at > PUSH_TIMEOUT):
+            print(f" [INFO] - Аппарат не передаёт {kind} по подписке, переход на опрос каждые {POLL_INTERVAL} мс")
+            self.polling = True
+            for subscribed in [k for k, r in self.server.subscriptions.items() if r]:
+                self.server.signals.subscribe.emit(subscribed, 0.0)
+
+    @Slot(object)
+    def _note_batch(self, batch: TelemetryBatch) -> None:
+        if not len(batch):
+            return
+        self._received_at[batch.kind.lower()] = time.monotonic()
+
     def request_telemetry(self, telemetrytype):
         """
         Emit a signal to request telemetry data of a specific type.
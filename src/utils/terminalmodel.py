@@ -0,0 +1,326 @@
+from PySide6.QtCore import QAbstractListModel, QModelIndex, Qt
+from collections import OrderedDict, deque
+from typing import Any, Deque, Iterable, List, Optional, Tuple
+import bisect
+import datetime
+import os
+
+from src.server.messages import Frame
+
+CAPACITY: int = int(os.getenv('TERMINAL_MESSAGES', 5000))  # messages kept in the terminal
+CACHED_MESSAGES: int = 256  # formatted messages kept for repaints and scrolling
+GROUP_WINDOW: int = 4  # a message joins a group of the same shape among this many newest groups
+GROUP_FRAMES: int = 500  # messages of a group kept for expanding it
+# Values shown whole; the others are sentences whose last 4 characters (",*crc") are cut off
+FULL_VALUE_KEYS: Tuple[str, ...] = ('INFO', 'SETMODE', 'MANKEYCMD', 'MANLINECM', 'GPSBATCH', 'IMUBATCH', 'SUBSCRIBE')
+
+
+def line_count(frame: Frame) -> int:
+    """
+    Number of lines format_lines() gives for a frame, without formatting it.
+    """
+    arguments = sum(command.value is not None for command in frame.commands)
+    return 2 + bool(frame.commands) + arguments + len(frame.data)
+
+
+def format_lines(frame: Frame, msg_type: str) -> List[str]:
+    """
+    Lines of a message in the terminal: capture time and direction, commands, data, an empty separator.
+    """
+    moment = datetime.datetime.fromtimestamp(frame.timestamp).strftime('%H:%M:%S.%f')[:-3]
+    lines = [f'{moment} - {msg_type}']
+    if frame.commands:
+        lines.append('CMD: ' + ''.join([f'{command.name} ' for command in frame.commands]))
+    for key, value in frame.items():
+        value_string = str(value) if key in FULL_VALUE_KEYS else str(value)[:-4]
+        lines.append(f'{key}: {value_string}')
+    lines.append('')
+    return lines
+
+
+class MessageGroup:
+    """
+    Messages of the same shape shown as one: same direction, commands with their arguments and data keys;
+    only the data values differ (e.g. successive GPS responses) or nothing does (repeated requests).
+    """
+    __slots__ = ('shape', 'msg_type', 'frames', 'count', 'first', 'expanded', 'rows', 'lines')
+
+    def __init__(self, frame: Frame, msg_type: str, shape: Optional[tuple]) -> None:
+        self.shape: Optional[tuple] = shape
+        self.msg_type: str = msg_type
+        self.frames: Deque[Frame] = deque((frame,), maxlen=GROUP_FRAMES)
+        self.count: int = 1
+        self.first: float = frame.timestamp
+        self.expanded: bool = False
+        self.rows: int = line_count(frame)
+        self.lines: Optional[List[str]] = None  # formatted rows, None until shown
+
+    def format(self) -> List[str]:
+        """
+        Lines of the newest message with the repeat counter and the first time seen in its first line,
+        followed, if expanded, by the older messages kept.
+        """
+        lines = []
+        for frame in reversed(self.frames) if self.expanded else (self.frames[-1],):
+            lines.extend(format_lines(frame, self.msg_type))
+        if self.count > 1:
+            moment = datetime.datetime.fromtimestamp(self.first).strftime('%H:%M:%S.%f')[:-3]
+            lines[0] += f' ×{self.count} с {moment} {"▾" if self.expanded else "▸"}'
+        return lines
+
+
+class TerminalModel(QAbstractListModel):
+    """
+    Lines of the terminal, newest message first, one row per line.
+
+    Frames are kept as received, with their direction, in a ring of at most `capacity` messages: adding
+    one inserts only its rows and, once the ring is full, removes the rows of the oldest one. Nothing is
+    formatted on arrival; a message is formatted when one of its rows is shown or copied, and the lines
+    of the last CACHED_MESSAGES formatted messages are kept. Shown in a QTableView with fixed row heights,
+    which positions rows arithmetically and paints only the visible ones, so the cost of a message does
+    not depend on how much is kept. (A QListView lays out every row again on each insert.)
+
+    A message of the same shape as one of the last GROUP_WINDOW shown (see MessageGroup) is added to it
+    instead: the group stays where it is shown and updates its newest message and repeat counter, so the
+    order of the groups is the order of their first messages and nothing already shown is moved; steady
+    polling, where requests and responses alternate, keeps two rows updating in place. toggle() expands
+    a group into its last GROUP_FRAMES messages and collapses it back.
+    """
+
+    def __init__(self, capacity: int = CAPACITY, group: bool = True) -> None:
+        """
+        :param capacity: Number of messages (groups) kept; older ones are dropped one by one.
+        :param group: Whether repeated messages are grouped.
+        """
+        super().__init__()
+        self.capacity: int = max(capacity, 1)
+        self.group: bool = group
+        self.formatted: int = 0
+        # Groups from the oldest to the newest, kept from self._head on
+        self._groups: List[Optional[MessageGroup]] = []
+        self._ends: List[int] = []  # rows of the groups up to and including each one
+        self._head: int = 0
+        self._first_line: int = 0  # rows of the dropped groups
+        self._cache: OrderedDict = OrderedDict()  # id -> group with formatted lines
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._total() - self._first_line
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self._line(index.row())
+        if role == Qt.ItemDataRole.ToolTipRole:
+            group = self._groups[self._position(index.row())]
+            if group.count > 1:
+                return 'Двойной щелчок - свернуть' if group.expanded else 'Двойной щелчок - показать все'
+        return None
+
+    def add_message(self, frame: Frame, msg_type: str) -> int:
+        """
+        Put a message on top, or into its group where that is shown, O(1); it is formatted only when shown.
+
+        :param msg_type: Direction shown in the first line, SEND or RCVD.
+        :return: Number of rows inserted, on top or into an expanded group.
+        """
+        shape = (msg_type, frame.commands, tuple(frame.data)) if self.group else None
+        if shape is not None:
+            for position in range(len(self._groups) - 1, max(len(self._groups) - GROUP_WINDOW, self._head) - 1, -1):
+                if self._groups[position].shape == shape:
+                    return self._add_to_group(position, frame)
+
+        if self.messages() >= self.capacity:
+            self._drop_oldest()
+        group = MessageGroup(frame, msg_type, shape)
+        self.beginInsertRows(QModelIndex(), 0, group.rows - 1)
+        self._groups.append(group)
+        self._ends.append(self._total() + group.rows)
+        self.endInsertRows()
+        return group.rows
+
+    def toggle(self, row: int) -> None:
+        """
+        Expand the group shown at a row into all its kept messages, or collapse it back.
+        """
+        position = self._position(row)
+        group = self._groups[position]
+        if len(group.frames) < 2:
+            return
+        start = self._total() - self._ends[position]
+        rows = group.rows
+        expanded = sum(line_count(frame) for frame in group.frames) if not group.expanded else line_count(group.frames[-1])
+        if expanded > rows:
+            self.beginInsertRows(QModelIndex(), start + rows, start + expanded - 1)
+        else:
+            self.beginRemoveRows(QModelIndex(), start + expanded, start + rows - 1)
+        group.expanded = not group.expanded
+        group.rows = expanded
+        self._forget(group)
+        for i in range(position, len(self._ends)):
+            self._ends[i] += expanded - rows
+        if expanded > rows:
+            self.endInsertRows()
+        else:
+            self.endRemoveRows()
+        self.dataChanged.emit(self.index(start), self.index(start))
+
+    def clear(self) -> None:
+        self.beginResetModel()
+        self._groups = []
+        self._ends = []
+        self._head = 0
+        self._first_line = 0
+        self._cache.clear()
+        self.endResetModel()
+
+    def messages(self) -> int:
+        """
+        Number of rows of messages, i.e. groups.
+        """
+        return len(self._groups) - self._head
+
+    def text(self, rows: Iterable[int]) -> str:
+        """
+        Lines of the given rows in the order shown, e.g. for copying a selection.
+        """
+        return '\n'.join([self._line(row) for row in sorted(rows)])
+
+    def _total(self) -> int:
+        return self._ends[-1] if self._ends else 0
+
+    def _position(self, row: int) -> int:
+        # The newest group is on top: row 0 is the first line of the last group
+        return bisect.bisect_left(self._ends, self._total() - row, self._head)
+
+    def _line(self, row: int) -> str:
+        position = self._position(row)
+        group = self._groups[position]
+        if group.lines is None:
+            group.lines = group.format()
+            self.formatted += 1
+            self._cache[id(group)] = group
+            if len(self._cache) > CACHED_MESSAGES:
+                self._cache.popitem(last=False)[1].lines = None
+        else:
+            self._cache.move_to_end(id(group))
+        return group.lines[row - (self._total() - self._ends[position])]
+
+    def _forget(self, group: MessageGroup) -> None:
+        group.lines = None
+        self._cache.pop(id(group), None)
+
+    def _add_to_group(self, position: int, frame: Frame) -> int:
+        """
+        Add a frame to a group where it is shown, leaving the other groups in their order.
+        """
+        group = self._groups[position]
+        start = self._total() - self._ends[position]
+        inserted = 0
+        # Lines are forgotten before every end*Rows(): views read rows in between and would cache stale ones
+        if group.expanded:
+            if len(group.frames) == group.frames.maxlen:
+                # The oldest kept message goes off the bottom of the group
+                dropped = line_count(group.frames[0])
+                self.beginRemoveRows(QModelIndex(), start + group.rows - dropped, start + group.rows - 1)
+                group.frames.popleft()
+                group.rows -= dropped
+                for i in range(position, len(self._ends)):
+                    self._ends[i] -= dropped
+                self._forget(group)
+                self.endRemoveRows()
+            # Messages of a group have the same rows: the new one takes the rows of the first shown, which
+            # moves down as new rows, so the rows below keep their lines
+            inserted = line_count(frame)
+            self.beginInsertRows(QModelIndex(), start + inserted, start + 2 * inserted - 1)
+            group.frames.append(frame)
+            group.count += 1
+            group.rows += inserted
+            for i in range(position, len(self._ends)):
+                self._ends[i] += inserted
+            self._forget(group)
+            self.endInsertRows()
+        else:
+            group.frames.append(frame)
+            group.count += 1
+            self._forget(group)
+        self.dataChanged.emit(self.index(start), self.index(start + group.rows - 1))
+        return inserted
+
+    def _drop_oldest(self) -> None:
+        end = self.rowCount()
+        size = self._ends[self._head] - self._first_line
+        self.beginRemoveRows(QModelIndex(), end - size, end - 1)
+        self._first_line = self._ends[self._head]
+        self._forget(self._groups[self._head])
+        self._groups[self._head] = None
+        self._head += 1
+        if self._head >= 1024 and 2 * self._head >= len(self._groups):
+            del self._groups[:self._head]
+            del self._ends[:self._head]
+            self._head = 0
+        self.endRemoveRows()
+
+
+if __name__ == "__main__":
+    ## Cost of a message at 10 messages/s with a full terminal: whole-text rebuild vs the model
+    import sys
+    import time
+    from PySide6.QtWidgets import QApplication, QHeaderView, QTableView, QTextBrowser
+
+    app = QApplication(sys.argv)
+    frame = Frame.from_msg({'status': 'RESPONSE', 'cmd': ['GPS', 'IMU'], 'msg_data': {
+        'GPSRESPONSE': 'D,s,1,1,5520.0459,N,2047.5840,E,15.2,123752,38.000,48.000,*73', 'IMUBATCH': '10 samples'}})
+    message = '\n'.join(format_lines(frame, 'RCVD')) + '\n'
+
+    def measure(name: str, add) -> None:
+        app.processEvents()
+        n = 100
+        started = time.perf_counter()
+        for _ in range(n):
+            add()
+            app.processEvents()  # layout and paint, one message per event loop pass as at 10 messages/s
+        print(f'{name:<40} {(time.perf_counter() - started) / n * 1e3:7.3f} ms per message')
+
+    for kept in (100, 1000, 5000):
+        browser = QTextBrowser()
+        browser.resize(460, 240)
+        browser.show()
+        text = [message * kept]
+        browser.setText(text[0])
+
+        def rebuild() -> None:
+            text[0] = message + text[0]
+            browser.setText(text[0])
+
+        measure(f'QTextBrowser.setText, {kept} messages', rebuild)
+        browser.close()
+
+        view = QTableView()
+        view.horizontalHeader().hide()
+        view.horizontalHeader().setStretchLastSection(True)
+        view.verticalHeader().hide()
+        view.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        view.setModel(TerminalModel(capacity=kept, group=False))
+        for _ in range(kept):
+            view.model().add_message(frame, 'RCVD')
+        view.resize(460, 240)
+        view.show()
+        measure(f'TerminalModel + QTableView, {kept} messages', lambda: view.model().add_message(frame, 'RCVD'))
+        view.model().group = True
+        measure(f'  grouped, {kept} messages', lambda: view.model().add_message(frame, 'RCVD'))
+        view.close()
+
+    # Work left on the hot path while the terminal is not looked at
+    model = TerminalModel(group=False)
+    n = 100_000
+    started = time.perf_counter()
+    for _ in range(n):
+        format_lines(frame, 'RCVD')
+    eager = time.perf_counter() - started
+    started = time.perf_counter()
+    for _ in range(n):
+        model.add_message(frame, 'RCVD')
+    lazy = time.perf_counter() - started
+    print(f'add_message {lazy / n * 1e6:.1f} us per message; formatting no longer done per message '
+          f'{eager / n * 1e6:.1f} us, done {model.formatted} times')
@@ -1,9 +1,14 @@
 from src.utils.manualkeyscontrol import ManualKeysControl
-from PySide6.QtWidgets import QApplication, QMessageBox
-from PySide6.QtCore import Qt, QTimer, Slot
+from src.utils.terminalmodel import TerminalModel
+from src.utils.messagesearch import MessageSearch
+from src.server.messages import Frame
+from src.server.messagestore import MessageStore
+from src.server.recorder import DIRECTIONS
+from PySide6.QtWidgets import QApplication, QDockWidget, QHeaderView, QMessageBox
+from PySide6.QtGui import QKeySequence, QShortcut
+from PySide6.QtCore import Qt, Slot
 from typing import Dict,List
 import sys
-import datetime
 
 
 class TerminalWindow(ManualKeysControl):
@@ -17,98 +22,73 @@ class TerminalWindow(ManualKeysControl):
         Constructs necessary attributes for the TerminalWindow object.
         """
         super().__init__()
-        self.current_text: str = ""
+        self.terminal_model: TerminalModel = TerminalModel()
+        self.ui.terminal_window.setModel(self.terminal_model)
+        rows: QHeaderView = self.ui.terminal_window.verticalHeader()
+        rows.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        rows.setDefaultSectionSize(self.ui.terminal_window.fontMetrics().height() + 2)
+        # Repeated messages are grouped; a double click shows all messages of a group
+        self.ui.terminal_window.doubleClicked.connect(lambda index: self.terminal_model.toggle(index.row()))
         self.msg_to_terminal.connect(self.show_msg)
 
-        self.terminal_cleaner = QTimer()
-        self.terminal_cleaner.timeout.connect(self._clean_by_timer)
-        self.terminal_cleaner.start(300)
+        # Whole history of the session, searchable in a dock
+        self.message_store: MessageStore = MessageStore()
+        self.search_dock = QDockWidget('Поиск сообщений', self)
+        self.search_dock.setObjectName('search_dock')
+        self.search_dock.setWidget(MessageSearch(self.message_store))
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.search_dock)
 
+        self.terminal_copy = QShortcut(QKeySequence.StandardKey.Copy, self.ui.terminal_window, self._copy_selection,
+                                       context=Qt.ShortcutContext.WidgetShortcut)
         self.ui.btn_clean_textBrw.clicked.connect(self._clean_by_button)
 
-    def _clean_by_timer(self) -> None:
-        """
-        If the current text exceeds 2000 characters, it is cleared.
-        """
-        if len(self.current_text) > 2000:
-            self.current_text = ''
-
     def _clean_by_button(self) -> None:
         """
         Clears the current display text in the terminal.
 
         """
-        self.current_text = ''
+        self.terminal_model.clear()
 
-    def _add_to_terminal(self, message: str) -> None:
+    def _copy_selection(self) -> None:
         """
-        Adds a given message to the terminal.
-
-        Parameters:
-            message (str): The message to be added.
+        Copies the selected lines of the terminal to the clipboard.
         """
-        self.current_text = f'{message}' + self.current_text
-        self.ui.terminal_window.setText(self.current_text)
+        rows = [index.row() for index in self.ui.terminal_window.selectionModel().selectedRows()]
+        if rows:
+            QApplication.clipboard().setText(self.terminal_model.text(rows))
 
-    @Slot(object)
-    def show_msg(self, data: Dict, msg_type: str) -> None:
+    def _add_to_terminal(self, frame: Frame, msg_type: str) -> None:
         """
-        Displays a given message based on the provided data and message type.
+        Adds a given message on top of the terminal. The oldest message is dropped once the terminal is full.
+        If the operator has scrolled down, the view stays on the lines being read.
 
         Parameters:
-            data (Dict): The data based on which the message is created.
+            frame (Frame): The frame to be added; it is formatted when scrolled into view.
             msg_type (str): The type of the message.
         """
-        try:
-            if data['msg_data'] == {} and data['cmd'] == []:
-                return
-        except KeyError:
-            return
-
-        if list(data['msg_data'].keys()) == ['INFO']:
-            return
-
-        message = self._create_message(data, msg_type)
-        self._add_to_terminal(message)
-
-    def _create_message(self, data: Dict, msg_type: str) -> str:
+        scrollbar = self.ui.terminal_window.verticalScrollBar()
+        position = scrollbar.value()
+        inserted = self.terminal_model.add_message(frame, msg_type)
+        if position:
+            scrollbar.setMaximum(scrollbar.maximum() + inserted)
+            scrollbar.setValue(position + inserted)
+
+    @Slot(object, str)
+    def show_msg(self, frame: Frame, msg_type: str) -> None:
         """
-        Creates a formatted message from given data and message type.
+        Displays a given message based on the provided frame and message type.
 
         Parameters:
-            data (Dict): The data based on which the message is created.
+            frame (Frame): The frame based on which the message is created.
             msg_type (str): The type of the message.
-
-        Returns:
-            str: The constructed message.
         """
-        message = self._current_time() + f' - {msg_type}' + '\n'
-        try:
-            if len(data['cmd']) != 0:
-                message += 'CMD: '
-                for command in data['cmd']:
-                    message += f'{command} '
-                message += '\n'
-        except Exception as _:
-            pass
-
-        for key in data['msg_data']:
-            value_string = f'{str(data["msg_data"][key])[:-4]}\n'
-            if key in ['INFO', 'SETMODE', 'MANKEYCMD', 'MANLINECM']:
-                value_string = f'{str(data["msg_data"][key])}\n'
-            message += f'{key}: {value_string}'
-
-        return message + '\n'
-
-    @staticmethod
-    def _current_time() -> str:
-        """
-        Returns the current date and time as a string.
+        if frame.is_empty():
+            return
+        self.message_store.add(frame, DIRECTIONS.index(msg_type))
+        if frame.is_info():
+            return
 
-        Returns:
-            str: The current time as a string in HH:MM:SS.fff format
-        """
-        return datetime.datetime.now().strftime("%H:%M:%S.%f")[:-3]
+        self._add_to_terminal(frame, msg_type)
 
 
 if __name__ == "__main__":
@@ -1,8 +1,10 @@
 from PySide6.QtCore import Signal, QThread
+from typing import Dict, Optional
 import numpy as np
 import cv2
 from dotenv import load_dotenv
 import os
+import threading
 
 load_dotenv()
 
@@ -11,10 +13,17 @@ class VideoThread(QThread):
     """
     A class to represent a video capturing thread.
 
+    Decoded frames are not queued to the GUI: each one replaces the previous in a one-frame mailbox,
+    and frame_ready is emitted only when the mailbox was empty, so at most one notification is pending
+    however busy the GUI is. The GUI takes the newest frame with take_frame(); frames replaced before
+    they were taken are counted as dropped.
+
     Attributes
     ----------
-    change_pixmap_signal : Signal
-        The signal that emits numpy array of image data.
+    frame_ready : Signal
+        The signal that tells the GUI a new frame is waiting in the mailbox.
+    decoded, displayed, dropped : int
+        Frames read from the source, taken by the GUI, and replaced before being taken.
     _run_flag : bool
         The flag to control the running of thread.
 
@@ -22,11 +31,15 @@ class VideoThread(QThread):
     -------
     run():
         The main function of the thread to capture video from a source.
+    take_frame():
+        Returns the newest frame and empties the mailbox.
+    stats():
+        Returns the frame counters.
     stop():
         Stops the running thread.
     """
 
-    change_pixmap_signal: Signal = Signal(np.ndarray)
+    frame_ready: Signal = Signal()
 
     def __init__(self) -> None:
         """
@@ -34,6 +47,11 @@ class VideoThread(QThread):
         """
         super().__init__()
         self._run_flag: bool = True
+        self.decoded: int = 0
+        self.displayed: int = 0
+        self.dropped: int = 0
+        self._frame: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
 
     def run(self) -> None:
         """
@@ -46,13 +64,97 @@ class VideoThread(QThread):
         while self._run_flag:
             ret, cv_img = cap.read()
             if ret:
-                self.change_pixmap_signal.emit(cv_img)
+                self._post(cv_img)
         # shut down capture system
         cap.release()
 
+    def take_frame(self) -> Optional[np.ndarray]:
+        """
+        Returns the newest frame and empties the mailbox; None if no new frame arrived since the last call.
+        """
+        with self._lock:
+            frame, self._frame = self._frame, None
+        if frame is not None:
+            self.displayed += 1
+        return frame
+
+    def stats(self) -> Dict[str, int]:
+        return {'decoded': self.decoded, 'displayed': self.displayed, 'dropped': self.dropped}
+
     def stop(self) -> None:
         """
         Sets run flag to False and waits for the thread to finish.
         """
         self._run_flag = False
         self.wait()
+
+    def _post(self, cv_img: np.ndarray) -> None:
+        """
+        Puts a decoded frame into the mailbox, replacing the one the GUI has not taken yet.
+        """
+        with self._lock:
+            was_empty = self._frame is None
+            self._frame = cv_img
+            self.decoded += 1
+            if not was_empty:
+                self.dropped += 1
+        if was_empty:
+            self.frame_ready.emit()
+
+
+if __name__ == "__main__":
+    ## A 200 fps source and a GUI that needs 20 ms per frame: what is queued and how late frames are shown
+    import sys
+    import time
+    from PySide6.QtCore import QCoreApplication, Qt
+
+    class FakeCapture:
+        def __init__(self, source) -> None:
+            self.frames = 0
+
+        def read(self):
+            time.sleep(1 / 200)
+            frame = np.zeros((360, 640, 3), dtype=np.uint8)
+            frame[0, :4, 0] = np.frombuffer(np.uint32(self.frames).tobytes(), np.uint8)
+            self.frames += 1
+            return True, frame
+
+        def release(self) -> None:
+            pass
+
+    cv2.VideoCapture = FakeCapture
+
+    class QueueingThread(VideoThread):
+        """
+        The previous behaviour: every decoded frame is emitted to the GUI.
+        """
+        change_pixmap_signal: Signal = Signal(np.ndarray)
+
+        def _post(self, cv_img: np.ndarray) -> None:
+            self.decoded += 1
+            self.change_pixmap_signal.emit(cv_img)
+
+    app = QCoreApplication(sys.argv)
+    # The mailbox first: frames still queued by the old behaviour would be drawn during the next run
+    for thread in (VideoThread(), QueueingThread()):
+        shown = []
+
+        def draw(cv_img: np.ndarray, shown: list = shown) -> None:
+            time.sleep(0.02)
+            shown.append(int(np.frombuffer(cv_img[0, :4, 0].tobytes(), np.uint32)[0]))
+
+        if isinstance(thread, QueueingThread):
+            thread.change_pixmap_signal.connect(draw, Qt.ConnectionType.QueuedConnection)
+        else:
+            thread.frame_ready.connect(lambda thread=thread: draw(thread.take_frame()), Qt.ConnectionType.QueuedConnection)
+        thread.start()
+        started = time.monotonic()
+        while time.monotonic() - started < 2.0:
+            app.processEvents()
+        thread._run_flag = False
+        thread.wait()
+        queued = thread.decoded - len(shown) - thread.dropped
+        lag = thread.decoded - 1 - shown[-1]
+        print(f'{type(thread).__name__:<15} decoded {thread.decoded}, shown {len(shown)}, dropped {thread.dropped}, '
+              f'still queued {queued} ({queued * 640 * 360 * 3 / 2 ** 20:.0f} MiB); '
+              f'the last frame shown was {lag} frames ({lag / 200:.2f} s) old')
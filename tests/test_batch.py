@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from src.server.codec import BINARY_CODEC
+from src.server.server import ServerThread
+from src.telemetry.batch import TelemetryBatch
+
+IMU_SENTENCE = 'D,s,1,3,0.012,-0.981,9.806,*41'
+
+
+def test_last_sample():
+    batch = TelemetryBatch.from_sentences('IMU', [IMU_SENTENCE, 'D,s,1,3,0.5,0.5,0.5,*00'])
+    assert len(batch) == 2 and batch.last().axl_x == np.float32(0.5)
+
+
+@pytest.mark.parametrize('sentences', [[], ['garbage'], ['D,s,1,1,5520.0459,N,*73']])
+def test_empty_batch(sentences):
+    batch = TelemetryBatch.from_sentences('IMU', sentences)
+    assert len(batch) == 0 and batch.last() is None and str(batch) == '0 samples'
+
+
+@pytest.mark.parametrize('sentences', [[], ['garbage']])
+def test_frame_without_samples_has_no_batches(sentences):
+    frame = ServerThread._frame({'status': 'RESPONSE', 'cmd': [], 'msg_data': {'IMUBATCH': sentences}})
+    assert frame.batches == () and len(frame.data['IMUBATCH']) == 0
+
+
+def test_binary_frame_without_samples_has_no_batches():
+    binary = BINARY_CODEC.decode(BINARY_CODEC.encode({'status': 'RESPONSE', 'cmd': [], 'msg_data': {'IMUBATCH': []}}))
+    assert ServerThread._frame(binary).batches == ()
+
+
+def test_frame_keeps_batches_with_samples():
+    frame = ServerThread._frame({'status': 'RESPONSE', 'cmd': [], 'msg_data': {
+        'IMUBATCH': [IMU_SENTENCE, 'garbage'], 'GPSBATCH': []}})
+    assert [(batch.kind, len(batch)) for batch in frame.batches] == [('IMU', 1)]
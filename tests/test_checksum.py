@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from src.telemetry import checksum as checksum_module
+from src.telemetry.checksum import CORRUPT, MALFORMED, VALID, SentenceCounters, checksum, validate
+from src.telemetry.parser import parse_sentences
+
+# Sentences as documented for the firmware
+GPS_SENTENCE = 'D,s,1,1,5520.0459,N,2047.5840,E,15.2,123752,38.000,48.000,*73'
+IMU_SENTENCE = 'D,s,1,3,0.012,-0.981,9.806,*41'
+
+
+@pytest.fixture
+def stand_in_algorithm(monkeypatch):
+    # Not the firmware's algorithm, which is unknown: only exercises the hook
+    monkeypatch.setattr(checksum_module, 'ALGORITHM', lambda data: sum(data) % 256)
+
+
+def test_documented_sentences_are_parsed_by_default():
+    counters = SentenceCounters()
+    parsed = parse_sentences([GPS_SENTENCE, IMU_SENTENCE], counters)
+    assert parsed['GPS'][0]['latitude'] == 5520.0459 and parsed['IMU'][0]['axl_z'] == np.float32(9.806)
+    assert counters.stats() == {'GPS': {'valid': 1, 'corrupt': 0, 'malformed': 0},
+                                'IMU': {'valid': 1, 'corrupt': 0, 'malformed': 0}}
+
+
+def test_without_algorithm_only_the_ending_is_checked():
+    assert checksum_module.ALGORITHM is None
+    sentences = [GPS_SENTENCE, IMU_SENTENCE, IMU_SENTENCE.split('*')[0], IMU_SENTENCE.replace('*41', '*4x'),
+                 IMU_SENTENCE.replace('*41', '*1234')]
+    expected = [VALID, VALID, MALFORMED, MALFORMED, MALFORMED]
+    assert validate(sentences).tolist() == expected
+    assert validate(sentences * 4).tolist() == expected * 4
+    counters = SentenceCounters()
+    assert len(parse_sentences(sentences, counters, verify=True)['IMU']) == 1
+    assert counters.stats()['IMU'] == {'valid': 1, 'corrupt': 0, 'malformed': 3}
+
+
+def test_validate_small_and_vectorized_batches(stand_in_algorithm):
+    bodies = [f'D,s,1,3,0.{i:03d},-0.981,9.806,' for i in range(40)]
+    sentences = [f'{body}*{checksum(body)}' for body in bodies]
+    sentences[1] = sentences[1].replace('D,s,1,3,', 'D,s,1,3,1')
+    sentences[2] = sentences[2].split('*')[0]
+    expected = [VALID, CORRUPT, MALFORMED] + [VALID] * 37
+    assert validate(sentences).tolist() == expected
+    assert validate(sentences[:3]).tolist() == expected[:3]
+
+
+def test_verified_parse_rejects_corrupt_sentences(stand_in_algorithm):
+    body = 'D,s,1,3,0.5,-0.981,9.806,'
+    counters = SentenceCounters()
+    parsed = parse_sentences([f'{body}*{checksum(body)}', f'{body}*{(checksum(body) + 1) % 256}'], counters,
+                             verify=True)
+    assert len(parsed['IMU']) == 1
+    assert counters.stats()['IMU'] == {'valid': 1, 'corrupt': 1, 'malformed': 0}
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from src.server.codec import BINARY_CODEC, JSON_CODEC, CodecError, detect_codec, encode_message
+from src.telemetry.batch import TelemetryBatch
+from src.telemetry.checksum import checksum
+
+GPS_SENTENCE = 'D,s,1,1,5520.0459,N,2047.5840,E,15.2,123752,38.000,48.000,*73'
+IMU_SENTENCE = 'D,s,1,3,0.012,-0.981,9.806,*41'
+
+SAMPLES = [
+    {'status': 'RESPONSE', 'cmd': [], 'msg_data': {'GPSRESPONSE': GPS_SENTENCE, 'IMURESPONSE': IMU_SENTENCE}},
+    {'cmd': ['GPS', 'IMU', 'MTRCMD', 'SETMODE'], 'msg_data': {'MTRCMD': 'STOP', 'SETMODE': 'RMT'}},
+    {'cmd': ['MANKEYCMD'], 'msg_data': {'MANKEYCMD': 'F55'}, 'seq': 1000},
+    {'cmd': ['NEWCMD'], 'msg_data': {'NEWKEY': 'значение'}, 'ack': 300},
+]
+
+
+@pytest.mark.parametrize('codec', (JSON_CODEC, BINARY_CODEC), ids=lambda codec: codec.name)
+@pytest.mark.parametrize('sample', SAMPLES)
+def test_round_trip(codec, sample):
+    assert codec.decode(codec.encode(sample)) == sample
+
+
+def test_single_sentences_keep_their_text():
+    # 0.5 must not come back as 0.500: the checksum is of the text the vehicle wrote
+    body = 'D,s,1,3,0.5,-0.981,9.806,'
+    msg = {'status': 'RESPONSE', 'cmd': [], 'msg_data': {'IMURESPONSE': f'{body}*{checksum(body)}'}}
+    assert BINARY_CODEC.decode(BINARY_CODEC.encode(msg)) == msg
+
+
+def test_batch_is_decoded_into_columns():
+    batch = {'status': 'RESPONSE', 'cmd': [], 'msg_data': {
+        'IMUBATCH': [f'D,s,1,3,0.{i:03d},-0.981,9.806,*41' for i in range(100)],
+        'GPSBATCH': [GPS_SENTENCE] * 3}}
+    msg_data = BINARY_CODEC.decode(BINARY_CODEC.encode(batch))['msg_data']
+    imu, gps = msg_data['IMUBATCH'], msg_data['GPSBATCH']
+    assert isinstance(imu, TelemetryBatch) and imu.kind == 'IMU'
+    assert imu.columns['axl_x'].tolist() == [np.float32(f'0.{i:03d}') for i in range(100)]
+    assert len(gps) == 3 and gps.last().NS == 'N' and gps.last().latitude == 5520.0459
+
+
+@pytest.mark.parametrize('payload', (b'', b'\xb5\x63', b'\xb5\x01\x10ab', b'{"cmd": []}'))
+def test_binary_rejects_foreign_or_truncated_frames(payload):
+    with pytest.raises(CodecError):
+        BINARY_CODEC.decode(payload)
+
+
+def test_binary_only_for_batches():
+    command = SAMPLES[1]
+    assert detect_codec(encode_message(command, BINARY_CODEC)) is JSON_CODEC
+    batch = {'status': 'RESPONSE', 'cmd': [], 'msg_data': {'IMUBATCH': [IMU_SENTENCE] * 10}}
+    assert detect_codec(encode_message(batch, BINARY_CODEC)) is BINARY_CODEC
+    assert detect_codec(encode_message(batch, JSON_CODEC)) is JSON_CODEC
+
+
+def test_fallback_to_json():
+    batch = {'status': 'RESPONSE', 'cmd': [], 'msg_data': {'IMUBATCH': ['not a sentence']}}
+    payload = encode_message(batch, BINARY_CODEC)
+    assert detect_codec(payload) is JSON_CODEC and JSON_CODEC.decode(payload) == batch
@@ -0,0 +1,80 @@
+import socket
+import time
+
+import pytest
+
+from src.server.framing import BUFFER_SIZE, HEADER_SIZE, FrameDecoder, FrameError, encode_frame
+
+PAYLOADS = [b'{"cmd": [], "msg_data": {}}', b'', b'x' * 3000, bytes(range(256))]
+
+
+def test_frames_split_at_every_byte():
+    stream = b''.join(encode_frame(payload) for payload in PAYLOADS)
+    decoder = FrameDecoder()
+    frames = []
+    for i in range(len(stream)):
+        frames.extend(decoder.feed(stream[i:i + 1]))
+    assert frames == PAYLOADS and decoder.pending() == 0
+
+
+def test_several_frames_in_one_read_and_a_partial_tail():
+    stream = b''.join(encode_frame(payload) for payload in PAYLOADS)
+    decoder = FrameDecoder()
+    assert decoder.feed(stream + encode_frame(b'tail')[:HEADER_SIZE + 2]) == PAYLOADS
+    assert decoder.pending() == HEADER_SIZE + 2
+    assert decoder.feed(b'il') == [b'tail'] and decoder.pending() == 0
+
+
+def test_frame_larger_than_the_buffer():
+    payload = bytes(range(256)) * (4 * BUFFER_SIZE // 256)
+    frame = encode_frame(payload)
+    decoder = FrameDecoder()
+    frames = []
+    for start in range(0, len(frame), 1000):
+        frames.extend(decoder.feed(frame[start:start + 1000]))
+    assert frames == [payload]
+
+
+def test_slices_of_one_read_stay_valid_until_the_next():
+    decoder = FrameDecoder(buffer_size=64)
+    target = decoder.get_buffer()
+    stream = encode_frame(b'first') + encode_frame(b'second')
+    target[:len(stream)] = stream
+    frames = decoder.commit(len(stream))
+    assert [bytes(frame) for frame in frames] == [b'first', b'second']
+
+
+def test_oversized_frame_is_rejected():
+    decoder = FrameDecoder(max_frame_size=16)
+    with pytest.raises(FrameError):
+        decoder.feed(encode_frame(b'x' * 17))
+    assert decoder.pending() == 0 and decoder.feed(encode_frame(b'ok')) == [b'ok']
+
+
+def test_recv_into_socket():
+    vehicle, server = socket.socketpair()
+    decoder = FrameDecoder()
+    vehicle.sendall(encode_frame(b'hello') + encode_frame(b'world')[:3])
+    assert [bytes(frame) for frame in decoder.recv_into(server)] == [b'hello']
+    vehicle.close()
+    with pytest.raises(ConnectionAbortedError):
+        decoder.recv_into(server)
+    server.close()
+
+
+def test_throughput_does_not_depend_on_pending_bytes():
+    # Small reads of a large frame must not copy the pending bytes on every read
+    payload = b'x' * (1 << 20)
+    frame = encode_frame(payload)
+    decoder = FrameDecoder()
+    started = time.perf_counter()
+    for start in range(0, len(frame), 1 << 10):
+        decoder.feed(frame[start:start + (1 << 10)])
+    assert time.perf_counter() - started < 1.0
+
+    stream = encode_frame(b'{"status": "RESPONSE", "cmd": [], "msg_data": {"INFO": "OK"}}') * 100_000
+    count = 0
+    started = time.perf_counter()
+    for start in range(0, len(stream), BUFFER_SIZE):
+        count += len(decoder.feed(stream[start:start + BUFFER_SIZE]))
+    assert count == 100_000 and time.perf_counter() - started < 2.0
@@ -0,0 +1,44 @@
+import numpy as np
+
+from src.telemetry.batch import TelemetryBatch
+from src.telemetry.history import MAX_SPREAD, SensorHistory, TelemetryHistory
+
+
+def test_ring_wraps_around():
+    ring = SensorHistory({'x': np.dtype('f4')}, 8)
+    for i in range(5):
+        ring.append(float(i), {'x': i})
+    ring.extend(np.arange(5, 11, dtype=float), {'x': np.arange(5, 11, dtype='f4')})
+    assert len(ring) == 8 and ring.last_time() == 10.0
+    assert ring.range('x')[1].tolist() == list(range(3, 11))
+    assert ring.range('x', 4, 7)[1].tolist() == [4, 5, 6]
+    times, low, high = ring.decimate('x', 2)
+    assert times.tolist() == [3, 7] and low.tolist() == [3, 7] and high.tolist() == [6, 10]
+
+
+def test_extend_by_more_than_the_capacity():
+    ring = SensorHistory({'x': np.dtype('f8')}, 4)
+    ring.append(0.0, {'x': 0})
+    ring.extend(np.arange(1, 11, dtype=float), {'x': np.arange(1, 11, dtype='f8')})
+    assert len(ring) == 4 and ring.range('x')[1].tolist() == [7, 8, 9, 10]
+
+
+def test_empty_ring():
+    ring = SensorHistory({'x': np.dtype('f4')}, 4)
+    assert len(ring) == 0 and ring.last_time() is None and ring.range('x')[1].size == 0
+
+
+def test_batches_are_spread_up_to_their_receive_time():
+    history = TelemetryHistory({'GPS': 16, 'IMU': 16})
+    assert 'axl_x' in history.channels() and 'NS' not in history.channels()
+    for received_at, values in ((100.0, [1.0]), (100.5, [2.0, 3.0, 4.0, 5.0, 6.0]), (200.0, [7.0, 8.0])):
+        batch = TelemetryBatch('IMU', {name: np.array(values, dtype='f4') for name in ('axl_x', 'axl_y', 'axl_z')})
+        batch.received_at = received_at
+        history.add_batch(batch)
+    times, values = history.range('axl_x')
+    assert values.tolist() == [1, 2, 3, 4, 5, 6, 7, 8]
+    assert np.allclose(times[:6], [100.0, 100.1, 100.2, 100.3, 100.4, 100.5])
+    # After a long gap the samples are spread over at most MAX_SPREAD
+    assert np.allclose(times[6:], [200.0 - MAX_SPREAD / 2, 200.0])
+    history.add_batch(TelemetryBatch.from_sentences('IMU', []))
+    assert len(history.range('axl_x')[1]) == 8
@@ -0,0 +1,27 @@
+import pytest
+
+from src.server.messages import Command, Frame
+
+
+def test_commands_and_data():
+    sent = {'cmd': ['MTRCMD', 'SETMODE', 'GPS', 'IMU'], 'msg_data': {'MTRCMD': 'FWD', 'SETMODE': 'Manual'}}
+    frame = Frame.from_msg(sent, timestamp=1.0)
+    assert frame.names() == ['MTRCMD', 'SETMODE', 'GPS', 'IMU'] and not frame.data
+    assert frame.commands[2] == Command('GPS') and frame.timestamp == 1.0
+    assert dict(frame.items()) == sent['msg_data'] and frame.to_msg() == sent
+
+
+def test_info_and_empty_frames():
+    assert Frame.from_msg({'cmd': [], 'msg_data': {'INFO': 'OK'}}).is_info()
+    assert not Frame.from_msg({'cmd': ['SETMODE'], 'msg_data': {'SETMODE': 'Manual', 'INFO': 'OK'}}).is_info()
+    assert Frame.from_msg({}).is_empty()
+
+
+def test_data_is_a_read_only_copy():
+    msg = {'status': 'RESPONSE', 'cmd': [], 'seq': 12, 'ack': 11, 'msg_data': {'INFO': 'SETMODE Manual OK'}}
+    frame = Frame.from_msg(msg)
+    msg['msg_data']['INFO'] = 'changed'
+    assert frame.data['INFO'] == 'SETMODE Manual OK' and (frame.seq, frame.ack) == (12, 11)
+    with pytest.raises(TypeError):
+        frame.data['INFO'] = 'changed'
+    assert frame.to_msg()['seq'] == 12
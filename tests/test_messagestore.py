@@ -0,0 +1,73 @@
+import numpy as np
+
+from src.server.codec import BINARY_CODEC
+from src.server.messages import Frame
+from src.server.messagestore import SPILL_CHUNK, MessageStore, frame_terms, parse_terms
+from src.server.recorder import RCVD, SEND
+from src.server.server import ServerThread
+from src.telemetry.batch import TelemetryBatch
+
+IMU_BATCH = [f'D,s,1,3,0.{i:03d},-0.981,9.806,*41' for i in range(10)]
+
+
+def server_frames():
+    """
+    Frames as the server builds them: batches decoded from text and binary frames, single responses, commands.
+    """
+    binary = BINARY_CODEC.decode(BINARY_CODEC.encode({'status': 'RESPONSE', 'cmd': [], 'msg_data': {
+        'IMUBATCH': IMU_BATCH}}))
+    return [
+        (ServerThread._frame({'status': 'RESPONSE', 'cmd': [], 'msg_data': {
+            'GPSRESPONSE': 'D,s,1,1,5520.0459,N,2047.5840,E,15.2,123752,38.000,48.000,*73',
+            'IMUBATCH': IMU_BATCH}}), RCVD),
+        (ServerThread._frame({'status': 'RESPONSE', 'cmd': [], 'msg_data': {
+            'GPSBATCH': ['D,s,1,1,5520.0459,N,2047.5840,E,15.2,123752,38.000,48.000,*73'] * 3,
+            'IMUBATCH': IMU_BATCH, 'INFO': 'OK'}}), RCVD),
+        (ServerThread._frame(binary), RCVD),
+        (ServerThread._frame({'cmd': ['MTRCMD'], 'msg_data': {'MTRCMD': 'STOP'}}), SEND),
+    ]
+
+
+def test_spilled_server_frames_are_read_back():
+    store = MessageStore(memory=10)
+    frames = server_frames()
+    for i in range(2 * SPILL_CHUNK + 100):
+        store.add(*frames[i % len(frames)])
+    assert len(store._frames) < 10 + SPILL_CHUNK
+
+    for entry, (frame, direction) in enumerate(frames):
+        spilled = store.get(entry)
+        assert spilled.commands == frame.commands and store.direction(entry) == ('RCVD', 'SEND')[direction]
+        assert list(spilled.data) == list(frame.data)
+        for key, value in frame.data.items():
+            if isinstance(value, TelemetryBatch):
+                assert spilled.data[key].kind == value.kind and spilled.data[key] in spilled.batches
+                for name, column in value.columns.items():
+                    assert spilled.data[key].columns[name].dtype == column.dtype
+                    assert np.array_equal(spilled.data[key].columns[name], column)
+            else:
+                assert spilled.data[key] == value
+    assert store.last(['MTRCMD=STOP'], SEND) == len(store) - 1 - (len(store) - 3) % 3
+    store.close()
+
+
+def test_query_by_direction_and_time():
+    store = MessageStore(memory=10)
+    stop = Frame.from_msg({'cmd': ['MTRCMD'], 'msg_data': {'MTRCMD': 'STOP'}}, timestamp=2.0)
+    info = Frame.from_msg({'status': 'RESPONSE', 'cmd': [], 'msg_data': {'INFO': 'OK'}}, timestamp=1.0)
+    for i in range(SPILL_CHUNK + 100):
+        store.add(stop if i % 2 else info, SEND if i % 2 else RCVD)
+    assert store.last(['MTRCMD=STOP'], SEND) == len(store) - 1 and store.last(['MTRCMD'], RCVD) is None
+    assert len(store.query(['INFO'], start=1.5)) == len(store) // 2 - 1
+    assert store.get(0).data == info.data and store.get(1).timestamp == 2.0 and store.get(1).to_msg() == stop.to_msg()
+    assert store.time(2) == 2.0 and store.direction(0) == 'RCVD'
+    store.close()
+
+
+def test_terms():
+    stop = Frame.from_msg({'cmd': ['MTRCMD'], 'msg_data': {'MTRCMD': 'STOP'}})
+    line = Frame.from_msg({'cmd': ['MANLINECMD'], 'msg_data': {'MANLINECMD': 'x' * 40}})
+    response = Frame.from_msg({'status': 'RESPONSE', 'cmd': [], 'msg_data': {'GPSRESPONSE': '...', 'INFO': 'OK'}})
+    assert frame_terms(stop) == ['MTRCMD', 'MTRCMD=STOP'] and frame_terms(line) == ['MANLINECMD']
+    assert frame_terms(response) == ['GPSRESPONSE', 'INFO']
+    assert parse_terms('mtrcmd=STOP  setmode') == ['MTRCMD=STOP', 'SETMODE']
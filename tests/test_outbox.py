@@ -0,0 +1,73 @@
+import threading
+
+from src.server.outbox import CommandOutbox, format_rates, parse_rates
+
+
+def test_latest_value_wins():
+    outbox = CommandOutbox()
+    outbox.put('MTRCMD', 'FWD')
+    outbox.put('MTRCMD', 'LEFT')
+    assert outbox.take() == {'cmd': ['MTRCMD'], 'msg_data': {'MTRCMD': 'LEFT'}}
+    assert outbox.stats()['coalesced'] == 1 and outbox.depth() == 0
+
+
+def test_pending_request_is_not_repeated():
+    outbox = CommandOutbox()
+    outbox.put('GPS')
+    outbox.put('GPS')
+    assert outbox.take() == {'cmd': ['GPS'], 'msg_data': {}} and outbox.take() == {'cmd': [], 'msg_data': {}}
+
+
+def test_queued_values_go_one_per_frame_and_oldest_drop():
+    outbox = CommandOutbox(capacity=2)
+    for line in ('a', 'b', 'c'):
+        outbox.put('MANLINECMD', line)
+    assert outbox.stats()['dropped'] == 1
+    assert [outbox.take()['msg_data'].get('MANLINECMD') for _ in range(3)] == ['b', 'c', None]
+
+
+def test_stop_goes_first():
+    outbox = CommandOutbox()
+    for cmd, value in (('GPS', None), ('SETMODE', 'Manual'), ('MANLINECMD', 'x'), ('MTRCMD', 'FWD')):
+        outbox.put(cmd, value)
+    assert outbox.take()['cmd'] == ['MTRCMD', 'SETMODE', 'MANLINECMD', 'GPS']
+    outbox.put('SETMODE', 'Manual')
+    outbox.put('MTRCMD', 'STOP')
+    outbox.put('UNKNOWN', '1')
+    assert outbox.take()['cmd'] == ['MTRCMD', 'SETMODE', 'UNKNOWN']
+
+
+def test_restore_keeps_newer_commands():
+    outbox = CommandOutbox()
+    outbox.put('MTRCMD', 'FWD')
+    outbox.put('MANLINECMD', 'first')
+    lost = outbox.take()
+    outbox.put('MTRCMD', 'STOP')
+    outbox.put('MANLINECMD', 'second')
+    outbox.restore(lost)
+    assert outbox.take() == {'cmd': ['MTRCMD', 'MANLINECMD'], 'msg_data': {'MTRCMD': 'STOP', 'MANLINECMD': 'first'}}
+    assert outbox.take()['msg_data'] == {'MANLINECMD': 'second'}
+
+
+def test_wait_and_wake():
+    outbox = CommandOutbox()
+    assert not outbox.wait(0.01)
+    threading.Timer(0.05, outbox.put, ('GPS',)).start()
+    assert outbox.wait(2)
+    outbox.take()
+    assert not outbox.wait(0.01)
+    outbox.wake()
+    assert outbox.wait(0)
+
+
+def test_clear_counts_dropped():
+    outbox = CommandOutbox()
+    outbox.put('GPS')
+    outbox.put('MANLINECMD', 'x')
+    outbox.clear()
+    assert outbox.stats() == {'depth': 0, 'enqueued': 2, 'coalesced': 0, 'dropped': 2, 'sent': 0}
+
+
+def test_subscription_rates():
+    assert format_rates({'GPS': 5.0, 'IMU': 100.0, 'BAT': 0.5}) == 'GPS:5,IMU:100,BAT:0.5'
+    assert parse_rates('gps:5, IMU:-1,bad,BAT:x') == {'GPS': 5.0, 'IMU': 0.0}
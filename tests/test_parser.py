@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from src.telemetry.checksum import SentenceCounters
+from src.telemetry.parser import parse_buffer, parse_sentences
+from src.telemetry.schema import REGISTRY, SentenceRegistry
+
+GPS_SENTENCES = ['D,s,1,1,5520.0459,N,2047.5840,E,15.2,123752,38.000,48.000,*73',
+                 'D,s,1,1,5520.0459,S,2047.5840,W,15.2,123753,38.000,48.000,*73']
+IMU_SENTENCES = [f'D,s,1,3,0.{i:03d},-0.981,9.806,*41' for i in range(10)]
+
+
+def test_sentences_are_grouped_by_sensor():
+    parsed = parse_sentences(GPS_SENTENCES + IMU_SENTENCES + ['garbage', 'D,s,9,9,1,*00'], SentenceCounters())
+    assert len(parsed['GPS']) == 2 and len(parsed['IMU']) == 10
+    assert parsed['GPS']['NS'].tolist() == ['N', 'S'] and parsed['GPS']['EW'].tolist() == ['E', 'W']
+    assert parsed['GPS'][0]['time'] == 123752 and parsed['GPS'][0]['latitude'] == 5520.0459
+    assert parsed['IMU']['axl_x'].dtype == np.float32 and parsed['IMU'][9]['axl_x'] == np.float32(0.009)
+
+
+def test_buffer_and_bytes():
+    buffer = '\n'.join(GPS_SENTENCES[:1] + IMU_SENTENCES[:3]).encode()
+    parsed = parse_buffer(buffer, SentenceCounters())
+    assert len(parsed['GPS']) == 1 and len(parsed['IMU']) == 3
+    assert len(parse_sentences([IMU_SENTENCES[0].encode()], SentenceCounters())['IMU']) == 1
+
+
+def test_malformed_sentences_are_counted():
+    counters = SentenceCounters()
+    parsed = parse_sentences(['D,s,1,3,0.1,x,0.3,*41', 'D,s,1,3,0.1,0.2,0.3,*41', 'D,s,1,3,0.1,*41',
+                              'D,s,1,1,5520.0459,X,2047.5840,E,15.2,123752,38.000,48.000,*73'], counters, verify=False)
+    assert len(parsed['IMU']) == 1 and parsed['IMU'][0]['axl_y'] == np.float32(0.2) and len(parsed['GPS']) == 0
+    assert counters.stats() == {'IMU': {'valid': 1, 'corrupt': 0, 'malformed': 2},
+                                'GPS': {'valid': 0, 'corrupt': 0, 'malformed': 1}}
+
+
+def test_a_new_sensor_is_one_declaration():
+    registry = SentenceRegistry()
+    registry.register('IMU', 'D,s,1,3', REGISTRY['IMU'].fields)
+    schema = registry.register('BAT', 'D,s,2,10', (('voltage', 'f4'), ('current', 'f4'), ('charge', 'u1')))
+    assert registry.batch_keys == {'IMUBATCH': 'IMU', 'BATBATCH': 'BAT'} and registry.lookup('D,s,2,10,1') is schema
+    parsed = parse_sentences([IMU_SENTENCES[0], 'D,s,2,10,24.6,-3.2,87,*00'], SentenceCounters(), verify=False,
+                             registry=registry)
+    assert parsed['BAT'][0]['charge'] == 87 and len(parsed['IMU']) == 1
+    assert schema.sample(*parsed['BAT'][0]).current == np.float32(-3.2)
+
+
+def test_registry_rejects_duplicates_and_bad_headers():
+    registry = SentenceRegistry()
+    registry.register('IMU', 'D,s,1,3', REGISTRY['IMU'].fields)
+    with pytest.raises(ValueError):
+        registry.register('IMU2', 'D,s,1,3', REGISTRY['IMU'].fields)
+    with pytest.raises(ValueError):
+        registry.register('BAT', 'D,s,2', (('voltage', 'f4'),))
+    assert registry.lookup('D,s,1,1,5520.0459') is None
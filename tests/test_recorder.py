@@ -0,0 +1,101 @@
+import os
+import time
+
+import numpy as np
+
+from src.server.codec import JSON_CODEC
+from src.server.recorder import MAGIC, RCVD, RECORD, SEND, Recorder, Recording
+from src.server.replay import ReplayThread
+
+PAYLOAD = JSON_CODEC.encode({'status': 'RESPONSE', 'cmd': [], 'msg_data': {'INFO': 'OK'}})
+
+
+def test_clock_step_back_keeps_times_in_order(tmp_path, monkeypatch):
+    recorder = Recorder(str(tmp_path / 'session.oprec'))
+    recorder.record(RCVD, PAYLOAD)
+    wall = time.time()
+    monkeypatch.setattr(time, 'time', lambda: wall - 3600)  # NTP steps the clock back an hour
+    for _ in range(10):
+        recorder.record(SEND, PAYLOAD)
+    recorder.close()
+
+    recording = Recording(recorder.path)
+    assert len(recording) == 11 and np.all(np.diff(recording.times) >= 0)
+    assert abs(recording.times[0] - wall) < 60
+    assert recording.seek(recording.times[5]) <= 5 and recording.seek(np.inf) == 11
+    recording.close()
+
+
+def test_old_log_with_times_going_back(tmp_path):
+    path = str(tmp_path / 'old.oprec')
+    times = [100.0, 101.0, 50.0, 102.0]
+    with open(path, 'wb') as file:
+        file.write(MAGIC)
+        for timestamp in times:
+            file.write(RECORD.pack(timestamp, RCVD, 0, len(PAYLOAD)) + PAYLOAD)
+
+    recording = Recording(path)
+    assert recording.times.tolist() == [100.0, 101.0, 101.0, 102.0]
+    assert recording.seek(101.5) == 3 and [frame[0] for frame in recording.frames(101.0)] == [101.0, 50.0, 102.0]
+    recording.close()
+
+
+def test_round_trip_and_index_rebuild(tmp_path):
+    path = str(tmp_path / 'session.oprec')
+    recorder = Recorder(path, chunk_size=1 << 12)
+    payloads = [JSON_CODEC.encode({'cmd': [], 'msg_data': {'INFO': str(i)}}) for i in range(1000)]
+    for i, payload in enumerate(payloads):
+        recorder.record(i % 2, payload, i % 3)
+    recorder.close()
+    assert recorder.stats()['records'] == 1000 and recorder.dropped == 0
+
+    recording = Recording(path)
+    times = recording.times.copy()
+    assert len(recording) == 1000 and recording.message(7)[1:] == (SEND, 1, {'cmd': [], 'msg_data': {'INFO': '7'}})
+    assert bytes(recording[999][3]) == payloads[999]
+    middle = recording.times[500]
+    assert recording.times[recording.seek(middle)] == middle
+    assert [frame[0] for frame in recording.frames(middle)][0] == middle
+    recording.close()
+
+    os.remove(path + '.idx')
+    rebuilt = Recording(path)
+    assert len(rebuilt) == 1000 and np.array_equal(rebuilt.times, times)
+    rebuilt.close()
+
+
+def test_sessions_get_their_own_logs(tmp_path):
+    sessions = [Recorder(directory=str(tmp_path)) for _ in range(3)]
+    for recorder in sessions:
+        recorder.record(RCVD, PAYLOAD)
+    idle = Recorder(directory=str(tmp_path))
+    for recorder in sessions + [idle]:
+        recorder.close()
+    assert len({recorder.path for recorder in sessions}) == 3 and idle.path is None
+    for recorder in sessions:
+        recording = Recording(recorder.path)
+        assert len(recording) == 1
+        recording.close()
+    assert sorted(os.listdir(tmp_path)) == sorted(name for recorder in sessions
+                                                  for name in (os.path.basename(recorder.path),
+                                                               os.path.basename(recorder.path) + '.idx'))
+
+
+def test_replay_plays_the_recording(tmp_path):
+    path = str(tmp_path / 'session.oprec')
+    recorder = Recorder(path)
+    recorder.record(SEND, JSON_CODEC.encode({'cmd': ['GPS'], 'msg_data': {}}), 1)
+    recorder.record(RCVD, JSON_CODEC.encode({'status': 'RESPONSE', 'cmd': [], 'msg_data': {
+        'IMUBATCH': ['D,s,1,3,0.012,-0.981,9.806,*41'] * 5}}), 1)
+    recorder.record(RCVD, JSON_CODEC.encode({'status': 'RESPONSE', 'cmd': [], 'msg_data': {'INFO': 'OK'}}), 2)
+    recorder.close()
+
+    replay = ReplayThread(path, speed=0, vehicle=1)
+    sent, received, batches = [], [], []
+    replay.signals.data_sent.connect(sent.append)
+    replay.signals.data_received.connect(received.append)
+    replay.signals.telemetry_batch.connect(batches.append)
+    replay.run()
+    assert replay.replayed == 2 and [frame.names() for frame in sent] == [['GPS']]
+    assert len(received) == 1 and [(batch.kind, len(batch)) for batch in batches] == [('IMU', 5)]
+    assert received[0].timestamp == replay.recording.times[1]
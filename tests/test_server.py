@@ -0,0 +1,40 @@
+import select
+import socket
+import threading
+
+import pytest
+
+from src.server.codec import JSON_CODEC
+from src.server.framing import FrameDecoder, encode_frame
+from src.server.server import ServerThread
+
+
+def test_subscribe_replaces_the_subscription():
+    server = ServerThread()
+    subscriptions = server.subscriptions
+    server.subscribe('GPS', 5.0)
+    server.subscribe('IMU', 50.0)
+    # A reader holding the old dict, e.g. _resume on the server thread, never sees it change
+    assert subscriptions == {} and server.subscriptions == {'GPS': 5.0, 'IMU': 50.0}
+    assert server.outbox.take()['cmd'] == ['SUBSCRIBE']
+
+
+def test_lockstep_answers_only_received_frames():
+    server = ServerThread()
+    server.health.rto = server.health.MIN_RTO
+    vehicle, conn = socket.socketpair()
+    serving = threading.Thread(target=lambda: pytest.raises(ConnectionError, server._run_lockstep, conn), daemon=True)
+    serving.start()
+    # Silent vehicle: RTO timeouts pass without a frame being sent to it
+    assert select.select([vehicle], [], [], 3 * server.health.MIN_RTO)[0] == []
+
+    vehicle.sendall(encode_frame(JSON_CODEC.encode({'status': 'RESPONSE', 'cmd': [], 'msg_data': {}, 'seq': 1})))
+    decoder = FrameDecoder()
+    frames = []
+    while not frames:
+        frames = decoder.recv_into(vehicle)
+    assert len(frames) == 1 and JSON_CODEC.decode(frames[0])['ack'] == 1
+    assert select.select([vehicle], [], [], 3 * server.health.MIN_RTO)[0] == []
+    vehicle.close()
+    serving.join(5)
+    conn.close()
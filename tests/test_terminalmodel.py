@@ -0,0 +1,112 @@
+import pytest
+from PySide6.QtCore import QCoreApplication, qInstallMessageHandler
+from PySide6.QtTest import QAbstractItemModelTester
+
+from src.server.messages import Frame
+from src.utils.terminalmodel import GROUP_FRAMES, TerminalModel, format_lines, line_count
+
+RESPONSE = Frame.from_msg({'status': 'RESPONSE', 'cmd': ['GPS', 'IMU'], 'msg_data': {
+    'GPSRESPONSE': 'D,s,1,1,5520.0459,N,2047.5840,E,15.2,123752,38.000,48.000,*73', 'INFO': 'OK'}})
+REQUEST = Frame.from_msg({'cmd': ['GPS', 'IMU'], 'msg_data': {}})
+
+
+@pytest.fixture
+def model():
+    app = QCoreApplication.instance() or QCoreApplication([])
+    yield TerminalModel(capacity=1000)
+    del app
+
+
+def test_lines_are_formatted_when_shown(model):
+    model.add_message(RESPONSE, 'RCVD')
+    assert model.formatted == 0 and model.rowCount() == line_count(RESPONSE) == len(format_lines(RESPONSE, 'RCVD'))
+    assert model.text(range(1, 4)) == 'CMD: GPS IMU \nGPSRESPONSE: D,s,1,1,5520.0459,N,2047.5840,E,15.2,123752,' \
+                                      '38.000,48.000\nINFO: OK'
+    assert model.formatted == 1
+
+
+def test_repeated_messages_are_grouped(model):
+    for i in range(3):
+        model.add_message(RESPONSE._replace(timestamp=i), 'RCVD')
+    assert model.messages() == 1 and model.rowCount() == line_count(RESPONSE) and ' ×3 с ' in model.text([0])
+
+    model.toggle(1)
+    assert model.rowCount() == 3 * line_count(RESPONSE) and model.text([0]).endswith('▾')
+    model.add_message(RESPONSE, 'RCVD')
+    assert model.rowCount() == 4 * line_count(RESPONSE) and ' ×4 с ' in model.text([0])
+    model.toggle(7)
+    assert model.rowCount() == line_count(RESPONSE) and model.text([0]).endswith('▸')
+
+
+def test_groups_keep_their_place(model):
+    for _ in range(10):
+        model.add_message(REQUEST, 'SEND')
+        model.add_message(RESPONSE, 'RCVD')
+    # The response that came after the first request stays on top
+    assert model.messages() == 2 and ' - RCVD ×10 с ' in model.text([0])
+    assert ' - SEND ×10 с ' in model.text([line_count(RESPONSE)])
+
+    mode = Frame.from_msg({'cmd': ['SETMODE'], 'msg_data': {'SETMODE': 'Manual'}})
+    model.add_message(mode, 'SEND')
+    model.add_message(REQUEST, 'SEND')
+    assert model.messages() == 3 and model.text([0]).endswith(' - SEND')
+    assert ' - SEND ×11 с ' in model.text([line_count(mode) + line_count(RESPONSE)])
+
+    # Once a group is older than the newest GROUP_WINDOW, the same shape starts a new group on top
+    for i in range(4):
+        model.add_message(Frame.from_msg({'cmd': ['SETMODE'], 'msg_data': {'SETMODE': str(i)}}), 'RCVD')
+    model.add_message(REQUEST, 'SEND')
+    assert model.messages() == 8 and model.text([0]).endswith(' - SEND')
+
+
+def test_expanded_group_keeps_its_last_messages(model):
+    model.add_message(REQUEST, 'SEND')
+    model.add_message(REQUEST, 'SEND')
+    model.add_message(RESPONSE, 'RCVD')
+    model.toggle(line_count(RESPONSE) + 1)
+    assert model.rowCount() == line_count(RESPONSE) + 2 * line_count(REQUEST)
+    for i in range(GROUP_FRAMES + 10):
+        model.add_message(REQUEST._replace(timestamp=i), 'SEND')
+    assert model.rowCount() == line_count(RESPONSE) + GROUP_FRAMES * line_count(REQUEST)
+    assert f' ×{GROUP_FRAMES + 12} с ' in model.text([line_count(RESPONSE)])
+    assert model.text([model.rowCount() - line_count(REQUEST)]).startswith(
+        format_lines(REQUEST._replace(timestamp=10), 'SEND')[0])
+
+
+def test_capacity(model):
+    model.capacity = 100
+    for i in range(300):
+        model.add_message(Frame.from_msg({'cmd': ['SETMODE'], 'msg_data': {'SETMODE': str(i)}}), 'SEND')
+    assert model.messages() == 100 and model.rowCount() == 400 and model.formatted == 0
+    assert model.text([1, 2]) == 'CMD: SETMODE \nSETMODE: 299' and model.text([398]) == 'SETMODE: 200'
+    model.clear()
+    assert model.rowCount() == 0
+    model.add_message(RESPONSE, 'SEND')
+    assert model.rowCount() == line_count(RESPONSE) and model.text([0]).endswith(' - SEND')
+
+
+def test_grouping_off(model):
+    model.group = False
+    for _ in range(3):
+        model.add_message(REQUEST, 'SEND')
+    assert model.messages() == 3
+
+
+def test_views_are_told_every_change(model):
+    # QAbstractItemModelTester reads the rows around every change, as a view does
+    failures = []
+    handler = qInstallMessageHandler(lambda mode, context, message: failures.append(message))
+    tester = QAbstractItemModelTester(model, QAbstractItemModelTester.FailureReportingMode.Warning)
+    model.capacity = 5
+    for i in range(30):
+        model.add_message(REQUEST._replace(timestamp=i), 'SEND')
+        model.add_message(RESPONSE._replace(timestamp=i + 0.5), 'RCVD')
+        if i == 3:
+            model.toggle(model.rowCount() - 1)
+        if i % 7 == 0:
+            model.add_message(Frame.from_msg({'cmd': ['SETMODE'], 'msg_data': {'SETMODE': str(i)}}), 'SEND')
+    model.toggle(0)
+    model.clear()
+    qInstallMessageHandler(handler)
+    del tester
+    assert [message for message in failures if 'FAIL' in message] == []